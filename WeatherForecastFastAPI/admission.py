@@ -0,0 +1,324 @@
+"""
+Priority-aware admission control
+
+An ASGI middleware that decides, before a request reaches the application,
+whether to serve it now or shed it with 429 Too Many Requests and a
+Retry-After header.
+
+* Cost model: every route has a rule giving its priority class and its
+  estimated cost in units of one cheap request, scaled by the requested
+  horizon (days, cities) where the route has one.
+* Priority classes: critical requests (health, metrics and admin stats
+  endpoints) are always admitted; high, normal and low requests may only
+  fill 100%, 85% and 60% of the limit respectively, so cheap interactive
+  calls keep headroom that bulk work can never take.
+* Adaptive limit: the limit on the cost units in flight follows observed
+  latency per cost unit, like a gradient concurrency limiter. A slow
+  moving baseline is compared with a fast moving recent average; when
+  recent latency rises above the baseline the limit shrinks by the same
+  ratio, and while it stays at the baseline the limit grows by about its
+  square root per update.
+
+Streams and exports are admitted and charged like other requests, but their
+duration is not a latency signal and is never sampled.
+"""
+import math
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+from metrics import MetricsRegistry
+
+
+CRITICAL = "critical"
+HIGH = "high"
+NORMAL = "normal"
+LOW = "low"
+PRIORITIES = (CRITICAL, HIGH, NORMAL, LOW)
+
+# Share of the limit each priority may fill; critical is never shed
+SHARES = {CRITICAL: math.inf, HIGH: 1.0, NORMAL: 0.85, LOW: 0.6}
+
+
+def _days(query: Dict[str, List[str]], default: int) -> int:
+    try:
+        return max(1, int(query.get("days", [default])[0]))
+    except ValueError:
+        return default
+
+
+class RouteRule(NamedTuple):
+    """
+    Admission rule of a route
+
+    cost maps the parsed query string to cost units; sampled tells whether
+    the request's latency feeds the adaptive limit.
+    """
+    priority: str
+    cost: Callable[[Dict[str, List[str]]], float] = lambda query: 1.0
+    sampled: bool = True
+
+
+def _export_cost(query: Dict[str, List[str]]) -> float:
+    cities = 35 if query.get("all_cities", ["false"])[0].lower() in ("1", "true", "yes") else \
+        len(query.get("city", [])) or 1
+    return 1 + cities * _days(query, 30) / 500
+
+
+# Rules by route template; routes not listed are normal priority, cost 1
+RULES: Dict[str, RouteRule] = {
+    "/api/forecast/health": RouteRule(CRITICAL),
+    "/metrics": RouteRule(CRITICAL),
+    "/api/forecast/cache": RouteRule(CRITICAL),
+    "/api/forecast/provider": RouteRule(CRITICAL),
+    "/api/forecast/prewarm": RouteRule(CRITICAL),
+    "/api/forecast/executor": RouteRule(CRITICAL),
+    "/api/forecast/admission": RouteRule(CRITICAL),
+    "/api/forecast/history": RouteRule(CRITICAL),
+    "/api/forecast/profiling": RouteRule(CRITICAL),
+    "/api/forecast/profiling/profiles/{profile_id}": RouteRule(CRITICAL),
+    "/api/forecast/profiling/flame": RouteRule(CRITICAL),
+    "/api/alerts/stats": RouteRule(CRITICAL),
+    "/api/forecast/current": RouteRule(HIGH),
+    "/api/forecast/city/{city}": RouteRule(HIGH, lambda q: 1 + _days(q, 5) / 30),
+    "/api/forecast/detailed": RouteRule(HIGH),
+    "/api/forecast/alerts": RouteRule(HIGH),
+    "/api/alerts": RouteRule(HIGH),
+    "/api/cities/search": RouteRule(HIGH),
+    "/api/cities/nearest": RouteRule(HIGH),
+    "/api/history/{city}": RouteRule(HIGH),
+    "/api/history/{city}/statistics": RouteRule(HIGH),
+    "/api/history/{city}/statistics/range": RouteRule(HIGH, lambda q: 1 + len(q.get("last", [])) / 16),
+    "/api/forecast": RouteRule(NORMAL, lambda q: 1 + _days(q, 5) / 30),
+    "/api/forecast/request": RouteRule(NORMAL, lambda q: 2.0),
+    "/api/forecast/detailed/multi": RouteRule(NORMAL, lambda q: 1 + _days(q, 5) / 10),
+    "/api/forecast/hourly": RouteRule(NORMAL, lambda q: 1 + _days(q, 1) / 10),
+    "/api/forecast/statistics": RouteRule(LOW, lambda q: 1 + _days(q, 7) / 100),
+    "/api/forecast/batch": RouteRule(LOW, lambda q: 8.0),
+    "/api/forecast/query": RouteRule(NORMAL, lambda q: 4.0),
+    "/api/forecast/stream": RouteRule(LOW, lambda q: 1 + _days(q, 30) / 30, sampled=False),
+    "/api/forecast/detailed/stream": RouteRule(LOW, lambda q: 1 + _days(q, 30) / 10, sampled=False),
+    "/api/forecast/statistics/stream": RouteRule(LOW, lambda q: 1 + _days(q, 365) / 100, sampled=False),
+    "/api/forecast/export": RouteRule(LOW, _export_cost, sampled=False),
+    "/api/alerts/subscribe": RouteRule(LOW, sampled=False)
+}
+
+DEFAULT_RULE = RouteRule(NORMAL)
+
+
+class AdmissionController:
+    """
+    Adaptive, priority-aware limit on the cost of requests in flight
+
+    Args:
+        routes: The application's routes (resolved lazily, so routes added
+            after the controller is created are matched too)
+        rules: Rules by route template
+        initial_limit: Starting limit, in cost units
+        min_limit: Lowest the limit may shrink to
+        max_limit: Highest the limit may grow to
+        max_request_cost: Cap on the cost charged for one request, so a huge
+            export takes a large but bounded share of the limit
+        enabled: When false every request is admitted (counters still run)
+        metrics: Registry receiving the limit, in-flight and rejection metrics
+    """
+
+    # Smoothing of the recent (fast) and baseline (slow) latency averages
+    RECENT_WEIGHT = 0.1
+    BASELINE_WEIGHT = 0.002
+    # Weight of a newly computed limit against the current one
+    LIMIT_SMOOTHING = 0.2
+    # Recent latency up to this factor above baseline counts as no change
+    TOLERANCE = 2.0
+
+    def __init__(
+        self,
+        routes: Sequence[Any],
+        rules: Optional[Dict[str, RouteRule]] = None,
+        initial_limit: float = 128.0,
+        min_limit: float = 8.0,
+        max_limit: float = 1024.0,
+        max_request_cost: float = 32.0,
+        enabled: bool = True,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        self.routes = routes
+        self.rules = rules if rules is not None else RULES
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.max_request_cost = float(max_request_cost)
+        self.enabled = enabled
+        self.metrics = metrics
+        self.in_flight = 0.0
+        self.baseline: Optional[float] = None
+        self.recent: Optional[float] = None
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.rejected = {priority: 0 for priority in PRIORITIES}
+        self._static: Optional[Dict[str, str]] = None
+        self._dynamic: List[Tuple[Any, str]] = []
+        self._publish()
+
+    def _index(self) -> None:
+        """Split routes into an exact-path table and a list of parameterised routes"""
+        self._static, self._dynamic = {}, []
+        for route in self.routes:
+            path = getattr(route, "path", None)
+            if path is None or not hasattr(route, "path_regex"):
+                continue
+            if getattr(route, "param_convertors", None):
+                self._dynamic.append((route.path_regex, path))
+            else:
+                self._static.setdefault(path, path)
+
+    def route_template(self, path: str) -> Optional[str]:
+        """Template of the route a path would be served by, or None"""
+        if self._static is None:
+            self._index()
+        template = self._static.get(path)
+        if template is not None:
+            return template
+        for regex, template in self._dynamic:
+            if regex.match(path):
+                return template
+        return None
+
+    def classify(self, scope: Dict[str, Any]) -> Tuple[RouteRule, float]:
+        """(rule, cost units) of a request"""
+        rule = self.rules.get(self.route_template(scope["path"]), DEFAULT_RULE)
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return rule, min(rule.cost(query), self.max_request_cost)
+
+    def try_acquire(self, priority: str, cost: float) -> Optional[float]:
+        """
+        Admit a request of the given priority and cost
+
+        A request is charged its cost, but never more than its class may fill,
+        so one oversized request cannot crowd out higher priorities.
+
+        Returns:
+            The cost units charged (to pass to release), or None if shed
+        """
+        allowance = self.limit * SHARES[priority]
+        charge = min(cost, allowance)
+        if self.enabled and self.in_flight + charge > allowance:
+            self.rejected[priority] += 1
+            if self.metrics is not None:
+                self.metrics.admission_rejected.labels(priority).inc()
+            return None
+        self.admitted[priority] += 1
+        self.in_flight += charge
+        self._publish()
+        return charge
+
+    def release(self, charge: float, latency: Optional[float] = None) -> None:
+        """Return a request's charge; latency (seconds) is sampled when given"""
+        self.in_flight = max(0.0, self.in_flight - charge)
+        if latency is not None:
+            self._sample(latency / charge)
+        self._publish()
+
+    def _sample(self, per_unit: float) -> None:
+        if self.baseline is None:
+            self.baseline = self.recent = per_unit
+            return
+        self.recent += (per_unit - self.recent) * self.RECENT_WEIGHT
+        self.baseline += (per_unit - self.baseline) * self.BASELINE_WEIGHT
+        # A baseline above recent latency is stale (load dropped): follow it down
+        if self.recent < self.baseline:
+            self.baseline = self.recent
+
+        gradient = min(1.0, self.baseline * self.TOLERANCE / self.recent)
+        # Only grow while the limit is actually being used
+        headroom = math.sqrt(self.limit) if self.in_flight >= self.limit / 2 else 0.0
+        target = self.limit * gradient + headroom
+        self.limit += (target - self.limit) * self.LIMIT_SMOOTHING
+        self.limit = min(self.max_limit, max(self.min_limit, self.limit))
+
+    def retry_after(self) -> int:
+        """Seconds until the work in flight is expected to drain (1-30)"""
+        if not self.recent:
+            return 1
+        return min(30, max(1, math.ceil(self.recent * self.in_flight)))
+
+    def _publish(self) -> None:
+        if self.metrics is not None:
+            self.metrics.admission_limit.labels().set(round(self.limit, 3))
+            self.metrics.admission_in_flight.labels().set(round(self.in_flight, 3))
+
+    def stats(self) -> Dict[str, Any]:
+        """Limit, load, latency signal and per-priority counters"""
+        return {
+            "enabled": self.enabled,
+            "limit": round(self.limit, 3),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": round(self.in_flight, 3),
+            "baseline_ms_per_unit": round(self.baseline * 1000, 4) if self.baseline else None,
+            "recent_ms_per_unit": round(self.recent * 1000, 4) if self.recent else None,
+            "priorities": {
+                priority: {
+                    "share": SHARES[priority] if priority != CRITICAL else None,
+                    "admitted": self.admitted[priority],
+                    "rejected": self.rejected[priority]
+                }
+                for priority in PRIORITIES
+            }
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to HTTP requests
+
+    Shed requests get 429 with a Retry-After header and a JSON body. A
+    request holds its cost until its last body chunk is sent.
+
+    Args:
+        app: Wrapped ASGI application
+        controller: Admission controller
+    """
+
+    def __init__(self, app: Callable, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        rule, cost = controller.classify(scope)
+        charge = controller.try_acquire(rule.priority, cost)
+        if charge is None:
+            await self._reject(send, controller.retry_after(), rule.priority)
+            return
+
+        start = time.perf_counter()
+        failed = False
+        try:
+            await self.app(scope, receive, send)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            sampled = rule.sampled and not failed
+            controller.release(charge, time.perf_counter() - start if sampled else None)
+
+    @staticmethod
+    async def _reject(send, retry_after: int, priority: str) -> None:
+        body = (
+            b'{"detail":"Server is overloaded; ' + priority.encode() +
+            b' priority requests are being shed, retry later"}'
+        )
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
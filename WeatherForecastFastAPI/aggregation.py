@@ -0,0 +1,247 @@
+"""
+Streaming aggregation primitives
+
+Constant-memory accumulators used to compute weather statistics in a single
+pass over generated forecast blocks, however long the horizon.
+"""
+import math
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from engine import ForecastColumns
+from indices import FLAG_NAMES, derive_indices, flag_counts
+from models import WeatherStatistics
+
+
+class RunningMoments:
+    """
+    Online count, mean, variance, min and max
+
+    Batches are folded in with Chan's parallel update, so feeding a whole
+    column at once is as accurate as feeding it value by value.
+    """
+
+    __slots__ = ("count", "mean", "m2", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray) -> None:
+        """Fold a batch of values into the running moments"""
+        n = values.size
+        if n == 0:
+            return
+
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+        self.total += float(values.sum())
+        self.min = min(self.min, values.min().item())
+        self.max = max(self.max, values.max().item())
+
+    @property
+    def variance(self) -> float:
+        """Population variance of the values seen so far"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def stddev(self) -> float:
+        """Population standard deviation of the values seen so far"""
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """
+    Single-quantile sketch using the P-square algorithm (Jain & Chlamtac)
+
+    Tracks five markers whose heights converge on the requested quantile, so
+    memory stays constant regardless of how many values are observed. The
+    markers need a few hundred values to converge; shorter series should
+    use exact percentiles instead.
+    """
+
+    __slots__ = ("p", "heights", "positions", "desired", "increments")
+
+    def __init__(self, p: float):
+        if not 0 < p < 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        self.p = p
+        self.heights: List[float] = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def update_many(self, values: Sequence[float]) -> None:
+        """Observe a batch of values"""
+        for value in values:
+            self.update(value)
+
+    def update(self, x: float) -> None:
+        """Observe a single value"""
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = height
+                n[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> float:
+        """Current quantile estimate (exact while fewer than five values are seen)"""
+        q = self.heights
+        if not q:
+            return 0.0
+        if len(q) < 5 or self.positions[4] < 5:
+            rank = self.p * (len(q) - 1)
+            low = int(rank)
+            high = min(low + 1, len(q) - 1)
+            return q[low] + (q[high] - q[low]) * (rank - low)
+        return q[2]
+
+
+class StreamingStatistics:
+    """
+    Single-pass accumulator producing WeatherStatistics
+
+    Feed it forecast column blocks in any order; memory use does not depend
+    on the number of days analysed. Temperature percentiles are exact while
+    at most EXACT_PERCENTILE_VALUES days are seen (the raw values are kept)
+    and come from P-square sketches beyond that.
+    """
+
+    PERCENTILES = (0.5, 0.9, 0.99)
+
+    # Most temperatures kept for exact percentiles before switching to sketches
+    EXACT_PERCENTILE_VALUES = 512
+
+    # Forecast fields the statistics are computed from (the derived indices
+    # come from these too)
+    FIELDS = ("temperature_c", "humidity", "precipitation", "wind_speed")
+
+    def __init__(self):
+        self.temperature = RunningMoments()
+        self.humidity = RunningMoments()
+        self.precipitation = RunningMoments()
+        self.wind_speed = RunningMoments()
+        self.temperature_quantiles = [P2Quantile(p) for p in self.PERCENTILES]
+        self.temperature_values: Optional[List[np.ndarray]] = []
+        self.dew_point = RunningMoments()
+        self.heat_index = RunningMoments()
+        self.wind_chill = RunningMoments()
+        self.apparent_temperature = RunningMoments()
+        self.flag_days = np.zeros(len(FLAG_NAMES), dtype=np.int64)
+
+    def update(self, block: ForecastColumns, city_index: int = 0) -> None:
+        """
+        Fold one city's rows of a forecast block into the statistics
+
+        Args:
+            block: Generated forecast columns
+            city_index: Index of the city within the block
+        """
+        columns = block.columns
+        temps = columns["temperature_c"][city_index]
+        self.temperature.update(temps)
+        self.humidity.update(columns["humidity"][city_index])
+        self.precipitation.update(columns["precipitation"][city_index])
+        self.wind_speed.update(columns["wind_speed"][city_index])
+
+        self._update_quantiles(temps)
+
+        # Reuses the indices of a detailed block, derives them otherwise
+        indices = derive_indices({name: column[city_index] for name, column in columns.items()})
+        self.dew_point.update(indices["dew_point_c"])
+        self.heat_index.update(indices["heat_index_c"])
+        self.wind_chill.update(indices["wind_chill_c"])
+        self.apparent_temperature.update(indices["apparent_temperature_c"])
+        self.flag_days += flag_counts(indices["comfort_flags"])
+
+    def _update_quantiles(self, temps: np.ndarray) -> None:
+        if self.temperature_values is not None:
+            self.temperature_values.append(temps)
+            if self.temperature.count <= self.EXACT_PERCENTILE_VALUES:
+                return
+            # Too many to keep: the sketches take over from the values kept so far
+            temps = np.concatenate(self.temperature_values)
+            self.temperature_values = None
+        temp_values = temps.tolist()
+        for sketch in self.temperature_quantiles:
+            sketch.update_many(temp_values)
+
+    def percentiles(self) -> List[float]:
+        """Temperature percentiles, in PERCENTILES order"""
+        if self.temperature_values is None:
+            return [sketch.value for sketch in self.temperature_quantiles]
+        values = np.concatenate(self.temperature_values)
+        return np.percentile(values, [p * 100 for p in self.PERCENTILES]).tolist()
+
+    def result(self) -> WeatherStatistics:
+        """Build the statistics response from everything seen so far"""
+        if self.temperature.count == 0:
+            raise ValueError("No forecasts were aggregated")
+
+        p50, p90, p99 = (round(value, 2) for value in self.percentiles())
+        return WeatherStatistics(
+            average_temperature_c=round(self.temperature.mean, 2),
+            max_temperature_c=int(self.temperature.max),
+            min_temperature_c=int(self.temperature.min),
+            average_humidity=round(self.humidity.mean, 2),
+            total_precipitation=round(self.precipitation.total, 2),
+            average_wind_speed=round(self.wind_speed.mean, 2),
+            days_analyzed=self.temperature.count,
+            temperature_stddev_c=round(self.temperature.stddev, 2),
+            temperature_p50_c=p50,
+            temperature_p90_c=p90,
+            temperature_p99_c=p99,
+            max_wind_speed=round(self.wind_speed.max, 2),
+            max_precipitation=round(self.precipitation.max, 2),
+            average_dew_point_c=round(self.dew_point.mean, 2),
+            max_heat_index_c=round(self.heat_index.max, 1),
+            min_wind_chill_c=round(self.wind_chill.min, 1),
+            average_apparent_temperature_c=round(self.apparent_temperature.mean, 2),
+            comfort_flag_days=dict(zip(FLAG_NAMES, self.flag_days.tolist()))
+        )
@@ -0,0 +1,440 @@
+"""
+Time-indexed weather alert store
+
+AlertStore keeps every ingested alert in memory, ordered by start and end
+time, with secondary indexes by city, alert type and severity, so "which
+alerts are active between T1 and T2 for these cities at High or above" only
+touches the candidate alerts. Subscribers receive an event whenever an alert
+is added or runs out. AlertMonitor feeds the store from the service and
+expires alerts in the background.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from engine import SEVERITIES, city_key
+from models import AlertType, CityAlert, Severity
+from records import AlertRecord
+
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_RANK = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+CREATED = "created"
+EXPIRED = "expired"
+
+
+class StoredAlert:
+    """An alert held by the store, with its id and the city it applies to"""
+
+    __slots__ = ("id", "city", "key", "alert", "rank")
+
+    def __init__(self, alert_id: int, city: Optional[str], alert: AlertRecord):
+        self.id = alert_id
+        self.city = city
+        self.key = city_key(city)
+        self.alert = alert
+        self.rank = SEVERITY_RANK[alert.severity]
+
+    def to_model(self) -> CityAlert:
+        alert = self.alert
+        return CityAlert.model_construct(
+            id=self.id,
+            city=self.city,
+            alert_type=alert.alert_type,
+            severity=alert.severity,
+            description=alert.description,
+            start_time=alert.start_time,
+            end_time=alert.end_time
+        )
+
+
+class AlertSubscription:
+    """
+    Queue of alert events for one subscriber
+
+    Events are delivered through the subscriber's event loop, so the store
+    may publish from any thread. When the queue is full the oldest event is
+    dropped rather than blocking the publisher.
+    """
+
+    def __init__(
+        self,
+        cities: Optional[Set[str]] = None,
+        alert_types: Optional[Set[AlertType]] = None,
+        min_severity: Optional[Severity] = None,
+        max_queue: int = 256
+    ):
+        self.cities = cities
+        self.alert_types = alert_types
+        self.min_rank = SEVERITY_RANK[min_severity] if min_severity else 0
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+
+    def matches(self, entry: StoredAlert) -> bool:
+        return (
+            entry.rank >= self.min_rank
+            and (self.cities is None or entry.key in self.cities)
+            and (self.alert_types is None or entry.alert.alert_type in self.alert_types)
+        )
+
+    def _offer(self, event: Tuple[str, CityAlert]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def publish(self, event: Tuple[str, CityAlert]) -> None:
+        self.loop.call_soon_threadsafe(self._offer, event)
+
+    async def get(self) -> Tuple[str, CityAlert]:
+        """Wait for the next (event name, alert) pair"""
+        return await self.queue.get()
+
+
+class AlertStore:
+    """
+    In-memory alert store with interval and attribute indexes
+
+    Alerts are kept in two sorted lists, by start time and by end time. An
+    interval query bisects both and scans whichever side has fewer
+    candidates; city, type and severity filters use hash indexes instead
+    when they are more selective.
+
+    Args:
+        retention: Seconds an alert is kept after its end time
+    """
+
+    def __init__(self, retention: float = 86400.0):
+        self.retention = timedelta(seconds=retention)
+        self._alerts: Dict[int, StoredAlert] = {}
+        self._identities: Dict[Tuple, int] = {}
+        self._starts: List[Tuple[datetime, int]] = []
+        self._ends: List[Tuple[datetime, int]] = []
+        self._by_city: Dict[str, Set[int]] = {}
+        self._by_type: Dict[AlertType, Set[int]] = {}
+        self._by_severity: Dict[Severity, Set[int]] = {}
+        # (end_time, id) of alerts not yet announced as expired
+        self._pending_expiry: List[Tuple[datetime, int]] = []
+        self._subscribers: List[AlertSubscription] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.purged = 0
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    @staticmethod
+    def _identity(key: str, alert: AlertRecord) -> Tuple:
+        return (key, alert.alert_type, alert.severity, alert.start_time, alert.end_time, alert.description)
+
+    def add(self, city: Optional[str], alert: AlertRecord) -> Optional[StoredAlert]:
+        """
+        Store an alert and notify subscribers
+
+        Args:
+            city: City the alert applies to; None means the default location
+            alert: Alert to store
+
+        Returns:
+            The stored alert, or None if an identical alert is already stored
+        """
+        identity = self._identity(city_key(city), alert)
+        with self._lock:
+            if identity in self._identities:
+                return None
+            entry = StoredAlert(next(self._ids), city, alert)
+            self._identities[identity] = entry.id
+            self._alerts[entry.id] = entry
+            insort(self._starts, (alert.start_time, entry.id))
+            insort(self._ends, (alert.end_time, entry.id))
+            self._by_city.setdefault(entry.key, set()).add(entry.id)
+            self._by_type.setdefault(alert.alert_type, set()).add(entry.id)
+            self._by_severity.setdefault(alert.severity, set()).add(entry.id)
+            heapq.heappush(self._pending_expiry, (alert.end_time, entry.id))
+        self._publish(CREATED, entry)
+        return entry
+
+    def ingest(self, city: Optional[str], alerts: Iterable[AlertRecord]) -> int:
+        """Store a batch of alerts for one city, returning how many were new"""
+        return sum(self.add(city, alert) is not None for alert in alerts)
+
+    def _remove(self, alert_id: int) -> None:
+        entry = self._alerts.pop(alert_id)
+        alert = entry.alert
+        del self._identities[self._identity(entry.key, alert)]
+        del self._starts[bisect_left(self._starts, (alert.start_time, alert_id))]
+        del self._ends[bisect_left(self._ends, (alert.end_time, alert_id))]
+        for index, value in (
+            (self._by_city, entry.key),
+            (self._by_type, alert.alert_type),
+            (self._by_severity, alert.severity)
+        ):
+            ids = index[value]
+            ids.discard(alert_id)
+            if not ids:
+                del index[value]
+
+    def query(
+        self,
+        start: datetime,
+        end: Optional[datetime] = None,
+        cities: Optional[Sequence[Optional[str]]] = None,
+        alert_types: Optional[Sequence[AlertType]] = None,
+        min_severity: Optional[Severity] = None
+    ) -> List[StoredAlert]:
+        """
+        Alerts active at any time in [start, end]
+
+        Args:
+            start: Window start
+            end: Window end (defaults to start, i.e. active at that instant;
+                datetime.max for every alert that has not ended by start)
+            cities: Restrict to these cities
+            alert_types: Restrict to these alert types
+            min_severity: Lowest severity to include
+
+        Returns:
+            Matching alerts ordered by start time
+        """
+        end = start if end is None else end
+        if end < start:
+            raise ValueError("Alert window end must not be before its start")
+        min_rank = SEVERITY_RANK[min_severity] if min_severity else 0
+
+        with self._lock:
+            # Overlap means start_time <= end and end_time >= start
+            started = bisect_right(self._starts, (end, float("inf")))
+            not_ended = bisect_left(self._ends, (start, -1))
+            if started <= len(self._ends) - not_ended:
+                candidates: Iterable[int] = (i for _, i in self._starts[:started])
+            else:
+                candidates = (i for _, i in self._ends[not_ended:])
+            size = min(started, len(self._ends) - not_ended)
+
+            filters = []
+            if cities is not None:
+                filters.append(self._union(self._by_city, {city_key(city) for city in cities}))
+            if alert_types is not None:
+                filters.append(self._union(self._by_type, set(alert_types)))
+            if min_rank:
+                filters.append(self._union(self._by_severity, set(SEVERITIES[min_rank:])))
+            filters.sort(key=len)
+            if filters and len(filters[0]) < size:
+                candidates, filters = filters[0], filters[1:]
+
+            matches = []
+            for alert_id in candidates:
+                entry = self._alerts[alert_id]
+                alert = entry.alert
+                if alert.start_time > end or alert.end_time < start:
+                    continue
+                if all(alert_id in ids for ids in filters):
+                    matches.append(entry)
+
+        matches.sort(key=lambda entry: (entry.alert.start_time, entry.id))
+        return matches
+
+    @staticmethod
+    def _union(index: Dict[Any, Set[int]], values: Set[Any]) -> Set[int]:
+        found = [index[value] for value in values if value in index]
+        if len(found) == 1:
+            return found[0]
+        return set().union(*found)
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        """
+        Announce alerts that have ended and purge those past retention
+
+        Args:
+            now: Current time (defaults to datetime.now())
+
+        Returns:
+            Number of alerts announced as expired
+        """
+        now = now or datetime.now()
+        ended = []
+        with self._lock:
+            while self._pending_expiry and self._pending_expiry[0][0] <= now:
+                _, alert_id = heapq.heappop(self._pending_expiry)
+                entry = self._alerts.get(alert_id)
+                if entry is not None:
+                    ended.append(entry)
+
+            cutoff = now - self.retention
+            purge = [i for end, i in self._ends[:bisect_left(self._ends, (cutoff, -1))]]
+            for alert_id in purge:
+                self._remove(alert_id)
+            self.purged += len(purge)
+            self.expired += len(ended)
+
+        for entry in ended:
+            self._publish(EXPIRED, entry)
+        return len(ended)
+
+    def subscribe(
+        self,
+        cities: Optional[Sequence[Optional[str]]] = None,
+        alert_types: Optional[Sequence[AlertType]] = None,
+        min_severity: Optional[Severity] = None,
+        max_queue: int = 256
+    ) -> AlertSubscription:
+        """
+        Register for created/expired events matching the given filters
+
+        Must be called from the event loop that will consume the events.
+        """
+        subscription = AlertSubscription(
+            {city_key(city) for city in cities} if cities else None,
+            set(alert_types) if alert_types else None,
+            min_severity,
+            max_queue
+        )
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: AlertSubscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def _publish(self, event: str, entry: StoredAlert) -> None:
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.matches(entry)]
+        if not subscribers:
+            return
+        message = (event, entry.to_model())
+        for subscription in subscribers:
+            try:
+                subscription.publish(message)
+            except RuntimeError:
+                # The subscriber's loop has closed; it will never read again
+                self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of store size and counters"""
+        with self._lock:
+            return {
+                "alerts": len(self._alerts),
+                "cities": len(self._by_city),
+                "pending_expiry": len(self._pending_expiry),
+                "subscribers": len(self._subscribers),
+                "expired": self.expired,
+                "purged": self.purged
+            }
+
+
+class AlertMonitor:
+    """
+    Feeds the alert store from the service and expires alerts over time
+
+    Alerts of a city are generated once per calendar day, the first time the
+    city is looked up or watched. A background task re-ingests every watched
+    city when the day rolls over and announces alerts that have ended.
+    Startup cities are watched for good; other cities only while a
+    subscription holds them (watch and unwatch are reference counted), so
+    cities that are only queried are generated on demand and never pile up.
+
+    Args:
+        service: Weather service (or its caching facade)
+        store: Alert store to feed
+        cities: Cities watched from startup
+        interval: Seconds between maintenance passes
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        store: AlertStore,
+        cities: Sequence[str] = (),
+        interval: float = 60.0
+    ):
+        self.service = service
+        self.store = store
+        self.interval = interval
+        self._pinned = {city_key(city) for city in cities}
+        self._watched: Dict[str, Optional[str]] = {city_key(city): city for city in cities}
+        self._watchers: Dict[str, int] = {}
+        self._ingested: Dict[str, date] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def ensure(self, city: Optional[str]) -> None:
+        """Ingest today's alerts for a city unless already done"""
+        key = city_key(city)
+        today = datetime.now().date()
+        if self._ingested.get(key) == today:
+            return
+        self._ingested[key] = today
+        self.store.ingest(city, self.service.get_weather_alerts(city))
+
+    def watch(self, cities: Iterable[Optional[str]]) -> None:
+        """Keep these cities ingested every day until unwatched (e.g. for subscribers)"""
+        for city in cities:
+            key = city_key(city)
+            self._watchers[key] = self._watchers.get(key, 0) + 1
+            self._watched.setdefault(key, city)
+            self.ensure(city)
+
+    def unwatch(self, cities: Iterable[Optional[str]]) -> None:
+        """Release cities watched with watch(); the last release stops watching them"""
+        for city in cities:
+            key = city_key(city)
+            count = self._watchers.get(key, 0) - 1
+            if count > 0:
+                self._watchers[key] = count
+                continue
+            self._watchers.pop(key, None)
+            if key not in self._pinned:
+                self._watched.pop(key, None)
+
+    @property
+    def watched(self) -> int:
+        """Number of cities re-ingested every day"""
+        return len(self._watched)
+
+    def active(self, city: Optional[str]) -> List[AlertRecord]:
+        """Alerts of a city that have not ended yet"""
+        self.ensure(city)
+        entries = self.store.query(datetime.now(), datetime.max, cities=[city])
+        return [entry.alert for entry in entries]
+
+    def tick(self) -> None:
+        """One maintenance pass: ingest watched cities, expire ended alerts"""
+        today = datetime.now().date()
+        # Cities looked up on a previous day are ingested again on demand
+        self._ingested = {key: day for key, day in self._ingested.items() if day == today}
+        for city in list(self._watched.values()):
+            self.ensure(city)
+        self.store.expire()
+
+    async def start(self) -> None:
+        """Start the maintenance task on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="alert-monitor")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Alert maintenance pass failed")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,58 @@
+"""
+Concurrent fan-out for multi-city requests
+
+Runs a per-city function for many cities at once with bounded concurrency,
+collecting failures per city instead of failing the whole batch. Coroutine
+functions are awaited directly; plain functions run on the thread pool.
+"""
+import asyncio
+import inspect
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+def unique_cities(cities: Iterable[str]) -> List[str]:
+    """Drop repeated city names, keeping the first occurrence and the input order"""
+    return list(dict.fromkeys(cities))
+
+
+async def fan_out(
+    cities: Iterable[str],
+    fetch: Callable[[str], Any],
+    concurrency: int = 8
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Call fetch(city) for every city concurrently
+
+    Args:
+        cities: City names (duplicates are fetched once)
+        fetch: Function (or coroutine function) returning the result for one city
+        concurrency: Maximum number of cities fetched at the same time
+
+    Returns:
+        Tuple of (results keyed by city, error messages keyed by city),
+        both in input order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    is_async = inspect.iscoroutinefunction(fetch)
+
+    async def run(city: str) -> Any:
+        if not city or city.strip() == "":
+            raise ValueError("City name cannot be empty")
+        async with semaphore:
+            if is_async:
+                return await fetch(city)
+            return await run_in_threadpool(fetch, city)
+
+    names = unique_cities(cities)
+    outcomes = await asyncio.gather(*(run(city) for city in names), return_exceptions=True)
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for city, outcome in zip(names, outcomes):
+        if isinstance(outcome, Exception):
+            errors[city] = str(outcome) or type(outcome).__name__
+        else:
+            results[city] = outcome
+    return results, errors
@@ -0,0 +1,121 @@
+"""
+Benchmark: latency of high-priority requests under a burst of bulk work
+
+Drives the application in-process over ASGI with a burst of low and normal
+priority requests (exports, streams, multi-day detailed forecasts) while a
+steady trickle of high priority probes (current weather, city forecasts)
+measures the latency interactive clients see. The same load runs with
+admission control disabled and enabled. Run from the WeatherForecastFastAPI
+directory:
+
+    python -m benchmarks.bench_admission --burst 64 --duration 10 --output admission.json
+    python -m benchmarks.bench_admission --baseline admission.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+os.environ.setdefault("WEATHER_PREWARM_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+from benchmarks import results  # noqa: E402
+
+
+CITIES = ["London", "Tokyo", "Paris", "New York", "Sydney", "Berlin", "Moscow", "Dubai"]
+
+
+def bulk_requests() -> List[str]:
+    """Low and normal priority requests that each generate a long horizon"""
+    paths = [f"/api/forecast/export?all_cities=true&days={days}" for days in (60, 90)]
+    paths += [f"/api/forecast/stream?days=365&city={city}" for city in CITIES]
+    paths += [f"/api/forecast/detailed/multi?days={days}" for days in range(20, 31)]
+    return paths
+
+
+def probe_requests() -> List[str]:
+    """High priority requests whose latency is reported"""
+    return [f"/api/forecast/current?city={city}" for city in CITIES] + \
+        [f"/api/forecast/city/{city}?days=3" for city in CITIES]
+
+
+async def run(app, burst: int, duration: float, probe_interval: float) -> Dict[str, float]:
+    probes: List[float] = []
+    shed = bulk_done = errors = 0
+    deadline = time.perf_counter() + duration
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def bulk(offset: int) -> None:
+            nonlocal shed, bulk_done, errors
+            paths = bulk_requests()
+            index = offset
+            while time.perf_counter() < deadline:
+                response = await client.get(paths[index % len(paths)])
+                index += 1
+                if response.status_code == 429:
+                    shed += 1
+                    # Honour a fraction of Retry-After so the burst keeps pressing
+                    await asyncio.sleep(float(response.headers.get("retry-after", "1")) / 10)
+                elif response.status_code >= 400:
+                    errors += 1
+                else:
+                    bulk_done += 1
+
+        async def probe() -> None:
+            nonlocal errors
+            paths = probe_requests()
+            index = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(paths[index % len(paths)])
+                probes.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+                index += 1
+                await asyncio.sleep(probe_interval)
+
+        await asyncio.gather(probe(), *(bulk(i) for i in range(burst)))
+
+    summary = results.latency_summary(probes, "ms")
+    summary["probes"] = len(probes)
+    summary["bulk_completed_per_second"] = round(bulk_done / duration, 1)
+    summary["bulk_shed"] = shed
+    summary["errors"] = errors
+    return summary
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--burst", type=int, default=64, help="Concurrent bulk clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per case")
+    parser.add_argument("--probe-interval", type=float, default=0.02, help="Seconds between probes")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    import main as application
+
+    measured: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'probes':>7} "
+          f"{'bulk/s':>7} {'shed':>6} {'errors':>6}")
+    for enabled in (False, True):
+        application.admission.enabled = enabled
+        application.forecast_cache.clear()
+        summary = asyncio.run(run(application.app, args.burst, args.duration, args.probe_interval))
+        name = f"admission={'on' if enabled else 'off'}"
+        measured[name] = summary
+        print(f"{name:<20} {summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} {summary['p99_ms']:>8.2f} "
+              f"{summary['probes']:>7} {summary['bulk_completed_per_second']:>7.1f} "
+              f"{summary['bulk_shed']:>6} {summary['errors']:>6}")
+
+    return results.finish(
+        args, "admission", measured,
+        burst=args.burst, duration=args.duration, probe_interval=args.probe_interval
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Benchmark: city index lookups on a large synthetic registry
+
+Run from the WeatherForecastFastAPI directory:
+
+    python -m benchmarks.bench_cities --cities 50000
+"""
+import argparse
+import random
+import string
+import time
+from typing import Callable, List
+
+from cities import KNOWN_CITIES, City, CityRegistry
+
+
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+SYLLABLES = [c + v for c in CONSONANTS for v in VOWELS]
+SYLLABLES += [s + coda for s in SYLLABLES for coda in "nrls"]
+
+
+def synthetic_cities(n: int, rng: random.Random) -> List[City]:
+    """Pronounceable unique names (one word, sometimes two) at random coordinates"""
+    names = set()
+    while len(names) < n:
+        words = 2 if rng.random() < 0.2 else 1
+        names.add(" ".join(
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+            for _ in range(words)
+        ))
+    return [
+        City(name, "Synthetica", rng.uniform(-90, 90), rng.uniform(-180, 180))
+        for name in names
+    ]
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    chars = list(name)
+    i = rng.randrange(len(chars))
+    op = rng.choice(("replace", "delete", "insert"))
+    if op == "replace":
+        chars[i] = rng.choice(string.ascii_lowercase)
+    elif op == "delete" and len(chars) > 1:
+        del chars[i]
+    else:
+        chars.insert(i, rng.choice(string.ascii_lowercase))
+    return "".join(chars)
+
+
+def per_call_us(fn: Callable[[object], object], inputs: list) -> float:
+    start = time.perf_counter()
+    for item in inputs:
+        fn(item)
+    return (time.perf_counter() - start) / len(inputs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cities", type=int, default=50000, help="Synthetic cities to index")
+    parser.add_argument("--queries", type=int, default=2000, help="Queries per case")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    cities = synthetic_cities(args.cities, rng)
+
+    start = time.perf_counter()
+    registry = CityRegistry(KNOWN_CITIES + cities)
+    build = time.perf_counter() - start
+    registry.nearest(0.0, 0.0)  # build the k-d tree outside the timed loop
+
+    sample = [rng.choice(cities).name for _ in range(args.queries)]
+    prefixes = [name[:rng.randint(1, 4)] for name in sample]
+    typos = [misspell(name, rng) for name in sample]
+    points = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(args.queries)]
+
+    print(f"indexed {len(registry):,} cities in {build:.2f}s")
+    print(f"{'exact lookup':<22} {per_call_us(registry.get, sample):>9.1f} us/query")
+    print(f"{'prefix autocomplete':<22} {per_call_us(lambda q: registry.search(q, 10, 0), prefixes):>9.1f} us/query")
+    print(f"{'fuzzy (1 edit)':<22} {per_call_us(lambda q: registry.search(q, 10, 1), typos):>9.1f} us/query")
+    print(f"{'fuzzy (2 edits)':<22} {per_call_us(lambda q: registry.search(q, 10, 2), typos):>9.1f} us/query")
+    print(f"{'resolve misspelling':<22} {per_call_us(registry.resolve, typos):>9.1f} us/query")
+    print(f"{'nearest k=5':<22} {per_call_us(lambda p: registry.nearest(p[0], p[1], 5), points):>9.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: composite queries against separate requests
+
+Times a client that needs current conditions, alerts and statistics for one
+place (the sequence the MCP server and n8n workflows issue) making three
+requests one after another, and the same as one composite query, in-process
+over ASGI. Runs cold (caches cleared before every round) and warm. Also
+times the generation work alone: separate service calls for current
+conditions, a detailed forecast and statistics against one shared
+generation pass. Every saved request also saves a network round trip, which
+in-process timings do not include. Run from the WeatherForecastFastAPI
+directory:
+
+    python -m benchmarks.bench_composite --output composite.json
+    python -m benchmarks.bench_composite --baseline composite.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, Optional, Sequence
+
+os.environ.setdefault("WEATHER_PREWARM_ENABLED", "false")
+os.environ.setdefault("WEATHER_ADMISSION_ENABLED", "false")
+os.environ.setdefault("WEATHER_HISTORY_PATH", "")
+
+import httpx  # noqa: E402
+
+from benchmarks import results  # noqa: E402
+from service import WeatherForecastService  # noqa: E402
+
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def requests_us(client: httpx.AsyncClient, send, rounds: int, cold: bool) -> float:
+    import main
+
+    elapsed = 0.0
+    for _ in range(rounds):
+        if cold:
+            main.weather_service.cache.clear()
+            main.response_cache.cache.clear()
+        start = time.perf_counter()
+        await send(client)
+        elapsed += time.perf_counter() - start
+    return elapsed / rounds * 1e6
+
+
+async def http_cases(args) -> Dict[str, Dict[str, float]]:
+    from main import app
+
+    async def separate(client: httpx.AsyncClient) -> None:
+        for url, params in (
+            ("/api/forecast/current", {}),
+            ("/api/forecast/alerts", {}),
+            ("/api/forecast/statistics", {"days": args.days})
+        ):
+            (await client.get(url, params=params)).raise_for_status()
+
+    async def composite(client: httpx.AsyncClient) -> None:
+        response = await client.post("/api/forecast/query", json={"operations": [
+            {"op": "current"}, {"op": "alerts"}, {"op": "statistics", "days": args.days}
+        ]})
+        response.raise_for_status()
+
+    measured: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for cold in (True, False):
+            label = "cold" if cold else "warm"
+            three = await requests_us(client, separate, args.rounds, cold)
+            one = await requests_us(client, composite, args.rounds, cold)
+            measured[f"http {label}"] = {"separate_us": round(three, 1), "composite_us": round(one, 1)}
+            print(f"{'http ' + label:<26} {three:>12.1f} {one:>12.1f} {1 - one / three:>8.0%}")
+    return measured
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=30, help="Days of statistics and detailed forecasts")
+    parser.add_argument("--rounds", type=int, default=200, help="Rounds per HTTP measurement")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per generation measurement")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<26} {'separate us':>12} {'composite us':>12} {'saved':>8}")
+    measured = asyncio.run(http_cases(args))
+
+    service = WeatherForecastService()
+    days = min(args.days, 30)
+    views = (("current", 0, None), ("detailed", days, None), ("statistics", args.days, None))
+    separate = per_call_us(lambda: (
+        service.get_current_weather(), service.get_detailed_forecasts(days),
+        service.get_weather_statistics(args.days)
+    ), args.calls)
+    shared = per_call_us(lambda: service.get_forecast_views(None, views), args.calls)
+    measured["generation"] = {"separate_us": round(separate, 1), "shared_us": round(shared, 1)}
+    print(f"{'generation':<26} {separate:>12.1f} {shared:>12.1f} {1 - shared / separate:>8.0%}")
+
+    return results.finish(args, "composite", measured, days=args.days, rounds=args.rounds, calls=args.calls)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Benchmark: sparse fieldsets against full forecasts
+
+For each horizon, times the service generating detailed (and basic)
+forecasts and serializing them to the JSON body of the response, once with
+every field and once per fieldset, and reports the body size. Fields left
+out of a fieldset are neither drawn, computed, materialised nor serialized.
+Run from the WeatherForecastFastAPI directory:
+
+    python -m benchmarks.bench_fields --output fields.json
+    python -m benchmarks.bench_fields --baseline fields.json
+"""
+import argparse
+import sys
+import time
+from typing import Dict, Optional, Sequence
+
+from benchmarks import results
+from engine import response_fields
+from responses import dumps
+from service import WeatherForecastService
+
+
+FIELDSETS = {
+    "temperature,summary": ["temperature_c", "summary"],
+    "temperature,summary,alerts": ["temperature_c", "summary", "alerts"]
+}
+
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365], help="Horizons to measure")
+    parser.add_argument("--calls", type=int, default=50, help="Calls per measurement")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    service = WeatherForecastService()
+    variants = {
+        "detailed": (service.get_detailed_forecasts, True),
+        "basic": (service.get_forecast, False)
+    }
+    measured: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<42} {'us':>9} {'body bytes':>11} {'cpu saved':>10} {'bytes saved':>12}")
+    for days in args.days:
+        for variant, (method, detailed) in variants.items():
+            cases = {"all fields": None}
+            for label, names in FIELDSETS.items():
+                if detailed or "alerts" not in names:
+                    cases[label] = response_fields(names, detailed)
+
+            full_us = full_bytes = None
+            for label, fields in cases.items():
+                body = dumps(method(days, fields))
+                elapsed = per_call_us(lambda: dumps(method(days, fields)), args.calls)
+                name = f"{days}d {variant} {label}"
+                full_us = full_us or elapsed
+                full_bytes = full_bytes or len(body)
+                measured[name] = {"respond_us": round(elapsed, 1), "body_bytes": len(body)}
+                print(f"{name:<42} {elapsed:>9.1f} {len(body):>11,} "
+                      f"{1 - elapsed / full_us:>10.0%} {1 - len(body) / full_bytes:>12.0%}")
+
+    return results.finish(args, "fields", measured, calls=args.calls)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
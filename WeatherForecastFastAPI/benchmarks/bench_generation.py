@@ -0,0 +1,84 @@
+"""
+Benchmark: row-at-a-time forecast generation vs the columnar engine
+
+Run from the WeatherForecastFastAPI directory:
+
+    python -m benchmarks.bench_generation
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from engine import SUMMARIES, generate_columns, horizon_dates
+from models import WeatherForecast, WindDirection
+
+
+def legacy_forecast(days: int) -> List[WeatherForecast]:
+    """The original per-day loop from WeatherForecastService.get_forecast"""
+    forecasts = []
+    for i in range(1, days + 1):
+        temp_c = random.randint(-20, 55)
+        forecasts.append(WeatherForecast(
+            date=datetime.now() + timedelta(days=i),
+            temperature_c=temp_c,
+            temperature_f=int(32 + (temp_c * 9 / 5)),
+            summary=random.choice(SUMMARIES),
+            humidity=random.randint(30, 100),
+            wind_speed=round(random.uniform(0, 50), 2),
+            wind_direction=random.choice(list(WindDirection)),
+            precipitation=round(random.uniform(0, 100), 2),
+            pressure=random.randint(980, 1040)
+        ))
+    return forecasts
+
+
+def rows_per_second(fn: Callable[[], int], min_time: float) -> float:
+    """Call fn (which returns the rows it produced) for at least min_time seconds"""
+    rows = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        rows += fn()
+        elapsed = time.perf_counter() - start
+    return rows / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cities", type=int, default=50, help="Cities per batch")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds per case")
+    args = parser.parse_args()
+
+    cities = [f"City {i}" for i in range(args.cities)]
+
+    print(f"{'days':>6} {'legacy loop':>14} {'engine records':>14} "
+          f"{'engine cols':>14} {'speedup':>8}")
+    for days in (5, 30, 365):
+        dates = horizon_dates(days)
+
+        def legacy():
+            for _ in cities:
+                legacy_forecast(days)
+            return days * len(cities)
+
+        def engine_records():
+            block = generate_columns(dates, cities)
+            for index in range(len(cities)):
+                block.to_records(index)
+            return len(block)
+
+        def engine_columns():
+            return len(generate_columns(dates, cities))
+
+        legacy_rate = rows_per_second(legacy, args.min_time)
+        record_rate = rows_per_second(engine_records, args.min_time)
+        column_rate = rows_per_second(engine_columns, args.min_time)
+        print(f"{days:>6} {legacy_rate:>14,.0f} {record_rate:>14,.0f} "
+              f"{column_rate:>14,.0f} {record_rate / legacy_rate:>7.1f}x")
+    print("(rows/sec; 'engine records' includes conversion to ForecastRecord)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: forecast history writes and range statistics
+
+Records several years of daily forecasts for a handful of cities, the way
+the service records them (a few weeks per write, each write overlapping the
+previous one), then times statistics over ranges of growing length computed
+from the window index (prefix sums and sparse tables) and from the rollups
+against the same statistics aggregated from every day row of the range, and
+the cost of appending a week to an indexed series. Run from the
+WeatherForecastFastAPI directory:
+
+    python -m benchmarks.bench_history --years 10 --output history.json
+    python -m benchmarks.bench_history --baseline history.json
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from benchmarks import results
+from engine import city_key
+from history import AGGREGATED, ForecastHistory, Rollup
+from models import WindDirection
+from records import ForecastRecord
+
+
+CITIES = ["London", "Tokyo", "Paris", "New York"]
+DIRECTIONS = list(WindDirection)
+
+
+def forecasts(rng: random.Random, start: date, days: int) -> List[ForecastRecord]:
+    records = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        temperature = rng.randint(-20, 45)
+        records.append(ForecastRecord(
+            datetime(day.year, day.month, day.day, 12), temperature, 32 + int(temperature * 9 / 5),
+            "Mild", rng.randint(0, 100), round(rng.uniform(0, 60), 2), rng.choice(DIRECTIONS),
+            round(rng.uniform(0, 40), 2), rng.randint(980, 1040)
+        ))
+    return records
+
+
+def scan(history: ForecastHistory, city: str, start: date, end: date) -> Rollup:
+    """Aggregate every day row of the range (what the rollups avoid)"""
+    with history._lock:
+        rows = history._db.execute(
+            f"SELECT {', '.join(AGGREGATED)} FROM daily WHERE city = ? AND day BETWEEN ? AND ?",
+            (city_key(city), start.toordinal(), end.toordinal())
+        ).fetchall()
+    return Rollup.of_rows(rows)
+
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, default=10, help="Years of daily forecasts per city")
+    parser.add_argument("--window", type=int, default=30, help="Days per write")
+    parser.add_argument("--calls", type=int, default=200, help="Queries per measured range")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    first = date(2000, 1, 1)
+    days = args.years * 365
+    directory = tempfile.mkdtemp(prefix="weather-history-")
+    path = os.path.join(directory, "history.db")
+    history = ForecastHistory(path)
+    measured: Dict[str, Dict[str, float]] = {}
+    try:
+        # Each write covers the next window plus a week already stored (revised)
+        writes = 0
+        start = time.perf_counter()
+        for city in CITIES:
+            for offset in range(0, days, args.window):
+                history.record(city, forecasts(rng, first + timedelta(days=max(0, offset - 7)), args.window + 7))
+                writes += 1
+        elapsed = time.perf_counter() - start
+        measured["record"] = {
+            "per_write_us": round(elapsed / writes * 1e6, 1),
+            "days_per_second": round(history.recorded / elapsed, 1)
+        }
+        print(f"recorded {history.recorded:,} days in {writes:,} writes: "
+              f"{measured['record']['per_write_us']:.0f} us per write\n")
+
+        start = time.perf_counter()
+        history.window_statistics(CITIES[0], [(first, first)])
+        measured["index build"] = {"build_ms": round((time.perf_counter() - start) * 1000, 2)}
+        print(f"index of {days:,} days built in {measured['index build']['build_ms']:.1f} ms\n")
+
+        print(f"{'range':<12} {'index us':>9} {'rollups us':>11} {'day scan us':>12}")
+        for length in (30, 365, 3 * 365, days - 40):
+            begin = first + timedelta(days=17)
+            end = begin + timedelta(days=length - 1)
+            city = CITIES[0]
+            expected = scan(history, city, begin, end).statistics()
+            assert history.statistics(city, begin, end) == expected
+            index_us = per_call_us(lambda: history.window_statistics(city, [(begin, end)]), args.calls)
+            rollup_us = per_call_us(lambda: history.statistics(city, begin, end), args.calls)
+            scan_us = per_call_us(lambda: scan(history, city, begin, end).statistics(), args.calls)
+            name = f"{length} days"
+            measured[name] = {
+                "index_us": round(index_us, 1), "rollups_us": round(rollup_us, 1), "scan_us": round(scan_us, 1)
+            }
+            print(f"{name:<12} {index_us:>9.1f} {rollup_us:>11.1f} {scan_us:>12.1f}")
+
+        # Appending to an indexed series updates the index from the first new day on
+        city = CITIES[1]
+        history.window_statistics(city, [(first, first)])
+        day = first + timedelta(days=days)
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            history.record(city, forecasts(rng, day, 7))
+            day += timedelta(days=7)
+        measured["append week"] = {"indexed_write_us": round((time.perf_counter() - start) / args.calls * 1e6, 1)}
+        print(f"\nappend a week to an indexed series: {measured['append week']['indexed_write_us']:.0f} us")
+    finally:
+        history.close()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    return results.finish(args, "history", measured, years=args.years, window=args.window)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Benchmark: hourly series generation, aggregation and downsampling
+
+For each horizon, times the service producing the full hourly series, a
+bucketed series and an LTTB-downsampled series, and reports the JSON body
+size a client would download. Downsampling is compared with plain
+decimation (every k-th point) by how much of the temperature range of the
+full series the kept points still show. Run from the WeatherForecastFastAPI
+directory:
+
+    python -m benchmarks.bench_hourly --output hourly.json
+    python -m benchmarks.bench_hourly --baseline hourly.json
+"""
+import argparse
+import sys
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from benchmarks import results
+from hourly import lttb_indexes
+from responses import dumps
+from service import WeatherForecastService
+
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def range_kept(values: np.ndarray, indexes: np.ndarray) -> float:
+    """Share of the series' min-max range spanned by the kept points"""
+    kept = values[indexes]
+    return float((kept.max() - kept.min()) / (values.max() - values.min()))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30, 90], help="Horizons to measure")
+    parser.add_argument("--points", type=int, default=200, help="Point budget of the downsampled series")
+    parser.add_argument("--bucket-hours", type=int, default=6, help="Hours per bucket of the bucketed series")
+    parser.add_argument("--calls", type=int, default=50, help="Calls per measurement")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    service = WeatherForecastService()
+    measured: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<26} {'points':>7} {'us':>9} {'body bytes':>11}")
+    for days in args.days:
+        cases = {
+            "hourly": {},
+            f"{args.bucket_hours}h buckets": {"bucket_hours": args.bucket_hours},
+            f"lttb {args.points}": {"points": args.points}
+        }
+        for label, options in cases.items():
+            records = service.get_hourly_forecast(days, "London", **options)
+            name = f"{days}d {label}"
+            measured[name] = {
+                "points": len(records),
+                "generate_us": round(per_call_us(lambda: service.get_hourly_forecast(days, "London", **options),
+                                                 args.calls), 1),
+                "body_bytes": len(dumps(records))
+            }
+            print(f"{name:<26} {len(records):>7} {measured[name]['generate_us']:>9.1f} "
+                  f"{measured[name]['body_bytes']:>11,}")
+
+        temperatures = np.array([record.temperature_c for record in service.get_hourly_forecast(days, "London")])
+        if len(temperatures) > args.points:
+            step = len(temperatures) / args.points
+            decimated = (np.arange(args.points) * step).astype(np.int64)
+            measured[f"{days}d range kept"] = {
+                "lttb_share": round(range_kept(temperatures, lttb_indexes(temperatures, args.points)), 3),
+                "decimation_share": round(range_kept(temperatures, decimated), 3)
+            }
+            print(f"{'':<26} temperature range kept: lttb "
+                  f"{measured[f'{days}d range kept']['lttb_share']:.0%}, decimation "
+                  f"{measured[f'{days}d range kept']['decimation_share']:.0%}")
+
+    return results.finish(
+        args, "hourly", measured, points=args.points, bucket_hours=args.bucket_hours, calls=args.calls
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Benchmark: derived comfort indices, vectorised against row by row
+
+Times computing dew point, heat index, wind chill, apparent temperature and
+the alert-threshold flags over batches of generated forecast rows: in one
+vectorised pass over the columns (indices.derive_indices) and row by row
+with the same formulas on Python floats, as clients computed them. Checks
+that both give the same values. Also times generating a detailed block of
+the batch size with and without the indices, which is what they add to the
+detailed path. Run from the WeatherForecastFastAPI directory:
+
+    python -m benchmarks.bench_indices --output indices.json
+    python -m benchmarks.bench_indices --baseline indices.json
+"""
+import argparse
+import math
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from benchmarks import results
+from engine import DETAILED_FORECAST_FIELDS, generate_columns
+from indices import INDEX_FIELDS, THRESHOLDS, derive_indices, flag_lists
+
+
+def row_indices(temperature: float, humidity: float, wind: float) -> Tuple[float, ...]:
+    """The indices of one row, computed on Python floats"""
+    gamma = math.log(humidity / 100) + 17.625 * temperature / (243.04 + temperature)
+    dew_point = round(243.04 * gamma / (17.625 - gamma), 1)
+
+    heat = temperature
+    if temperature >= 26.7:
+        t = temperature * 1.8 + 32
+        index = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + humidity * 0.094)
+        if (index + t) / 2 >= 80:
+            rh = humidity
+            index = (-42.379 + 2.04901523 * t + 10.14333127 * rh - 0.22475541 * t * rh
+                     - 6.83783e-3 * t * t - 5.481717e-2 * rh * rh + 1.22874e-3 * t * t * rh
+                     + 8.5282e-4 * t * rh * rh - 1.99e-6 * t * t * rh * rh)
+            if rh < 13 and 80 <= t <= 112:
+                index -= (13 - rh) / 4 * math.sqrt(max(17 - abs(t - 95), 0) / 17)
+            elif rh > 85 and 80 <= t <= 87:
+                index += (rh - 85) / 10 * (87 - t) / 5
+        heat = (index - 32) / 1.8
+    heat = round(heat, 1)
+
+    chill = temperature
+    if temperature <= 10 and wind >= 4.8:
+        v = wind ** 0.16
+        chill = 13.12 + 0.6215 * temperature - 11.37 * v + 0.3965 * temperature * v
+    chill = round(chill, 1)
+
+    apparent = heat if temperature >= 26.7 else chill
+    values = {"dew_point_c": dew_point, "heat_index_c": heat, "wind_chill_c": chill}
+    flags = tuple(
+        threshold.flag for threshold in THRESHOLDS
+        if (values[threshold.index] >= threshold.value if threshold.above
+            else values[threshold.index] <= threshold.value)
+    )
+    return dew_point, heat, chill, apparent, flags
+
+
+def per_call_us(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def block_shape(rows: int) -> Tuple[List[datetime], List[str]]:
+    """Dates and cities of a block of at least rows (city, date) cells"""
+    cities = [f"city-{i}" for i in range(max(1, rows // 100))]
+    start = datetime(2025, 1, 1)
+    return [start + timedelta(days=i) for i in range(math.ceil(rows / len(cities)))], cities
+
+
+def batch(rows: int) -> Dict[str, np.ndarray]:
+    """Basic forecast columns of rows generated (city, date) cells, flattened"""
+    columns = generate_columns(*block_shape(rows)).columns
+    return {name: columns[name].reshape(-1)[:rows] for name in ("temperature_c", "humidity", "wind_speed")}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000], help="Batch sizes")
+    parser.add_argument("--calls", type=int, default=20, help="Calls per measurement")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    measured: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<56} {'before us':>10} {'after us':>10} {'change':>8}")
+    for rows in args.rows:
+        columns = batch(rows)
+        inputs = list(zip(*(columns[name].tolist() for name in ("temperature_c", "humidity", "wind_speed"))))
+
+        def by_row() -> List[Tuple[float, ...]]:
+            return [row_indices(*row) for row in inputs]
+
+        derived = derive_indices(columns)
+        vectorised = list(zip(*(derived[name].tolist() for name in INDEX_FIELDS[:-1]),
+                              flag_lists(derived["comfort_flags"])))
+        mismatches = sum(a != b for a, b in zip(vectorised, by_row()))
+        if mismatches:
+            print(f"{rows} rows: {mismatches} rows differ between the two computations")
+            return 1
+
+        row_us = per_call_us(by_row, max(1, args.calls // 4))
+        vector_us = per_call_us(lambda: derive_indices(columns), args.calls)
+        name = f"{rows} rows indices"
+        measured[name] = {"row_us": round(row_us, 1), "vectorised_us": round(vector_us, 1)}
+        print(f"{name + ' (row by row -> vectorised)':<56} {row_us:>10.1f} {vector_us:>10.1f} "
+              f"{row_us / vector_us:>7.0f}x")
+
+        # What the indices add to generating a detailed block of the same size
+        dates, cities = block_shape(rows)
+        without = [name for name in DETAILED_FORECAST_FIELDS if name not in INDEX_FIELDS]
+        base_us = per_call_us(lambda: generate_columns(dates, cities, detailed=True, fields=without), args.calls)
+        full_us = per_call_us(lambda: generate_columns(dates, cities, detailed=True), args.calls)
+        name = f"{rows} rows detailed generation"
+        measured[name] = {"without_indices_us": round(base_us, 1), "with_indices_us": round(full_us, 1)}
+        print(f"{name + ' (without -> with indices)':<56} {base_us:>10.1f} {full_us:>10.1f} "
+              f"{full_us / base_us - 1:>+8.0%}")
+
+    return results.finish(args, "indices", measured, calls=args.calls)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Benchmark: temperature percentiles of the statistics, exact and sketched
+
+Checks the p50, p90 and p99 temperatures of get_weather_statistics against
+np.percentile over the same generated columns: they must match exactly up
+to StreamingStatistics.EXACT_PERCENTILE_VALUES days, where the raw values
+are kept, and the P-square sketches beyond it are reported with their error.
+Also times the statistics for each horizon. Run from the
+WeatherForecastFastAPI directory:
+
+    python -m benchmarks.bench_percentiles --output percentiles.json
+    python -m benchmarks.bench_percentiles --baseline percentiles.json
+"""
+import argparse
+import sys
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from aggregation import StreamingStatistics
+from benchmarks import results
+from engine import generate_columns, iter_horizon_chunks
+from service import WeatherForecastService
+
+
+def exact_percentiles(service: WeatherForecastService, days: int) -> np.ndarray:
+    """p50, p90 and p99 of the temperatures the statistics of days aggregate"""
+    temps = np.concatenate([
+        generate_columns(dates, seed=service.seed).columns["temperature_c"][0]
+        for dates in iter_horizon_chunks(days, service.STATISTICS_CHUNK_DAYS)
+    ])
+    return np.round(np.percentile(temps, [p * 100 for p in StreamingStatistics.PERCENTILES]), 2)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30, 365, 3650], help="Horizons")
+    parser.add_argument("--calls", type=int, default=20, help="Calls per measurement")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    service = WeatherForecastService()
+    measured: Dict[str, Dict[str, float]] = {}
+    failed = False
+    print(f"{'days':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max error':>10} {'us':>10}")
+    for days in args.days:
+        stats = service.get_weather_statistics(days)
+        reported = np.array([stats.temperature_p50_c, stats.temperature_p90_c, stats.temperature_p99_c])
+        error = float(np.abs(reported - exact_percentiles(service, days)).max())
+        if days <= StreamingStatistics.EXACT_PERCENTILE_VALUES and error:
+            print(f"{days} days: percentiles differ from np.percentile by {error}")
+            failed = True
+
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            service.get_weather_statistics(days)
+        elapsed_us = (time.perf_counter() - start) / args.calls * 1e6
+        measured[f"{days} days"] = {"max_error_c": round(error, 2), "statistics_us": round(elapsed_us, 1)}
+        print(f"{days:>6} {reported[0]:>8.2f} {reported[1]:>8.2f} {reported[2]:>8.2f} "
+              f"{error:>10.2f} {elapsed_us:>10.1f}")
+
+    if failed:
+        return 1
+    return results.finish(args, "percentiles", measured, calls=args.calls)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
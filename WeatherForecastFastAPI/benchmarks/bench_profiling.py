@@ -0,0 +1,98 @@
+"""
+Benchmark: cost of profiling
+
+Times one request (a detailed forecast, caches cleared every round so it is
+generated) in-process over ASGI: with the profiling middleware idle, with
+the continuous sampler running at several intervals, and profiled on demand
+with cProfile and with the per-request sampler. Also reports the time the
+sampler thread spends per sample. Run from the WeatherForecastFastAPI
+directory:
+
+    python -m benchmarks.bench_profiling --output profiling.json
+    python -m benchmarks.bench_profiling --baseline profiling.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, Optional, Sequence
+
+os.environ.setdefault("WEATHER_PREWARM_ENABLED", "false")
+os.environ.setdefault("WEATHER_ADMISSION_ENABLED", "false")
+os.environ.setdefault("WEATHER_HISTORY_PATH", "")
+os.environ["WEATHER_PROFILING_ENABLED"] = "true"
+
+import httpx  # noqa: E402
+
+from benchmarks import results  # noqa: E402
+
+
+async def request_us(client: httpx.AsyncClient, params: Dict[str, int], rounds: int,
+                     headers: Optional[Dict[str, str]] = None) -> float:
+    import main
+
+    elapsed = 0.0
+    for _ in range(rounds):
+        main.weather_service.cache.clear()
+        main.response_cache.cache.clear()
+        start = time.perf_counter()
+        response = await client.get("/api/forecast/detailed/multi", params=params, headers=headers)
+        elapsed += time.perf_counter() - start
+        response.raise_for_status()
+    return elapsed / rounds * 1e6
+
+
+async def cases(args) -> Dict[str, Dict[str, float]]:
+    import main
+
+    profiler = main.profiler
+    params = {"days": args.days}
+    measured: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await request_us(client, params, 5)
+        base = await request_us(client, params, args.rounds)
+        measured["idle"] = {"request_us": round(base, 1)}
+        print(f"{'idle':<24} {base:>12.1f} {'':>9} {'':>12}")
+
+        for interval_ms in args.intervals:
+            profiler.flame.clear()
+            profiler.sampler.interval = interval_ms / 1000
+            profiler.sampler.sample_seconds = 0.0
+            profiler.sampler.attach()
+            profiler.sampler.start()
+            try:
+                elapsed = await request_us(client, params, args.rounds)
+            finally:
+                profiler.sampler.stop()
+                profiler.sampler.detach()
+            per_sample = profiler.sampler.sample_seconds / max(profiler.flame.samples, 1) * 1e6
+            name = f"sampling {interval_ms:g}ms"
+            measured[name] = {"request_us": round(elapsed, 1), "sample_us": round(per_sample, 1)}
+            print(f"{name:<24} {elapsed:>12.1f} {elapsed / base - 1:>9.1%} {per_sample:>12.1f}")
+
+        for mode in ("cprofile", "sample"):
+            elapsed = await request_us(client, params, args.rounds, {"X-Profile": mode})
+            name = f"profiled {mode}"
+            measured[name] = {"request_us": round(elapsed, 1)}
+            print(f"{name:<24} {elapsed:>12.1f} {elapsed / base - 1:>9.1%} {'':>12}")
+    return measured
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=30, help="Days of the detailed forecast requested")
+    parser.add_argument("--rounds", type=int, default=200, help="Requests per measurement")
+    parser.add_argument("--intervals", type=float, nargs="+", default=[20, 5],
+                        help="Continuous sampler intervals (ms)")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<24} {'request us':>12} {'overhead':>9} {'sample us':>12}")
+    measured = asyncio.run(cases(args))
+    return results.finish(args, "profiling", measured, days=args.days, rounds=args.rounds)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark: memory and construction time of forecast rows
+
+Compares validated Pydantic models, unvalidated models (model_construct) and
+the slotted records the service uses internally, per row. Run from the
+WeatherForecastFastAPI directory:
+
+    python -m benchmarks.bench_records --rows 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from engine import generate_columns, horizon_dates
+from models import DetailedWeatherForecast, WeatherAlert, WeatherForecast
+from records import AlertRecord, DetailedForecastRecord, ForecastRecord
+from responses import dumps
+
+
+def basic_fields(records: List[ForecastRecord]) -> List[Dict[str, Any]]:
+    return [
+        {name: getattr(record, name) for name in ForecastRecord.__slots__}
+        for record in records
+    ]
+
+
+def detailed_fields(records: List[DetailedForecastRecord]) -> List[Dict[str, Any]]:
+    names = ForecastRecord.__slots__ + DetailedForecastRecord.__slots__
+    rows = []
+    for record in records:
+        row = {name: getattr(record, name) for name in names}
+        if record.alerts:
+            row["alerts"] = [
+                {name: getattr(alert, name) for name in AlertRecord.__slots__}
+                for alert in record.alerts
+            ]
+        rows.append(row)
+    return rows
+
+
+def measure(build: Callable[[], list], rows: int) -> Dict[str, float]:
+    """Construction time and retained bytes per row of one build"""
+    gc.collect()
+    start = time.perf_counter()
+    built = build()
+    elapsed = time.perf_counter() - start
+    del built
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    built = build()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    dumps(built)
+    serialize = time.perf_counter() - start
+    return {
+        "bytes_per_row": (after - before) / rows,
+        "construct_us": elapsed / rows * 1e6,
+        "serialize_us": serialize / rows * 1e6
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000, help="Rows per case")
+    args = parser.parse_args()
+
+    # One city per 1000 days keeps every row distinct without huge date lists
+    cities = [f"City {i}" for i in range(max(1, args.rows // 1000))]
+    block = generate_columns(horizon_dates(min(args.rows, 1000)), cities, detailed=True)
+    basic = [r for i in range(len(cities)) for r in block.to_records(i)][:args.rows]
+    detailed = [r for i in range(len(cities)) for r in block.to_detailed_records(i)][:args.rows]
+    basic_rows = basic_fields(basic)
+    detailed_rows = detailed_fields(detailed)
+    rows = len(basic)
+
+    def detailed_model(row, construct):
+        alerts = row.get("alerts")
+        if alerts:
+            row = dict(row, alerts=[construct(WeatherAlert)(**alert) for alert in alerts])
+        return construct(DetailedWeatherForecast)(**row)
+
+    validated = lambda cls: cls  # noqa: E731
+    unvalidated = lambda cls: cls.model_construct  # noqa: E731
+
+    cases = {
+        "WeatherForecast (validated)": lambda: [WeatherForecast(**row) for row in basic_rows],
+        "WeatherForecast.model_construct": lambda: [
+            WeatherForecast.model_construct(**row) for row in basic_rows
+        ],
+        "ForecastRecord": lambda: [ForecastRecord(**row) for row in basic_rows],
+        "DetailedWeatherForecast (validated)": lambda: [
+            detailed_model(row, validated) for row in detailed_rows
+        ],
+        "DetailedWeatherForecast.model_construct": lambda: [
+            detailed_model(row, unvalidated) for row in detailed_rows
+        ],
+        "DetailedForecastRecord": lambda: [
+            DetailedForecastRecord(**dict(
+                row, alerts=[AlertRecord(**alert) for alert in row["alerts"]] if row["alerts"] else None
+            ))
+            for row in detailed_rows
+        ]
+    }
+
+    print(f"{rows:,} rows per case")
+    print(f"{'row type':<42} {'bytes/row':>10} {'construct us':>13} {'serialize us':>13}")
+    for name, build in cases.items():
+        result = measure(build, rows)
+        print(f"{name:<42} {result['bytes_per_row']:>10,.0f} "
+              f"{result['construct_us']:>13.2f} {result['serialize_us']:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: every WeatherForecastService method across horizon sizes
+
+Calls the uncached service directly, so results measure generation and model
+construction rather than cache lookups. Run from the WeatherForecastFastAPI
+directory:
+
+    python -m benchmarks.bench_service --output service.json
+    python -m benchmarks.bench_service --baseline service.json
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks import results
+from service import WeatherForecastService
+
+
+HORIZONS = (1, 7, 30, 365)
+LONG_HORIZONS = (30, 365, 3650)
+CITY = "London"
+
+
+def cases(service: WeatherForecastService) -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, zero-argument call) for every service method and horizon"""
+    loop = asyncio.new_event_loop()
+    tomorrow = datetime.now() + timedelta(days=1)
+
+    def consume(make_iterator: Callable[[], Any]) -> Callable[[], int]:
+        return lambda: sum(1 for _ in make_iterator())
+
+    calls: List[Tuple[str, Callable[[], Any]]] = [
+        ("get_current_weather", lambda: service.get_current_weather(CITY)),
+        ("get_detailed_forecast", lambda: service.get_detailed_forecast(tomorrow, CITY)),
+        ("get_weather_alerts", lambda: service.get_weather_alerts(CITY))
+    ]
+    for days in HORIZONS:
+        calls += [
+            (f"get_forecast[days={days}]", lambda d=days: service.get_forecast(d)),
+            (f"get_forecast_by_city[days={days}]", lambda d=days: service.get_forecast_by_city(CITY, d)),
+            (f"fetch_forecast_by_city[days={days}]",
+             lambda d=days: loop.run_until_complete(service.fetch_forecast_by_city(CITY, d))),
+            (f"get_detailed_forecasts[days={days}]", lambda d=days: service.get_detailed_forecasts(d)),
+            (f"get_weather_statistics[days={days}]", lambda d=days: service.get_weather_statistics(d))
+        ]
+    for days in LONG_HORIZONS:
+        calls += [
+            (f"get_weather_statistics[days={days}]", lambda d=days: service.get_weather_statistics(d)),
+            (f"iter_forecasts[days={days}]", consume(lambda d=days: service.iter_forecasts(d, CITY))),
+            (f"iter_detailed_forecasts[days={days}]",
+             consume(lambda d=days: service.iter_detailed_forecasts(d, CITY))),
+            (f"iter_weather_statistics[days={days}]",
+             consume(lambda d=days: service.iter_weather_statistics(d)))
+        ]
+
+    # Horizons listed in both tuples are only measured once
+    unique: Dict[str, Callable[[], Any]] = {}
+    for name, call in calls:
+        unique.setdefault(name, call)
+    return list(unique.items())
+
+
+def measure(call: Callable[[], Any], min_time: float, min_calls: int) -> Dict[str, float]:
+    """Latency percentiles, call rate and allocated bytes of one call"""
+    call()  # warm-up
+    samples = []
+    start = time.perf_counter()
+    while len(samples) < min_calls or time.perf_counter() - start < min_time:
+        t0 = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    # Allocation is measured on a separate call: tracing distorts timings
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    summary = results.latency_summary(samples, "us")
+    summary["calls_per_second"] = round(len(samples) / elapsed, 1)
+    summary["peak_alloc_bytes"] = peak
+    summary["calls"] = len(samples)
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds per case")
+    parser.add_argument("--min-calls", type=int, default=20, help="Calls per case at least")
+    parser.add_argument("--filter", default="", help="Only run cases containing this text")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+
+    service = WeatherForecastService(seed=0)
+    measured: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<42} {'p50 us':>11} {'p95 us':>11} {'p99 us':>11} "
+          f"{'calls/s':>10} {'peak alloc':>12}")
+    for name, call in cases(service):
+        if args.filter not in name:
+            continue
+        summary = measure(call, args.min_time, args.min_calls)
+        measured[name] = summary
+        print(f"{name:<42} {summary['p50_us']:>11,.1f} {summary['p95_us']:>11,.1f} "
+              f"{summary['p99_us']:>11,.1f} {summary['calls_per_second']:>10,.0f} "
+              f"{summary['peak_alloc_bytes']:>12,}")
+
+    return results.finish(args, "service", measured, min_time=args.min_time, min_calls=args.min_calls)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Benchmark: cold start, from a fresh process to the first served request
+
+Every run starts a new interpreter, so nothing is shared with earlier runs
+but the files on disk. Two modes are measured:
+
+* in-process - the child imports main (which builds the app) and sends the
+  first requests over ASGI; reports import time, the first /api/forecast/health
+  and the first /openapi.json, and the wall time from spawning the process
+  until it served its first request
+* server - python main.py is started and polled over HTTP until the health
+  check answers, as a new replica would be
+
+Each mode runs with the prebuilt OpenAPI document missing (it is generated
+on the first /openapi.json) and present. Run from the WeatherForecastFastAPI
+directory:
+
+    python -m benchmarks.bench_startup --runs 5 --output startup.json
+    python -m benchmarks.bench_startup --baseline startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks import results
+
+
+CHILD = """
+import time
+started = time.perf_counter()
+import asyncio, json, httpx
+import main
+imported = time.perf_counter()
+
+async def first_requests():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+        (await client.get("/api/forecast/health")).raise_for_status()
+        served = time.perf_counter()
+        ready = time.time()
+        (await client.get("/openapi.json")).raise_for_status()
+        return served, ready, time.perf_counter()
+
+served, ready, documented = asyncio.run(first_requests())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+    "first_openapi_ms": (documented - served) * 1000,
+    "ready": ready
+}))
+"""
+
+
+def _env(openapi_cache: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({"WEATHER_PREWARM_ENABLED": "false", "WEATHER_OPENAPI_CACHE_PATH": openapi_cache})
+    return env
+
+
+def in_process(openapi_cache: str) -> Dict[str, float]:
+    """One fresh interpreter importing the app and serving its first requests"""
+    spawned = time.time()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], env=_env(openapi_cache),
+        capture_output=True, text=True, check=True
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["ready_ms"] = (timings.pop("ready") - spawned) * 1000
+    return timings
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server(openapi_cache: str) -> Dict[str, float]:
+    """python main.py from spawn until the health check and /openapi.json answer"""
+    port = _free_port()
+    env = _env(openapi_cache)
+    env.update({"WEATHER_HOST": "127.0.0.1", "WEATHER_PORT": str(port), "WEATHER_WORKERS": "1"})
+    spawned = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py"], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            deadline = spawned + 60
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {process.returncode}")
+                try:
+                    if client.get("/api/forecast/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    if time.perf_counter() > deadline:
+                        raise RuntimeError("Server did not start within 60 seconds")
+                    time.sleep(0.005)
+            ready = time.perf_counter()
+            client.get("/openapi.json").raise_for_status()
+            documented = time.perf_counter()
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {"ready_ms": (ready - spawned) * 1000, "first_openapi_ms": (documented - ready) * 1000}
+
+
+def measure(mode: str, prebuilt: bool, runs: int) -> Dict[str, float]:
+    run = in_process if mode == "in-process" else server
+    directory = tempfile.mkdtemp(prefix="weather-startup-")
+    openapi_cache = os.path.join(directory, "openapi.cache.json")
+    samples: List[Dict[str, float]] = []
+    try:
+        if prebuilt:
+            run(openapi_cache)  # writes the document
+        for _ in range(runs):
+            if not prebuilt and os.path.exists(openapi_cache):
+                os.remove(openapi_cache)
+            samples.append(run(openapi_cache))
+    finally:
+        if os.path.exists(openapi_cache):
+            os.remove(openapi_cache)
+        os.rmdir(directory)
+    return {
+        metric: round(statistics.median(sample[metric] for sample in samples), 2)
+        for metric in samples[0]
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per case (median reported)")
+    parser.add_argument(
+        "--modes", nargs="+", choices=("in-process", "server"), default=["in-process", "server"],
+        help="Modes to measure (default: both)"
+    )
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    measured: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<32} {'import ms':>10} {'1st req ms':>11} {'ready ms':>9} {'1st openapi ms':>15}")
+    for mode in args.modes:
+        for prebuilt in (False, True):
+            name = f"{mode} openapi={'prebuilt' if prebuilt else 'generated'}"
+            summary = measure(mode, prebuilt, args.runs)
+            measured[name] = summary
+            print(f"{name:<32} {summary.get('import_ms', float('nan')):>10.1f} "
+                  f"{summary.get('first_request_ms', float('nan')):>11.1f} {summary['ready_ms']:>9.1f} "
+                  f"{summary['first_openapi_ms']:>15.1f}")
+
+    return results.finish(args, "startup", measured, runs=args.runs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Benchmark: throughput scaling from 1 to N worker processes
+
+Starts the real server (python main.py) once per worker count, with the
+forecast cache shared between workers, and loads it over HTTP from separate
+client processes so the clients do not compete with the server for one
+interpreter. Reports requests/s, latency percentiles, the speedup over one
+worker and the shared cache hit ratio. Run from the WeatherForecastFastAPI
+directory:
+
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --output workers.json
+    python -m benchmarks.bench_workers --baseline workers.json
+
+Scaling is bounded by the cores available to server and clients together;
+on a machine with fewer cores than workers + clients the curve flattens early.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from benchmarks import results
+
+
+CITIES = [
+    "London", "Tokyo", "Paris", "New York", "Sydney", "Berlin", "Moscow", "Dubai",
+    "Singapore", "Toronto", "Mumbai", "Madrid", "Rome", "Cairo", "Seoul", "Lima"
+]
+
+
+def request_mix() -> List[str]:
+    """Paths cycled by every client: city forecasts, multi-day and statistics"""
+    paths = [f"/api/forecast/city/{city}?days=7" for city in CITIES]
+    paths += [f"/api/forecast?days={days}" for days in (5, 14, 30)]
+    paths += ["/api/forecast/detailed/multi?days=14", "/api/forecast/statistics?days=365"]
+    return paths
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    """Launch python main.py with the given worker count and wait until it answers"""
+    env = dict(os.environ)
+    env.update({
+        "WEATHER_WORKERS": str(workers),
+        "WEATHER_HOST": "127.0.0.1",
+        "WEATHER_PORT": str(port),
+        "WEATHER_PREWARM_ENABLED": "false"
+    })
+    server = subprocess.Popen(
+        [sys.executable, "main.py"], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/forecast/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError("Server did not start within 60 seconds")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+async def _drive(base_url: str, paths: Sequence[str], connections: int, duration: float) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def connection(offset: int) -> None:
+            nonlocal errors
+            index = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(paths[index % len(paths)])
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+                index += 1
+
+        await asyncio.gather(*(connection(i * 7) for i in range(connections)))
+    return latencies, errors
+
+
+def client_process(args: Tuple[str, Sequence[str], int, float]) -> Tuple[List[float], int]:
+    """One load-generating process (runs in a multiprocessing pool)"""
+    return asyncio.run(_drive(*args))
+
+
+def measure(workers: int, clients: int, connections: int, duration: float) -> Dict[str, float]:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(workers, port)
+    try:
+        paths = request_mix()
+        # Warm every worker's imports; the shared cache is filled by whichever answers
+        asyncio.run(_drive(base_url, paths, connections, 1.0))
+        with multiprocessing.get_context("spawn").Pool(clients) as pool:
+            start = time.perf_counter()
+            outcomes = pool.map(client_process, [(base_url, paths, connections, duration)] * clients)
+            elapsed = time.perf_counter() - start
+        cache = httpx.get(f"{base_url}/api/forecast/cache", timeout=5).json()["forecasts"]
+    finally:
+        stop_server(server)
+
+    latencies = [latency for samples, _ in outcomes for latency in samples]
+    summary = results.latency_summary(latencies, "ms")
+    summary["requests_per_second"] = round(len(latencies) / elapsed, 1)
+    summary["errors"] = sum(errors for _, errors in outcomes)
+    summary["cache_hit_ratio"] = cache["hit_ratio"]
+    summary["cache_shared"] = cache.get("shared", False)
+    return summary
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4],
+        help="Worker counts to measure (default: 1 2 4)"
+    )
+    parser.add_argument(
+        "--clients", type=int, default=max(2, (os.cpu_count() or 2) // 2),
+        help="Load-generating processes (default: half the cores)"
+    )
+    parser.add_argument("--connections", type=int, default=8, help="Concurrent connections per client")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per worker count")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    measured: Dict[str, Dict[str, float]] = {}
+    base_rate = None
+    print(f"cores: {os.cpu_count()}, clients: {args.clients} x {args.connections} connections")
+    print(f"{'case':<12} {'req/s':>9} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>6} {'cache hits':>10}")
+    for workers in args.workers:
+        summary = measure(workers, args.clients, args.connections, args.duration)
+        base_rate = base_rate or summary["requests_per_second"]
+        summary["speedup"] = round(summary["requests_per_second"] / base_rate, 2)
+        name = f"workers={workers}"
+        measured[name] = summary
+        print(f"{name:<12} {summary['requests_per_second']:>9,.0f} {summary['speedup']:>7.2f}x "
+              f"{summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} {summary['p99_ms']:>8.2f} "
+              f"{summary['errors']:>6} {summary['cache_hit_ratio']:>10.1%}")
+
+    return results.finish(
+        args, "workers", measured,
+        clients=args.clients, connections=args.connections, duration=args.duration
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
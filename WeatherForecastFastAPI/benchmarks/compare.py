@@ -0,0 +1,37 @@
+"""
+Compare two saved benchmark results and flag regressions
+
+Run from the WeatherForecastFastAPI directory:
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.15
+
+Exits with status 1 when any metric regressed by more than the threshold.
+"""
+import argparse
+import sys
+
+from benchmarks import results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline", help="Saved baseline results")
+    parser.add_argument("current", help="Results to check")
+    parser.add_argument(
+        "--threshold", type=float, default=results.DEFAULT_THRESHOLD,
+        help="Relative worsening flagged as a regression (default: 0.10)"
+    )
+    parser.add_argument(
+        "--metric", action="append", dest="metrics",
+        help="Only compare this metric (repeatable, e.g. --metric p95_ms)"
+    )
+    args = parser.parse_args()
+
+    changes = results.compare(
+        results.load(args.baseline), results.load(args.current), args.threshold, args.metrics
+    )
+    return 1 if results.report(changes, args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
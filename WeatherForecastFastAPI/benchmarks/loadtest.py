@@ -0,0 +1,261 @@
+"""
+Load test: every API route driven in-process over ASGI
+
+Requests go through the full application (middleware, validation, caches,
+serialization) via httpx's ASGI transport, without sockets, so results are
+repeatable and isolate the application from the network. Run from the
+WeatherForecastFastAPI directory:
+
+    python -m benchmarks.loadtest --concurrency 16 --requests 500 --output load.json
+    python -m benchmarks.loadtest --baseline load.json
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+# Background tasks would add noise; the driver does not run the lifespan
+os.environ.setdefault("WEATHER_PREWARM_ENABLED", "false")
+# Routes are measured at their own capacity; shedding is measured by bench_admission
+os.environ.setdefault("WEATHER_ADMISSION_ENABLED", "false")
+# Recorded forecasts stay in memory instead of growing a history file per run
+os.environ.setdefault("WEATHER_HISTORY_PATH", "")
+# Idle unless a request asks for a profile; lets the profiling routes be loaded
+os.environ.setdefault("WEATHER_PROFILING_ENABLED", "true")
+
+import httpx  # noqa: E402
+
+from benchmarks import results  # noqa: E402
+
+
+CITIES = ["London", "Tokyo", "Paris", "New York", "Sydney", "Berlin", "Moscow", "Dubai"]
+
+
+class Scenario(NamedTuple):
+    """One route and the request variants cycled through while loading it"""
+    route: str
+    method: str
+    requests: List[Dict[str, Any]]
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route}"
+
+
+def _get(url: str, **params: Any) -> Dict[str, Any]:
+    return {"url": url, "params": params}
+
+
+def _post(url: str, body: Any) -> Dict[str, Any]:
+    return {"url": url, "json": body}
+
+
+def scenarios() -> List[Scenario]:
+    """Request mix per route; variants spread load over cities and horizons"""
+    tomorrow = (datetime.now() + timedelta(days=1)).replace(microsecond=0).isoformat()
+    window_end = (datetime.now() + timedelta(hours=12)).replace(microsecond=0).isoformat()
+    # A year of daily forecasts per city, recorded before the history reads run
+    history = [
+        {"date": (datetime(2024, 1, 1, 12) + timedelta(days=d)).isoformat(), "temperature_c": d % 40 - 10,
+         "temperature_f": 32 + int((d % 40 - 10) * 9 / 5), "summary": "Mild", "humidity": d % 100,
+         "wind_speed": 10.0, "wind_direction": "N", "precipitation": (d % 7) / 2, "pressure": 1013}
+        for d in range(366)
+    ]
+    return [
+        Scenario("/api/forecast", "GET", [_get("/api/forecast", days=d) for d in (5, 7, 30)]
+                 + [_get("/api/forecast", days=30, fields="temperature_c,summary")]),
+        Scenario("/api/forecast/current", "GET",
+                 [_get("/api/forecast/current", city=c) for c in CITIES]),
+        Scenario("/api/forecast/city/{city}", "GET",
+                 [_get(f"/api/forecast/city/{c}", days=7) for c in CITIES]),
+        Scenario("/api/forecast/detailed", "GET",
+                 [_get("/api/forecast/detailed", date=tomorrow, city=c) for c in CITIES]),
+        Scenario("/api/forecast/detailed/multi", "GET",
+                 [_get("/api/forecast/detailed/multi", days=d) for d in (5, 30)]
+                 + [_get("/api/forecast/detailed/multi", days=30, fields=["temperature_c", "summary"])]),
+        Scenario("/api/forecast/alerts", "GET",
+                 [_get("/api/forecast/alerts", city=c) for c in CITIES]),
+        Scenario("/api/alerts", "GET",
+                 [_get("/api/alerts", city=[c, "Paris"], end=window_end, min_severity="High")
+                  for c in CITIES]),
+        Scenario("/api/alerts/stats", "GET", [_get("/api/alerts/stats")]),
+        Scenario("/api/forecast/statistics", "GET",
+                 [_get("/api/forecast/statistics", days=d) for d in (7, 365)]),
+        Scenario("/api/forecast/hourly", "GET",
+                 [_get("/api/forecast/hourly", days=2, city=c) for c in CITIES]
+                 + [_get("/api/forecast/hourly", days=30, city="London", bucket_hours=6),
+                    _get("/api/forecast/hourly", days=90, city="Tokyo", points=200)]),
+        Scenario("/api/forecast/stream", "GET",
+                 [_get("/api/forecast/stream", days=90, city=c, format="ndjson") for c in CITIES]),
+        Scenario("/api/forecast/detailed/stream", "GET",
+                 [_get("/api/forecast/detailed/stream", days=90, format="sse")]),
+        Scenario("/api/forecast/statistics/stream", "GET",
+                 [_get("/api/forecast/statistics/stream", days=365, format="ndjson")]),
+        Scenario("/api/forecast/export", "GET",
+                 [_get("/api/forecast/export", city=CITIES, days=30),
+                  _get("/api/forecast/export", all_cities=True, days=7, detailed=True)]),
+        Scenario("/api/forecast/request", "POST",
+                 [_post("/api/forecast/request", {"city": c, "days": 7}) for c in CITIES]
+                 + [_post("/api/forecast/request", {"days": 5})]),
+        Scenario("/api/forecast/batch", "POST",
+                 [_post("/api/forecast/batch", {"cities": CITIES[:4], "days": 3}),
+                  _post("/api/forecast/batch", {"all_cities": True, "days": 5})]),
+        Scenario("/api/forecast/query", "POST",
+                 [_post("/api/forecast/query", {"operations": [
+                     {"op": "current", "city": c}, {"op": "alerts", "city": c},
+                     {"op": "statistics", "city": c, "days": 30},
+                     {"op": "detailed", "city": c, "days": 7, "fields": ["temperature_c", "alerts"]}
+                 ]}) for c in CITIES]),
+        Scenario("/api/history/{city}", "POST",
+                 [_post(f"/api/history/{c}", history) for c in CITIES[:4]]),
+        Scenario("/api/history/{city}", "GET",
+                 [_get(f"/api/history/{c}", start="2024-03-01", end="2024-03-31") for c in CITIES[:4]]),
+        Scenario("/api/history/{city}/statistics", "GET",
+                 [_get(f"/api/history/{c}/statistics", start="2024-01-15", end="2024-11-20") for c in CITIES[:4]]
+                 + [_get("/api/history/London/statistics")]),
+        Scenario("/api/history/{city}/statistics/range", "GET",
+                 [_get(f"/api/history/{c}/statistics/range", last=[7, 30, 90, 365]) for c in CITIES[:4]]
+                 + [_get("/api/history/London/statistics/range", start="2024-02-01", end="2024-08-31")]),
+        Scenario("/api/cities/search", "GET",
+                 [_get("/api/cities/search", q=q) for q in ("lon", "tokyo", "pariss", "new yrok")]),
+        Scenario("/api/cities/nearest", "GET",
+                 [_get("/api/cities/nearest", lat=51.5, lon=-0.1, k=5),
+                  _get("/api/cities/nearest", lat=-33.9, lon=151.2, k=10)]),
+        Scenario("/api/forecast/health", "GET", [_get("/api/forecast/health")]),
+        Scenario("/api/forecast/cache", "GET", [_get("/api/forecast/cache")]),
+        Scenario("/api/forecast/provider", "GET", [_get("/api/forecast/provider")]),
+        Scenario("/api/forecast/prewarm", "GET", [_get("/api/forecast/prewarm")]),
+        Scenario("/api/forecast/executor", "GET", [_get("/api/forecast/executor")]),
+        Scenario("/api/forecast/admission", "GET", [_get("/api/forecast/admission")]),
+        Scenario("/api/forecast/history", "GET", [_get("/api/forecast/history")]),
+        Scenario("/api/forecast/profiling", "GET",
+                 [_get("/api/forecast/profiling"),
+                  {**_get("/api/forecast/profiling"), "headers": {"X-Profile": "cprofile"}}]),
+        # Runs after the scenario above has stored profiles
+        Scenario("/api/forecast/profiling/profiles/{profile_id}", "GET",
+                 [_get("/api/forecast/profiling/profiles/latest")]),
+        Scenario("/api/forecast/profiling/flame", "GET", [_get("/api/forecast/profiling/flame")]),
+        Scenario("/metrics", "GET", [_get("/metrics")]),
+        Scenario("/", "GET", [_get("/")]),
+        Scenario("/openapi.json", "GET", [_get("/openapi.json")]),
+        Scenario("/docs", "GET", [_get("/docs")]),
+        Scenario("/redoc", "GET", [_get("/redoc")])
+    ]
+
+
+# Routes that cannot be load-tested as request/response and why
+EXCLUDED = {
+    ("GET", "/api/alerts/subscribe"): "open-ended SSE subscription, never completes"
+}
+
+
+def uncovered_routes(app, covered: Sequence[Scenario]) -> List[str]:
+    """Application routes that no scenario (or exclusion) accounts for"""
+    names = {(s.method, s.route) for s in covered} | set(EXCLUDED)
+    missing = []
+    for route in app.routes:
+        for method in sorted(getattr(route, "methods", None) or ()):
+            if method != "HEAD" and (method, route.path) not in names:
+                missing.append(f"{method} {route.path}")
+    return missing
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    total: int,
+    concurrency: int
+) -> Dict[str, float]:
+    """Send total requests with the given concurrency and summarise them"""
+    variants = itertools.cycle(scenario.requests)
+    latencies: List[float] = []
+    errors = 0
+    sent = 0
+    received_bytes = 0
+
+    async def worker() -> None:
+        nonlocal errors, sent, received_bytes
+        while sent < total:
+            sent += 1
+            request = next(variants)
+            start = time.perf_counter()
+            response = await client.request(scenario.method, **request)
+            latencies.append(time.perf_counter() - start)
+            received_bytes += len(response.content)
+            if response.status_code >= 400:
+                errors += 1
+
+    # Warm caches and imports so the first measured request is not an outlier
+    for request in scenario.requests:
+        await client.request(scenario.method, **request)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    summary = results.latency_summary(latencies, "ms")
+    summary["requests_per_second"] = round(len(latencies) / elapsed, 1)
+    summary["errors"] = errors
+    summary["mean_response_bytes"] = round(received_bytes / len(latencies))
+    summary["peak_alloc_bytes"] = await allocation(client, scenario)
+    return summary
+
+
+async def allocation(client: httpx.AsyncClient, scenario: Scenario) -> int:
+    """Mean peak traced allocation of one request of each variant"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for request in scenario.requests:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            await client.request(scenario.method, **request)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return round(sum(peaks) / len(peaks))
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    from main import app
+
+    selected = [s for s in scenarios() if args.filter in s.route]
+    missing = uncovered_routes(app, scenarios())
+    if missing:
+        print(f"Warning: routes without a load scenario: {', '.join(missing)}")
+
+    measured: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        print(f"{'route':<42} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'errors':>6} {'peak alloc':>12}")
+        for scenario in selected:
+            summary = await run_scenario(client, scenario, args.requests, args.concurrency)
+            measured[scenario.name] = summary
+            print(f"{scenario.name:<42} {summary['requests_per_second']:>9,.0f} "
+                  f"{summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} {summary['p99_ms']:>8.2f} "
+                  f"{summary['errors']:>6} {summary['peak_alloc_bytes']:>12,}")
+    return measured
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=300, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--filter", default="", help="Only load routes containing this text")
+    results.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    measured = asyncio.run(run(args))
+    return results.finish(
+        args, "load", measured, requests=args.requests, concurrency=args.concurrency
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
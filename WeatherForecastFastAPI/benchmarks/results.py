@@ -0,0 +1,191 @@
+"""
+Shared result handling for the benchmark suites
+
+Results are saved as JSON documents of the form::
+
+    {"suite": "...", "environment": {...}, "results": {case: {metric: value}}}
+
+and two documents of the same suite can be compared to flag regressions.
+Metric names carry their direction: ``*_us``, ``*_ms`` and ``*_bytes`` are
+better when lower, ``*_per_second`` when higher; other metrics are reported
+but never flagged. Single worst samples (``max_*``) are too noisy to gate on
+and are only compared when asked for explicitly.
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+LOWER_IS_BETTER = ("_us", "_ms", "_bytes")
+HIGHER_IS_BETTER = ("_per_second",)
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Linear-interpolated percentile of already sorted values (p in 0-100)"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * p / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def latency_summary(seconds: Sequence[float], unit: str = "us") -> Dict[str, float]:
+    """p50/p95/p99, mean and max of latency samples, in microseconds or milliseconds"""
+    scale = 1e6 if unit == "us" else 1e3
+    values = sorted(value * scale for value in seconds)
+    return {
+        f"p50_{unit}": round(percentile(values, 50), 3),
+        f"p95_{unit}": round(percentile(values, 95), 3),
+        f"p99_{unit}": round(percentile(values, 99), 3),
+        f"mean_{unit}": round(sum(values) / len(values), 3) if values else 0.0,
+        f"max_{unit}": round(values[-1], 3) if values else 0.0
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """Where and when the results were produced"""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "commit": _git_commit()
+    }
+
+
+def save(path: str, suite: str, results: Dict[str, Dict[str, float]], **settings: Any) -> None:
+    """Write a results document"""
+    document = {
+        "suite": suite,
+        "environment": environment(),
+        "settings": settings,
+        "results": results
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+class Change(NamedTuple):
+    case: str
+    metric: str
+    baseline: float
+    current: float
+    ratio: float
+    regression: bool
+
+
+def _direction(metric: str) -> int:
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    return 0
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    metrics: Optional[Sequence[str]] = None
+) -> List[Change]:
+    """
+    Compare two results documents case by case
+
+    Args:
+        baseline: Saved baseline document
+        current: Newly produced document
+        threshold: Relative worsening (0.10 = 10%) that counts as a regression
+        metrics: Only compare these metrics (default: every directional metric)
+
+    Returns:
+        One change per (case, metric) present in both documents
+    """
+    if baseline.get("suite") != current.get("suite"):
+        raise ValueError(
+            f"Cannot compare suite '{current.get('suite')}' with baseline suite '{baseline.get('suite')}'"
+        )
+    changes = []
+    for case, values in current["results"].items():
+        base_values = baseline["results"].get(case)
+        if base_values is None:
+            continue
+        for metric, value in values.items():
+            direction = _direction(metric)
+            if direction == 0:
+                continue
+            if metrics and metric not in metrics:
+                continue
+            if not metrics and metric.startswith("max_"):
+                continue
+            base = base_values.get(metric)
+            if not isinstance(base, (int, float)) or base <= 0:
+                continue
+            ratio = value / base
+            worse = ratio < 1 - threshold if direction > 0 else ratio > 1 + threshold
+            changes.append(Change(case, metric, base, value, ratio, worse))
+    return changes
+
+
+def report(changes: List[Change], threshold: float) -> int:
+    """
+    Print a comparison and return the number of regressions
+
+    Only regressions and improvements beyond the threshold are listed.
+    """
+    regressions = [c for c in changes if c.regression]
+    notable = [c for c in changes if c.regression or abs(c.ratio - 1) > threshold]
+    if notable:
+        print(f"\n{'case':<48} {'metric':<18} {'baseline':>12} {'current':>12} {'change':>8}")
+        for change in sorted(notable, key=lambda c: (not c.regression, c.case, c.metric)):
+            flag = "  REGRESSION" if change.regression else ""
+            print(f"{change.case:<48} {change.metric:<18} {change.baseline:>12,.2f} "
+                  f"{change.current:>12,.2f} {change.ratio - 1:>+7.1%}{flag}")
+    print(f"\n{len(changes)} metrics compared, {len(regressions)} regressions "
+          f"(threshold {threshold:.0%})")
+    return len(regressions)
+
+
+def add_arguments(parser) -> None:
+    """Common --output / --baseline / --threshold options"""
+    parser.add_argument("--output", metavar="PATH", help="Save results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against a saved results file")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="Relative worsening flagged as a regression (default: 0.10)"
+    )
+
+
+def finish(args, suite: str, results: Dict[str, Dict[str, float]], **settings: Any) -> int:
+    """Save and/or compare results as requested; returns the process exit code"""
+    if args.output:
+        save(args.output, suite, results, **settings)
+        print(f"\nResults saved to {args.output}")
+    if args.baseline:
+        current = {"suite": suite, "results": results}
+        if report(compare(load(args.baseline), current, args.threshold), args.threshold):
+            return 1
+    return 0
@@ -0,0 +1,371 @@
+"""
+In-process forecast cache
+
+A bounded LRU cache with per-entry TTL, and a caching facade that sits in
+front of WeatherForecastService. Generation is deterministic per (city, date),
+so repeated requests for the same city and day are served from memory.
+City forecasts from the provider are additionally served stale-while-revalidate.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+from engine import city_key
+from models import WeatherStatistics
+from providers import SingleFlight
+from records import AlertRecord, DetailedForecastRecord, ForecastRecord, HourlyRecord, SparseRecord
+from service import WeatherForecastService
+
+
+_MISSING = object()
+
+
+def _fieldset(fields: Optional[Sequence[str]]) -> Tuple:
+    """Cache key suffix of a sparse fieldset; full records keep their plain key"""
+    return () if fields is None else (tuple(fields),)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a fixed TTL
+
+    Args:
+        max_entries: Maximum number of entries before the least recently used is evicted
+        ttl: Seconds an entry stays fresh
+        stale_ttl: Seconds an expired entry is retained for stale reads via lookup()
+        timer: Monotonic clock, injectable for testing
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        stale_ttl: float = 0.0,
+        timer: Callable[[], float] = time.monotonic
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._timer = timer
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the fresh value for key, or default on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                now = self._timer()
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._expire(key, expires_at, now)
+            self.misses += 1
+            return default
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[Any, bool]]:
+        """
+        Return (value, fresh) for key, including expired entries still inside
+        the stale window, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                now = self._timer()
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, True
+                if now < expires_at + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return value, False
+                self._expire(key, expires_at, now)
+            self.misses += 1
+            return None
+
+    def remaining_ttl(self, key: Hashable) -> Optional[float]:
+        """Seconds until key expires (negative once stale), or None if absent"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0] - self._timer()
+
+    def _expire(self, key: Hashable, expires_at: float, now: float) -> None:
+        # Expired entries are kept for stale reads until the stale window ends
+        if now >= expires_at + self.stale_ttl:
+            del self._entries[key]
+            self.expirations += 1
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = (self._timer() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss
+
+        The factory runs outside the lock, so concurrent misses for the same
+        key may each compute the value; the last one stored wins.
+        """
+        sentinel = _MISSING
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop a single entry; returns whether it was present"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "stale_ttl_seconds": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class CachedWeatherForecastService:
+    """
+    Caching facade with the same interface as WeatherForecastService
+
+    Cache keys include the calendar day (and hour for current conditions),
+    so entries roll over naturally when the underlying forecast changes.
+    Attributes not overridden here are delegated to the wrapped service.
+
+    City forecasts fetched from the provider are served stale-while-revalidate:
+    an expired entry inside the cache's stale window is returned immediately
+    while a single background task refreshes it.
+
+    call() is the non-blocking form of the cached methods: a hit is returned
+    directly, and a miss is generated through the executor (off the event
+    loop when the call is expensive), with concurrent identical misses
+    coalesced into one generation.
+
+    Args:
+        service: Wrapped service
+        cache: Cache storage
+        tracker: Optional object whose record(city, days) is called on every
+            city forecast request (used to find the hot set for prewarming)
+        executor: Optional ServiceExecutor running call() misses; without it
+            they run inline
+        history: Optional object whose submit(city, forecasts) is called with
+            every city forecast fetched from the provider (the forecast history)
+    """
+
+    # Cache key (less the calendar day) of every cached service method
+    KEYS: Dict[str, Callable[..., Tuple]] = {
+        # Sparse fieldsets are canonical tuples (engine.response_fields) or None
+        "get_forecast": lambda days=5, fields=None: ("forecast", None, days) + _fieldset(fields),
+        "get_forecast_by_city": lambda city, days=5: ("forecast", city_key(city), days),
+        "get_current_weather": lambda city=None, fields=None: (
+            "current", city_key(city), datetime.now().hour
+        ) + _fieldset(fields),
+        # Keyed on the exact timestamp the caller asked for
+        "get_detailed_forecast": lambda date, city=None, fields=None: (
+            "detailed", city_key(city), date
+        ) + _fieldset(fields),
+        "get_detailed_forecasts": lambda days=5, fields=None: ("detailed_multi", None, days) + _fieldset(fields),
+        "get_weather_alerts": lambda city=None: ("alerts", city_key(city), datetime.now().hour),
+        "get_weather_statistics": lambda days=7: ("statistics", None, days),
+        # Views may include current conditions, which change with the hour
+        "get_forecast_views": lambda city, views: ("views", city_key(city), tuple(views), datetime.now().hour),
+        # Hourly series start at the next full hour
+        "get_hourly_forecast": lambda days=1, city=None, bucket_hours=1, points=None, metric="temperature_c": (
+            "hourly", city_key(city), days, bucket_hours, points, metric, datetime.now().hour
+        )
+    }
+
+    def __init__(
+        self,
+        service: WeatherForecastService,
+        cache: Optional[TTLCache] = None,
+        tracker: Optional[Any] = None,
+        executor: Optional[Any] = None,
+        history: Optional[Any] = None
+    ):
+        self.service = service
+        self.cache = cache if cache is not None else TTLCache()
+        self.tracker = tracker
+        self.executor = executor
+        self.history = history
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self._flights = SingleFlight()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.service, name)
+
+    def key(self, name: str, *args: Any) -> Tuple:
+        """Cache key of a cached service method call"""
+        return (datetime.now().date(),) + self.KEYS[name](*args)
+
+    def _cached(self, name: str, *args: Any) -> Any:
+        return self.cache.get_or_set(
+            self.key(name, *args),
+            lambda: getattr(self.service, name)(*args)
+        )
+
+    async def call(self, name: str, *args: Any) -> Any:
+        """
+        Await a cached service method without blocking the event loop on a miss
+
+        Args:
+            name: Cached method name (a key of KEYS)
+            *args: Positional arguments of the method
+
+        Returns:
+            The same value the synchronous method returns
+        """
+        key = self.key(name, *args)
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        async def generate() -> Any:
+            if self.executor is None:
+                result = getattr(self.service, name)(*args)
+            else:
+                result = await self.executor.run(name, *args)
+            self.cache.set(key, result)
+            return result
+
+        return await self._flights.do(key, generate)
+
+    def get_forecast(
+        self,
+        days: int = 5,
+        fields: Optional[Sequence[str]] = None
+    ) -> Union[List[ForecastRecord], List[SparseRecord]]:
+        return self._cached("get_forecast", days, fields)
+
+    def get_forecast_by_city(self, city: str, days: int = 5) -> List[ForecastRecord]:
+        return self._cached("get_forecast_by_city", city, days)
+
+    @staticmethod
+    def forecast_key(city: Optional[str], days: int) -> Tuple:
+        """Cache key of a city forecast horizon"""
+        return (datetime.now().date(), "forecast", city_key(city), days)
+
+    async def fetch_forecast_by_city(self, city: str, days: int = 5) -> List[ForecastRecord]:
+        if self.tracker is not None:
+            self.tracker.record(city, days)
+
+        found = self.cache.lookup(self.forecast_key(city, days))
+        if found is None:
+            return await self.refresh_forecast_by_city(city, days)
+
+        forecasts, fresh = found
+        if not fresh:
+            self._refresh_in_background(city, days)
+        return forecasts
+
+    async def refresh_forecast_by_city(self, city: str, days: int = 5) -> List[ForecastRecord]:
+        """Fetch a city forecast from the provider and store it, bypassing the cache"""
+        forecasts = await self.service.fetch_forecast_by_city(city, days)
+        self.cache.set(self.forecast_key(city, days), forecasts)
+        if self.history is not None:
+            self.history.submit(city, forecasts)
+        return forecasts
+
+    @property
+    def refreshing(self) -> int:
+        """Number of background stale-while-revalidate refreshes in flight"""
+        return len(self._refreshing)
+
+    def _refresh_in_background(self, city: str, days: int) -> None:
+        key = self.forecast_key(city, days)
+        if key in self._refreshing:
+            return
+
+        def done(task: asyncio.Task) -> None:
+            self._refreshing.pop(key, None)
+            if not task.cancelled():
+                # Failures leave the stale entry in place; retrieve to avoid warnings
+                task.exception()
+
+        task = asyncio.ensure_future(self.refresh_forecast_by_city(city, days))
+        self._refreshing[key] = task
+        task.add_done_callback(done)
+
+    def get_current_weather(
+        self,
+        city: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Union[ForecastRecord, SparseRecord]:
+        return self._cached("get_current_weather", city, fields)
+
+    def get_detailed_forecast(
+        self,
+        date: datetime,
+        city: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Union[DetailedForecastRecord, SparseRecord]:
+        return self._cached("get_detailed_forecast", date, city, fields)
+
+    def get_detailed_forecasts(
+        self,
+        days: int = 5,
+        fields: Optional[Sequence[str]] = None
+    ) -> Union[List[DetailedForecastRecord], List[SparseRecord]]:
+        return self._cached("get_detailed_forecasts", days, fields)
+
+    def get_forecast_views(
+        self,
+        city: Optional[str],
+        views: Sequence[Tuple[str, int, Optional[Sequence[str]]]]
+    ) -> List[Any]:
+        return self._cached("get_forecast_views", city, views)
+
+    def get_weather_alerts(self, city: Optional[str] = None) -> List[AlertRecord]:
+        return self._cached("get_weather_alerts", city)
+
+    def get_weather_statistics(self, days: int = 7) -> WeatherStatistics:
+        return self._cached("get_weather_statistics", days)
+
+    def get_hourly_forecast(
+        self,
+        days: int = 1,
+        city: Optional[str] = None,
+        bucket_hours: int = 1,
+        points: Optional[int] = None,
+        metric: str = "temperature_c"
+    ) -> List[HourlyRecord]:
+        return self._cached("get_hourly_forecast", days, city, bucket_hours, points, metric)
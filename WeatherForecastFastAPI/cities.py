@@ -0,0 +1,479 @@
+"""
+City index
+
+A canonical city registry with normalized keys, a prefix trie for
+autocomplete, a symmetric-delete index for bounded edit-distance fuzzy
+matching and a k-d tree for
+nearest-city queries by latitude/longitude. Resolving user input to a
+canonical city before generation means misspellings and odd casing still
+hit the forecast caches.
+"""
+import csv
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Largest edit distance supported by fuzzy matching
+MAX_FUZZY_DISTANCE = 2
+
+
+class City(NamedTuple):
+    """A canonical city"""
+    name: str
+    country: str
+    latitude: float
+    longitude: float
+
+
+# Coordinates of the built-in cities; WeatherForecastService.CITIES come first
+KNOWN_CITIES = [
+    City("New York", "United States", 40.7128, -74.0060),
+    City("London", "United Kingdom", 51.5074, -0.1278),
+    City("Tokyo", "Japan", 35.6762, 139.6503),
+    City("Paris", "France", 48.8566, 2.3522),
+    City("Sydney", "Australia", -33.8688, 151.2093),
+    City("Mumbai", "India", 19.0760, 72.8777),
+    City("Toronto", "Canada", 43.6532, -79.3832),
+    City("Berlin", "Germany", 52.5200, 13.4050),
+    City("Singapore", "Singapore", 1.3521, 103.8198),
+    City("Dubai", "United Arab Emirates", 25.2048, 55.2708),
+    City("Los Angeles", "United States", 34.0522, -118.2437),
+    City("Chicago", "United States", 41.8781, -87.6298),
+    City("San Francisco", "United States", 37.7749, -122.4194),
+    City("Mexico City", "Mexico", 19.4326, -99.1332),
+    City("São Paulo", "Brazil", -23.5505, -46.6333),
+    City("Buenos Aires", "Argentina", -34.6037, -58.3816),
+    City("Madrid", "Spain", 40.4168, -3.7038),
+    City("Rome", "Italy", 41.9028, 12.4964),
+    City("Amsterdam", "Netherlands", 52.3676, 4.9041),
+    City("Zürich", "Switzerland", 47.3769, 8.5417),
+    City("Stockholm", "Sweden", 59.3293, 18.0686),
+    City("Moscow", "Russia", 55.7558, 37.6173),
+    City("Istanbul", "Turkey", 41.0082, 28.9784),
+    City("Cairo", "Egypt", 30.0444, 31.2357),
+    City("Lagos", "Nigeria", 6.5244, 3.3792),
+    City("Nairobi", "Kenya", -1.2921, 36.8219),
+    City("Johannesburg", "South Africa", -26.2041, 28.0473),
+    City("Delhi", "India", 28.7041, 77.1025),
+    City("Bangkok", "Thailand", 13.7563, 100.5018),
+    City("Hong Kong", "China", 22.3193, 114.1694),
+    City("Shanghai", "China", 31.2304, 121.4737),
+    City("Beijing", "China", 39.9042, 116.4074),
+    City("Seoul", "South Korea", 37.5665, 126.9780),
+    City("Melbourne", "Australia", -37.8136, 144.9631),
+    City("Auckland", "New Zealand", -36.8485, 174.7633),
+]
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(name: str) -> str:
+    """
+    Normalized lookup key for a city name
+
+    Strips accents, folds case and collapses punctuation and whitespace, so
+    "  são-PAULO " and "Sao Paulo" share a key.
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD.sub(" ", stripped.casefold()).split())
+
+
+def _unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class _TrieNode:
+    __slots__ = ("children", "city_ids", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Cities whose key ends exactly at this node
+        self.city_ids: List[int] = []
+        # Best-ranked cities anywhere in this subtree, for O(prefix) autocomplete
+        self.top: List[Tuple[Tuple[int, str], int]] = []
+
+
+class CityTrie:
+    """
+    Prefix trie over normalized city keys
+
+    Every node caches the best-ranked completions of its subtree (shortest
+    names first), so autocomplete costs O(len(prefix)) regardless of size.
+
+    Args:
+        top_k: Completions cached per node
+    """
+
+    def __init__(self, top_k: int = 10):
+        self.root = _TrieNode()
+        self.top_k = top_k
+
+    def insert(self, key: str, city_id: int) -> None:
+        rank = ((len(key), key), city_id)
+        node = self.root
+        self._offer(node, rank)
+        for ch in key:
+            node = node.children.setdefault(ch, _TrieNode())
+            self._offer(node, rank)
+        node.city_ids.append(city_id)
+
+    def _offer(self, node: _TrieNode, rank: Tuple[Tuple[int, str], int]) -> None:
+        top = node.top
+        if len(top) < self.top_k or rank < top[-1]:
+            top.append(rank)
+            top.sort()
+            del top[self.top_k:]
+
+    def complete(self, prefix: str, limit: int) -> List[int]:
+        """City ids whose key starts with prefix, best-ranked first"""
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return [city_id for _, city_id in node.top[:limit]]
+
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    """Every string obtained by deleting up to distance characters from word"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Levenshtein distance, or max_distance + 1 once it is known to exceed it
+
+    Only the diagonal band of width 2 * max_distance + 1 is computed, and the
+    scan stops as soon as a whole row exceeds the bound.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    la, lb = len(a), len(b)
+    over = max_distance + 1
+    if lb - la > max_distance:
+        return over
+
+    previous = [j if j <= max_distance else over for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        ch = a[i - 1]
+        current = [over] * (lb + 1)
+        current[0] = i if i <= max_distance else over
+        best = current[0]
+        for j in range(max(1, i - max_distance), min(lb, i + max_distance) + 1):
+            value = previous[j - 1] + (ch != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            current[j] = value if value < over else over
+            if value < best:
+                best = value
+        if best > max_distance:
+            return over
+        previous = current
+    return previous[lb]
+
+
+class DeletionIndex:
+    """
+    Symmetric-delete index for bounded edit-distance lookups (SymSpell)
+
+    Two strings within d edits share a string reachable from both by at most
+    d deletions, so candidates are found with a handful of dictionary probes
+    and then verified with a banded Levenshtein. Only the first prefix_length
+    characters are indexed, which bounds memory and the number of deletes.
+
+    Args:
+        max_distance: Largest edit distance that can be queried
+        prefix_length: Characters of each key that are indexed
+    """
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        # delete variant -> city id, or list of ids when shared (most are unique)
+        self._index: Dict[str, Union[int, List[int]]] = {}
+
+    def insert(self, key: str, city_id: int) -> None:
+        index = self._index
+        for variant in _deletes(key[:self.prefix_length], self.max_distance):
+            current = index.get(variant)
+            if current is None:
+                index[variant] = city_id
+            elif isinstance(current, int):
+                index[variant] = [current, city_id]
+            else:
+                current.append(city_id)
+
+    def candidates(self, key: str, max_distance: int) -> Set[int]:
+        """City ids whose indexed prefix may be within max_distance of key's"""
+        found: Set[int] = set()
+        index = self._index
+        for variant in _deletes(key[:self.prefix_length], max_distance):
+            ids = index.get(variant)
+            if ids is None:
+                continue
+            if isinstance(ids, int):
+                found.add(ids)
+            else:
+                found.update(ids)
+        return found
+
+
+class _KDNode:
+    __slots__ = ("point", "city_id", "axis", "left", "right")
+
+    def __init__(self, point, city_id, axis, left, right):
+        self.point = point
+        self.city_id = city_id
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+class CityKDTree:
+    """
+    k-d tree over cities as 3-D unit vectors
+
+    Euclidean (chord) distance between unit vectors is monotonic in
+    great-circle distance, so nearest neighbours are correct everywhere on
+    the globe, including across the antimeridian and near the poles.
+    """
+
+    def __init__(self, points: List[Tuple[Tuple[float, float, float], int]]):
+        self.root = self._build(points, 0)
+
+    def _build(self, points, depth) -> Optional[_KDNode]:
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda item: item[0][axis])
+        mid = len(points) // 2
+        point, city_id = points[mid]
+        return _KDNode(
+            point, city_id, axis,
+            self._build(points[:mid], depth + 1),
+            self._build(points[mid + 1:], depth + 1)
+        )
+
+    def nearest(self, target: Tuple[float, float, float], k: int) -> List[int]:
+        """City ids of the k points nearest to target, nearest first"""
+        # Max-heap of (-squared distance, city_id)
+        heap: List[Tuple[float, int]] = []
+        self._search(self.root, target, k, heap)
+        return [city_id for _, city_id in sorted(heap, reverse=True)]
+
+    def _search(self, node: Optional[_KDNode], target, k: int, heap) -> None:
+        # Visit the near side first and the far side only if the splitting
+        # plane is closer than the current k-th best
+        if node is None:
+            return
+        px, py, pz = node.point
+        dist = (px - target[0]) ** 2 + (py - target[1]) ** 2 + (pz - target[2]) ** 2
+        if len(heap) < k:
+            heapq.heappush(heap, (-dist, node.city_id))
+        elif dist < -heap[0][0]:
+            heapq.heapreplace(heap, (-dist, node.city_id))
+
+        diff = target[node.axis] - node.point[node.axis]
+        near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+        self._search(near, target, k, heap)
+        if len(heap) < k or diff * diff < -heap[0][0]:
+            self._search(far, target, k, heap)
+
+
+class CityMatchResult(NamedTuple):
+    """A city returned by a search"""
+    city: City
+    match: str
+    distance: int
+
+
+class CityRegistry:
+    """
+    Canonical city registry with prefix, fuzzy and nearest-city lookups
+
+    Cities can be added at any time; the k-d tree is rebuilt lazily on the
+    next nearest-city query after a change.
+
+    Args:
+        cities: Initial cities
+    """
+
+    def __init__(self, cities: Iterable[City] = ()):
+        self.cities: List[City] = []
+        self._by_key: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._trie = CityTrie()
+        self._deletions = DeletionIndex(max_distance=MAX_FUZZY_DISTANCE)
+        self._kdtree: Optional[CityKDTree] = None
+        self._lock = threading.Lock()
+        for city in cities:
+            self.add(city)
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def add(self, city: City) -> City:
+        """Register a city; returns the canonical entry if the key already exists"""
+        key = normalize(city.name)
+        if not key:
+            raise ValueError("City name cannot be empty")
+        with self._lock:
+            existing = self._by_key.get(key)
+            if existing is not None:
+                return self.cities[existing]
+            city_id = len(self.cities)
+            self.cities.append(city)
+            self._keys.append(key)
+            self._by_key[key] = city_id
+            self._trie.insert(key, city_id)
+            self._deletions.insert(key, city_id)
+            self._kdtree = None
+        return city
+
+    def get(self, name: str) -> Optional[City]:
+        """Exact lookup by normalized name"""
+        city_id = self._by_key.get(normalize(name))
+        return None if city_id is None else self.cities[city_id]
+
+    @staticmethod
+    def default_max_distance(key: str) -> int:
+        """Edit budget scaled to the query length (short names tolerate fewer typos)"""
+        if len(key) <= 3:
+            return 0
+        if len(key) <= 6:
+            return 1
+        return 2
+
+    def resolve(self, name: str) -> Optional[City]:
+        """
+        Resolve free-form input to a canonical city
+
+        Exact normalized matches win; otherwise the single closest fuzzy match
+        within the default edit budget is used. Ambiguous or unknown input
+        resolves to None.
+        """
+        city = self.get(name)
+        if city is not None:
+            return city
+        key = normalize(name)
+        matches = self.fuzzy(key, self.default_max_distance(key))
+        if not matches or (len(matches) > 1 and matches[0][0] == matches[1][0]):
+            return None
+        return self.cities[matches[0][1]]
+
+    def fuzzy(self, key: str, max_distance: int) -> List[Tuple[int, int]]:
+        """
+        Registered cities within max_distance edits of a normalized key
+
+        Returns:
+            List of (distance, city_id), closest first
+        """
+        max_distance = min(max_distance, MAX_FUZZY_DISTANCE)
+        matches = []
+        for city_id in self._deletions.candidates(key, max_distance):
+            distance = bounded_levenshtein(key, self._keys[city_id], max_distance)
+            if distance <= max_distance:
+                matches.append((distance, city_id))
+        matches.sort()
+        return matches
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        max_distance: Optional[int] = None
+    ) -> List[CityMatchResult]:
+        """
+        Autocomplete and typo-tolerant search
+
+        Returns exact matches first, then prefix completions, then fuzzy
+        matches ordered by edit distance.
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        if max_distance is None:
+            max_distance = self.default_max_distance(key)
+
+        results: List[CityMatchResult] = []
+        seen = set()
+
+        def add(city_id: int, match: str, distance: int) -> None:
+            if city_id not in seen and len(results) < limit:
+                seen.add(city_id)
+                results.append(CityMatchResult(self.cities[city_id], match, distance))
+
+        exact = self._by_key.get(key)
+        if exact is not None:
+            add(exact, "exact", 0)
+        for city_id in self._trie.complete(key, limit):
+            add(city_id, "prefix", 0)
+        if len(results) < limit and max_distance > 0:
+            for distance, city_id in self.fuzzy(key, max_distance):
+                add(city_id, "fuzzy", distance)
+        return results
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5) -> List[Tuple[City, float]]:
+        """
+        The k cities closest to a coordinate
+
+        Returns:
+            List of (city, great-circle distance in km), nearest first
+        """
+        tree = self._kdtree
+        if tree is None:
+            with self._lock:
+                points = [
+                    (_unit_vector(city.latitude, city.longitude), city_id)
+                    for city_id, city in enumerate(self.cities)
+                ]
+                tree = self._kdtree = CityKDTree(points)
+
+        city_ids = tree.nearest(_unit_vector(latitude, longitude), k)
+        return [
+            (city, round(haversine_km(latitude, longitude, city.latitude, city.longitude), 2))
+            for city in (self.cities[city_id] for city_id in city_ids)
+        ]
+
+    def load_csv(self, path: str) -> int:
+        """
+        Add cities from a CSV file with name, country, latitude, longitude columns
+
+        Returns:
+            Number of rows read
+        """
+        count = 0
+        with open(path, newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                self.add(City(
+                    row["name"],
+                    row.get("country", ""),
+                    float(row["latitude"]),
+                    float(row["longitude"])
+                ))
+                count += 1
+        return count
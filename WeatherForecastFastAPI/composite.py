@@ -0,0 +1,93 @@
+"""
+Composite queries: several forecast operations in one round trip
+
+A composite query is a list of heterogeneous operations (current conditions,
+forecasts, detailed forecasts, statistics, alerts), answered together.
+Statistics are of the operation's city, unlike /api/forecast/statistics,
+which has no city; without a city they are the endpoint's.
+Operations answered from generated forecasts are grouped by city, and each
+group is one service call (get_forecast_views) that generates the city's
+forecast once, for today and the longest horizon of the group, and reads
+every operation of the group from it. City forecasts, which come from the
+provider, run as operations of their own, and alerts are read from the
+alert store, as at /api/forecast/alerts. Groups and single
+operations run concurrently, and a failing one is reported per operation
+instead of failing the query.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from engine import city_key
+from records import select_fields
+
+
+# Days an operation covers when the query does not say
+DEFAULT_DAYS = {"current": 0, "forecast": 5, "detailed": 5, "statistics": 7, "alerts": 0}
+
+
+class Operation(NamedTuple):
+    """A validated operation: canonical city, days and sparse fieldset resolved"""
+    op: str
+    city: Optional[str]
+    days: int
+    fields: Optional[Tuple[str, ...]] = None
+
+    @property
+    def generated(self) -> bool:
+        """Whether the operation is answered from generated forecasts (and can share a generation)"""
+        if self.op == "forecast":
+            # As at /api/forecast; a city forecast comes from the provider
+            return not self.city
+        return self.op in ("current", "detailed", "statistics")
+
+
+async def run_query(
+    service: Any,
+    operations: Sequence[Operation],
+    alerts: Callable[[Optional[str]], List[Any]]
+) -> Tuple[List[Any], Dict[int, str], int]:
+    """
+    Run the operations of a composite query concurrently
+
+    Args:
+        service: CachedWeatherForecastService
+        operations: Operations in request order
+        alerts: Active alerts of a city (AlertMonitor.active)
+
+    Returns:
+        Tuple of (results in operation order, None for failed operations,
+        error messages keyed by operation index, number of generation groups)
+    """
+    groups: Dict[str, List[int]] = {}
+    jobs: List[Tuple[List[int], Awaitable[List[Any]]]] = []
+    for index, operation in enumerate(operations):
+        if operation.generated:
+            groups.setdefault(city_key(operation.city), []).append(index)
+        else:
+            jobs.append(([index], _run_single(service, operation, alerts)))
+
+    for indexes in groups.values():
+        views = tuple((operations[i].op, operations[i].days, operations[i].fields) for i in indexes)
+        jobs.append((indexes, service.call("get_forecast_views", operations[indexes[0]].city, views)))
+
+    outcomes = await asyncio.gather(*(job for _, job in jobs), return_exceptions=True)
+    results: List[Any] = [None] * len(operations)
+    errors: Dict[int, str] = {}
+    for (indexes, _), outcome in zip(jobs, outcomes):
+        for position, index in enumerate(indexes):
+            if isinstance(outcome, Exception):
+                errors[index] = str(outcome) or type(outcome).__name__
+            else:
+                results[index] = outcome[position]
+    return results, errors, len(groups)
+
+
+async def _run_single(
+    service: Any,
+    operation: Operation,
+    alerts: Callable[[Optional[str]], List[Any]]
+) -> List[Any]:
+    if operation.op == "alerts":
+        return [alerts(operation.city)]
+    forecasts = await service.fetch_forecast_by_city(operation.city, operation.days)
+    return [forecasts if operation.fields is None else select_fields(forecasts, operation.fields)]
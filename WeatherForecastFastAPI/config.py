@@ -0,0 +1,120 @@
+"""
+Runtime configuration
+
+Every setting can be overridden with an environment variable of the same
+name prefixed with ``WEATHER_``.
+"""
+import os
+
+
+def _env(name: str, default: str) -> str:
+    return os.environ.get(f"WEATHER_{name}", default)
+
+
+# Global seed for deterministic forecast generation
+FORECAST_SEED = int(_env("FORECAST_SEED", "0"))
+
+# In-process response cache
+CACHE_MAX_ENTRIES = int(_env("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(_env("CACHE_TTL_SECONDS", "300"))
+# How long an expired city forecast may still be served while it is refreshed
+CACHE_STALE_SECONDS = float(_env("CACHE_STALE_SECONDS", "600"))
+
+# Serialized response bodies kept for ETag / 304 handling
+RESPONSE_CACHE_MAX_ENTRIES = int(_env("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+
+# Multi-city batch endpoint
+BATCH_MAX_CITIES = int(_env("BATCH_MAX_CITIES", "100"))
+BATCH_CONCURRENCY = int(_env("BATCH_CONCURRENCY", "8"))
+
+# Most operations of one composite query
+QUERY_MAX_OPERATIONS = int(_env("QUERY_MAX_OPERATIONS", "32"))
+
+# Longest horizon accepted by the streaming endpoints
+STREAM_MAX_DAYS = int(_env("STREAM_MAX_DAYS", "3650"))
+
+# Longest hourly series, in days (24 points each before aggregation)
+HOURLY_MAX_DAYS = int(_env("HOURLY_MAX_DAYS", "90"))
+
+# Bulk export: cities per export and rows generated/written per batch
+EXPORT_MAX_CITIES = int(_env("EXPORT_MAX_CITIES", "1000"))
+EXPORT_BATCH_ROWS = int(_env("EXPORT_BATCH_ROWS", "65536"))
+
+# Forecast provider: "generated" (local, default) or "http" (upstream API)
+PROVIDER = _env("PROVIDER", "generated")
+UPSTREAM_URL = _env("UPSTREAM_URL", "")
+UPSTREAM_MAX_CONNECTIONS = int(_env("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_KEEPALIVE = int(_env("UPSTREAM_MAX_KEEPALIVE", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(_env("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+UPSTREAM_TIMEOUT_SECONDS = float(_env("UPSTREAM_TIMEOUT_SECONDS", "5"))
+
+# Background prewarming of hot city forecasts
+PREWARM_ENABLED = _env("PREWARM_ENABLED", "true").lower() in ("1", "true", "yes")
+PREWARM_HOT_SET_SIZE = int(_env("PREWARM_HOT_SET_SIZE", "20"))
+PREWARM_INTERVAL_SECONDS = float(_env("PREWARM_INTERVAL_SECONDS", "30"))
+PREWARM_REFRESH_AHEAD_SECONDS = float(_env("PREWARM_REFRESH_AHEAD_SECONDS", "60"))
+PREWARM_WORKERS = int(_env("PREWARM_WORKERS", "4"))
+PREWARM_HALF_LIFE_SECONDS = float(_env("PREWARM_HALF_LIFE_SECONDS", "600"))
+
+# Optional CSV (name, country, latitude, longitude) of extra cities to index
+CITIES_FILE = _env("CITIES_FILE", "")
+
+# In-memory alert store and push subscriptions
+ALERTS_REFRESH_INTERVAL_SECONDS = float(_env("ALERTS_REFRESH_INTERVAL_SECONDS", "60"))
+ALERTS_RETENTION_SECONDS = float(_env("ALERTS_RETENTION_SECONDS", "86400"))
+ALERTS_SUBSCRIBER_QUEUE = int(_env("ALERTS_SUBSCRIBER_QUEUE", "256"))
+ALERTS_HEARTBEAT_SECONDS = float(_env("ALERTS_HEARTBEAT_SECONDS", "15"))
+
+# Service call executor: pool sizes, admission bound, timeout, and the
+# estimated costs (generated rows) that move a call to threads / processes
+EXECUTOR_THREAD_WORKERS = int(_env("EXECUTOR_THREAD_WORKERS", "4"))
+EXECUTOR_PROCESS_WORKERS = int(_env("EXECUTOR_PROCESS_WORKERS", "0"))
+EXECUTOR_MAX_QUEUE = int(_env("EXECUTOR_MAX_QUEUE", "64"))
+EXECUTOR_TIMEOUT_SECONDS = float(_env("EXECUTOR_TIMEOUT_SECONDS", "10"))
+EXECUTOR_THREAD_COST = int(_env("EXECUTOR_THREAD_COST", "64"))
+EXECUTOR_PROCESS_COST = int(_env("EXECUTOR_PROCESS_COST", "2048"))
+
+# Admission control: adaptive limit on the cost units of requests in flight
+# (one unit is about one cheap request) and the cap on one request's cost
+ADMISSION_ENABLED = _env("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_INITIAL_LIMIT = float(_env("ADMISSION_INITIAL_LIMIT", "128"))
+ADMISSION_MIN_LIMIT = float(_env("ADMISSION_MIN_LIMIT", "8"))
+ADMISSION_MAX_LIMIT = float(_env("ADMISSION_MAX_LIMIT", "1024"))
+ADMISSION_MAX_REQUEST_COST = float(_env("ADMISSION_MAX_REQUEST_COST", "32"))
+
+# Serving: address and worker processes (python main.py); with more than one
+# worker the forecast cache lives in a file shared by all of them
+HOST = _env("HOST", "0.0.0.0")
+PORT = int(_env("PORT", "8000"))
+WORKERS = int(_env("WORKERS", "1"))
+SHARED_CACHE_PATH = _env("SHARED_CACHE_PATH", "")
+SHARED_CACHE_SLOT_BYTES = int(_env("SHARED_CACHE_SLOT_BYTES", "16384"))
+
+# Forecast history: SQLite file (empty, the default: kept in memory), whether
+# forecasts fetched from the provider are recorded, the write-behind queue
+# bound and the longest range of raw days returned at once
+HISTORY_PATH = _env("HISTORY_PATH", "")
+HISTORY_RECORD = _env("HISTORY_RECORD", "true").lower() in ("1", "true", "yes")
+HISTORY_MAX_PENDING = int(_env("HISTORY_MAX_PENDING", "1024"))
+HISTORY_MAX_DAYS = int(_env("HISTORY_MAX_DAYS", "3660"))
+# Cities whose window statistics index is kept in memory, and the most
+# windows one range statistics request may ask for
+HISTORY_INDEX_MAX_CITIES = int(_env("HISTORY_INDEX_MAX_CITIES", "64"))
+HISTORY_MAX_WINDOWS = int(_env("HISTORY_MAX_WINDOWS", "32"))
+
+# Prebuilt OpenAPI document, read at startup and rewritten when stale
+# (empty: generate on first use and keep it in memory)
+OPENAPI_CACHE_PATH = _env(
+    "OPENAPI_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "openapi.cache.json")
+)
+
+# Profiling: whether requests may ask for a profile with an X-Profile header,
+# the secret they must send in X-Profile-Token (empty: none), profiles kept,
+# and the continuous per-route stack sampler with its interval and the
+# distinct stacks kept per route
+PROFILING_ENABLED = _env("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_TOKEN = _env("PROFILING_TOKEN", "")
+PROFILING_MAX_PROFILES = int(_env("PROFILING_MAX_PROFILES", "32"))
+PROFILING_SAMPLING = _env("PROFILING_SAMPLING", "false").lower() in ("1", "true", "yes")
+PROFILING_SAMPLE_INTERVAL_MS = float(_env("PROFILING_SAMPLE_INTERVAL_MS", "20"))
+PROFILING_MAX_STACKS = int(_env("PROFILING_MAX_STACKS", "2000"))
@@ -0,0 +1,453 @@
+"""
+Columnar forecast generation engine
+
+Generates whole forecast horizons, for one or many cities at once, as NumPy
+column arrays. Rows are materialised as compact records (records.py), which
+are serialized directly; Pydantic models are only built at the API edge.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from indices import INDEX_FIELDS, INDEX_SOURCES, derive_indices, flag_lists
+from models import WindDirection, AlertType, Severity
+from records import AlertRecord, DetailedForecastRecord, ForecastRecord
+
+
+SUMMARIES = [
+    "Freezing", "Bracing", "Chilly", "Cool", "Mild",
+    "Warm", "Balmy", "Hot", "Sweltering", "Scorching"
+]
+
+WIND_DIRECTIONS = list(WindDirection)
+ALERT_TYPES = list(AlertType)
+SEVERITIES = list(Severity)
+
+ALERT_DESCRIPTION = "Weather alert in effect"
+
+# Probability threshold above which a detailed forecast carries an alert
+ALERT_THRESHOLD = 0.7
+
+# One uniform draw slot per generated field; every column is derived from
+# its own slot so the basic and detailed variants share the same values.
+BASIC_FIELDS = (
+    "temperature_c", "summary", "humidity", "wind_speed",
+    "wind_direction", "precipitation", "pressure"
+)
+DETAILED_FIELDS = BASIC_FIELDS + (
+    "cloud_cover", "uv_index", "visibility",
+    "alert", "alert_type", "severity", "alert_hours"
+)
+FIELD_SLOTS = {name: slot for slot, name in enumerate(DETAILED_FIELDS)}
+
+# Response fields of the forecast models, in model order, and the generated
+# fields each one is derived from (fields not listed derive from themselves)
+FORECAST_FIELDS = (
+    "date", "temperature_c", "temperature_f", "summary", "humidity",
+    "wind_speed", "wind_direction", "precipitation", "pressure"
+)
+DETAILED_FORECAST_FIELDS = FORECAST_FIELDS + ("cloud_cover", "uv_index", "visibility") + INDEX_FIELDS + ("alerts",)
+FIELD_SOURCES = {
+    "date": (),
+    "temperature_f": ("temperature_c",),
+    "alerts": ("alert", "alert_type", "severity", "alert_hours"),
+    **INDEX_SOURCES
+}
+
+# Lookup tables as object arrays, to map whole categorical columns at once
+_SUMMARY_VALUES = np.array(SUMMARIES, dtype=object)
+_WIND_DIRECTION_VALUES = np.array(WIND_DIRECTIONS, dtype=object)
+
+
+# Key used for forecasts requested without a city
+DEFAULT_CITY_KEY = "__default__"
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_FIELD_STRIDE = np.uint64(0xD1B54A32D192ED03)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def city_key(city: Optional[str]) -> str:
+    """Normalise a city name into the key used for seeding and caching"""
+    if city is None or not city.strip():
+        return DEFAULT_CITY_KEY
+    return " ".join(city.split()).casefold()
+
+
+def _city_hash(city: Optional[str], seed: int) -> int:
+    """Stable 64-bit hash of a city key (unlike hash(), identical across processes)"""
+    digest = hashlib.blake2b(
+        city_key(city).encode("utf-8"),
+        digest_size=8,
+        key=seed.to_bytes(8, "little", signed=True)
+    ).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _splitmix64(z: np.ndarray) -> np.ndarray:
+    """SplitMix64 finaliser applied element-wise (uint64 arithmetic wraps)"""
+    z = (z ^ (z >> np.uint64(30))) * _MIX_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_2
+    return z ^ (z >> np.uint64(31))
+
+
+def keyed_uniforms_at(
+    n_fields: int,
+    cities: Sequence[Optional[str]],
+    keys: np.ndarray,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Deterministic uniforms in [0, 1) for every (field, city, key) cell
+
+    Each cell is a pure function of the city key, the uint64 time key and
+    the field slot, so a cell always gets the same value no matter which
+    horizon or batch it was generated in. Daily forecasts key on calendar
+    date ordinals; series finer than a day bring their own keys (see
+    hourly.py).
+
+    Args:
+        n_fields: Number of field slots to draw
+        cities: City names
+        keys: Time keys
+        seed: Global seed mixed into every city hash
+
+    Returns:
+        Array shaped (n_fields, len(cities), len(keys))
+    """
+    return _slot_uniforms(range(n_fields), cities, keys, seed)
+
+
+def _date_keys(dates: Sequence[datetime]) -> np.ndarray:
+    """Uniform keys of calendar dates: their ordinals"""
+    return np.array([date.toordinal() for date in dates], dtype=np.uint64)
+
+
+def _slot_uniforms(
+    slots: Sequence[int],
+    cities: Sequence[Optional[str]],
+    keys: np.ndarray,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Keyed uniforms of the given field slots only, shaped (len(slots), cities, keys)
+
+    A slot's values do not depend on which other slots are drawn, so a
+    subset of the fields gets exactly the values a full draw would.
+    """
+    city_hashes = np.array([_city_hash(city, seed) for city in cities], dtype=np.uint64)
+    fields = (np.asarray(slots, dtype=np.uint64) + np.uint64(1)) * _FIELD_STRIDE
+
+    cells = _splitmix64(city_hashes[:, None] ^ (keys[None, :] * _GOLDEN))
+    bits = _splitmix64(cells[None, :, :] + fields[:, None, None])
+    return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def _integers(u: np.ndarray, low: int, high: int) -> np.ndarray:
+    """Map uniforms in [0, 1) to integers in [low, high] inclusive"""
+    return (low + np.floor(u * (high - low + 1))).astype(np.int64)
+
+
+def _uniform(u: np.ndarray, low: float, high: float, decimals: int) -> np.ndarray:
+    """Map uniforms in [0, 1) to rounded floats in [low, high)"""
+    return np.round(low + u * (high - low), decimals)
+
+
+def celsius_to_fahrenheit(celsius: np.ndarray) -> np.ndarray:
+    """Convert a Celsius column to Fahrenheit, truncating like int()"""
+    return (32 + celsius * 9 / 5).astype(np.int64)
+
+
+# How each generated field maps its uniforms to column values
+_COLUMN_VALUES = {
+    "temperature_c": lambda u: _integers(u, -20, 55),
+    "summary": lambda u: _integers(u, 0, len(SUMMARIES) - 1),
+    "humidity": lambda u: _integers(u, 30, 100),
+    "wind_speed": lambda u: _uniform(u, 0, 50, 2),
+    "wind_direction": lambda u: _integers(u, 0, len(WIND_DIRECTIONS) - 1),
+    "precipitation": lambda u: _uniform(u, 0, 100, 2),
+    "pressure": lambda u: _integers(u, 980, 1040),
+    "cloud_cover": lambda u: _integers(u, 0, 100),
+    "uv_index": lambda u: _uniform(u, 0, 11, 1),
+    "visibility": lambda u: _integers(u, 1, 20),
+    "alert": lambda u: u > ALERT_THRESHOLD,
+    "alert_type": lambda u: _integers(u, 0, len(ALERT_TYPES) - 1),
+    "severity": lambda u: _integers(u, 0, len(SEVERITIES) - 1),
+    "alert_hours": lambda u: _integers(u, 3, 24)
+}
+
+
+class ForecastColumns:
+    """
+    A block of generated forecasts stored column-wise
+
+    Every column is a 2-D array shaped (cities, days). Categorical columns
+    (summary, wind direction, alert type, severity) hold indexes into the
+    module-level lookup tables, and comfort_flags a bitmask of the alert
+    thresholds (indices.THRESHOLDS) the derived indices cross.
+    """
+
+    __slots__ = ("dates", "cities", "columns")
+
+    def __init__(
+        self,
+        dates: List[datetime],
+        cities: List[Optional[str]],
+        columns: Dict[str, np.ndarray]
+    ):
+        self.dates = dates
+        self.cities = cities
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.cities) * len(self.dates)
+
+    @property
+    def detailed(self) -> bool:
+        return "cloud_cover" in self.columns
+
+    def slice_days(self, start: int, stop: int) -> "ForecastColumns":
+        """The dates start:stop of this block, sharing its column memory"""
+        return ForecastColumns(
+            self.dates[start:stop], self.cities,
+            {name: column[:, start:stop] for name, column in self.columns.items()}
+        )
+
+    def _field_values(self, name: str, city_index: int) -> List[Any]:
+        """Values of one response field for one city, as Python objects"""
+        c = self.columns
+        if name == "date":
+            return self.dates
+        if name == "summary":
+            return _SUMMARY_VALUES[c["summary"][city_index]].tolist()
+        if name == "wind_direction":
+            return _WIND_DIRECTION_VALUES[c["wind_direction"][city_index]].tolist()
+        if name == "comfort_flags":
+            return flag_lists(c["comfort_flags"][city_index])
+        if name == "alerts":
+            return [
+                [AlertRecord(
+                    ALERT_TYPES[alert_type], SEVERITIES[severity], ALERT_DESCRIPTION,
+                    date, date + timedelta(hours=hours)
+                )] if alert else None
+                for date, alert, alert_type, severity, hours in zip(
+                    self.dates,
+                    c["alert"][city_index].tolist(),
+                    c["alert_type"][city_index].tolist(),
+                    c["severity"][city_index].tolist(),
+                    c["alert_hours"][city_index].tolist()
+                )
+            ]
+        return c[name][city_index].tolist()
+
+    def to_rows(self, fields: Sequence[str], city_index: int = 0) -> List[Dict[str, Any]]:
+        """
+        Materialise the rows of one city as dicts holding only some fields
+
+        Args:
+            fields: Response field names (see DETAILED_FORECAST_FIELDS), in
+                the order the rows should list them; the block must have
+                been generated with at least these fields
+            city_index: Index of the city within this block
+
+        Returns:
+            List of rows, one per date
+        """
+        columns = [self._field_values(name, city_index) for name in fields]
+        return [dict(zip(fields, values)) for values in zip(*columns)]
+
+    def _basic_rows(self, city_index: int):
+        """Yield the basic field values of one city as Python scalars"""
+        c = self.columns
+        return zip(
+            self.dates,
+            c["temperature_c"][city_index].tolist(),
+            c["temperature_f"][city_index].tolist(),
+            c["summary"][city_index].tolist(),
+            c["humidity"][city_index].tolist(),
+            c["wind_speed"][city_index].tolist(),
+            c["wind_direction"][city_index].tolist(),
+            c["precipitation"][city_index].tolist(),
+            c["pressure"][city_index].tolist()
+        )
+
+    def to_records(self, city_index: int = 0) -> List[ForecastRecord]:
+        """
+        Materialise the rows of one city as forecast records
+
+        Args:
+            city_index: Index of the city within this block
+
+        Returns:
+            List of forecast records, one per date
+        """
+        return [
+            ForecastRecord(
+                date, temp_c, temp_f, SUMMARIES[summary], humidity, wind_speed,
+                WIND_DIRECTIONS[wind_direction], precipitation, pressure
+            )
+            for (date, temp_c, temp_f, summary, humidity, wind_speed,
+                 wind_direction, precipitation, pressure) in self._basic_rows(city_index)
+        ]
+
+    def to_detailed_records(self, city_index: int = 0) -> List[DetailedForecastRecord]:
+        """
+        Materialise the rows of one city as detailed forecast records
+
+        Args:
+            city_index: Index of the city within this block
+
+        Returns:
+            List of detailed forecast records, one per date
+        """
+        if not self.detailed:
+            raise ValueError("Forecast block was generated without detailed fields")
+
+        c = self.columns
+        extra = zip(
+            c["cloud_cover"][city_index].tolist(),
+            c["uv_index"][city_index].tolist(),
+            c["visibility"][city_index].tolist(),
+            c["dew_point_c"][city_index].tolist(),
+            c["heat_index_c"][city_index].tolist(),
+            c["wind_chill_c"][city_index].tolist(),
+            c["apparent_temperature_c"][city_index].tolist(),
+            flag_lists(c["comfort_flags"][city_index]),
+            c["alert"][city_index].tolist(),
+            c["alert_type"][city_index].tolist(),
+            c["severity"][city_index].tolist(),
+            c["alert_hours"][city_index].tolist()
+        )
+        records = []
+        for basic, detail in zip(self._basic_rows(city_index), extra):
+            (date, temp_c, temp_f, summary, humidity, wind_speed,
+             wind_direction, precipitation, pressure) = basic
+            (cloud_cover, uv_index, visibility, dew_point, heat_index, wind_chill, apparent,
+             comfort_flags, alert, alert_type, severity, hours) = detail
+
+            alerts = None
+            if alert:
+                alerts = [AlertRecord(
+                    ALERT_TYPES[alert_type], SEVERITIES[severity], ALERT_DESCRIPTION,
+                    date, date + timedelta(hours=hours)
+                )]
+
+            records.append(DetailedForecastRecord(
+                date, temp_c, temp_f, SUMMARIES[summary], humidity, wind_speed,
+                WIND_DIRECTIONS[wind_direction], precipitation, pressure,
+                cloud_cover, uv_index, visibility, dew_point, heat_index, wind_chill, apparent,
+                comfort_flags, alerts
+            ))
+        return records
+
+
+def generate_columns(
+    dates: Sequence[datetime],
+    cities: Sequence[Optional[str]] = (None,),
+    detailed: bool = False,
+    rng: Optional[np.random.Generator] = None,
+    seed: int = 0,
+    fields: Optional[Collection[str]] = None
+) -> ForecastColumns:
+    """
+    Generate forecasts for every (city, date) pair in one vectorised pass
+
+    Args:
+        dates: Forecast dates (one column per date)
+        cities: City names (one row per city); None means the default location
+        detailed: Also generate cloud cover, UV index, visibility, alerts and
+            the derived comfort indices (indices.py)
+        rng: NumPy random generator for non-reproducible draws; when omitted
+            values are derived deterministically from (city, date, seed)
+        seed: Global seed for deterministic generation
+        fields: Response fields to produce (see DETAILED_FORECAST_FIELDS);
+            only the columns they derive from are drawn and computed. None
+            produces every field of the variant
+
+    Returns:
+        Column block shaped (len(cities), len(dates))
+    """
+    generated = DETAILED_FIELDS if detailed else BASIC_FIELDS
+    derived = INDEX_FIELDS if detailed else ()
+    if fields is not None:
+        needed = {source for name in fields for source in FIELD_SOURCES.get(name, (name,))}
+        generated = tuple(name for name in generated if name in needed)
+        derived = tuple(name for name in derived if name in fields)
+    if rng is None:
+        u = _slot_uniforms([FIELD_SLOTS[name] for name in generated], cities, _date_keys(dates), seed)
+    else:
+        u = rng.random((len(generated), len(cities), len(dates)))
+    columns = {name: _COLUMN_VALUES[name](draws) for name, draws in zip(generated, u)}
+    if "temperature_c" in columns:
+        columns["temperature_f"] = celsius_to_fahrenheit(columns["temperature_c"])
+    if derived:
+        columns.update(derive_indices(columns, derived))
+
+    return ForecastColumns(list(dates), list(cities), columns)
+
+
+def response_fields(requested: Iterable[str], detailed: bool = False) -> Tuple[str, ...]:
+    """
+    Canonical sparse fieldset of a request
+
+    Args:
+        requested: Response field names asked for
+        detailed: Whether the fields are those of the detailed forecast
+
+    Returns:
+        The requested fields plus the date, in model order
+
+    Raises:
+        ValueError: If a name is not a field of the forecast model
+    """
+    available = DETAILED_FORECAST_FIELDS if detailed else FORECAST_FIELDS
+    requested = set(requested)
+    unknown = requested.difference(available)
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(sorted(unknown))} (available: {', '.join(available)})"
+        )
+    return tuple(name for name in available if name == "date" or name in requested)
+
+
+def horizon_dates(days: int, start: Optional[datetime] = None) -> List[datetime]:
+    """
+    Build the dates of a forecast horizon
+
+    Args:
+        days: Number of days to forecast
+        start: Reference time (defaults to now); the horizon starts the day after
+
+    Returns:
+        List of forecast dates
+    """
+    start = start or datetime.now()
+    return [start + timedelta(days=i) for i in range(1, days + 1)]
+
+
+def iter_horizon_chunks(
+    days: int,
+    chunk_size: int = 64,
+    start: Optional[datetime] = None
+) -> Iterator[List[datetime]]:
+    """
+    Yield the dates of a forecast horizon in fixed-size chunks
+
+    Lets long horizons be generated and consumed block by block without
+    holding every date (or row) in memory at once.
+
+    Args:
+        days: Number of days to forecast
+        chunk_size: Maximum number of dates per chunk
+        start: Reference time (defaults to now); the horizon starts the day after
+
+    Yields:
+        Lists of consecutive forecast dates
+    """
+    start = start or datetime.now()
+    for first in range(1, days + 1, chunk_size):
+        last = min(first + chunk_size, days + 1)
+        yield [start + timedelta(days=i) for i in range(first, last)]
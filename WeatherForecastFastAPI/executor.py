@@ -0,0 +1,335 @@
+"""
+Bounded executors for CPU-bound service calls
+
+Generating long horizons or detailed forecasts is pure CPU work; run on the
+event loop it stalls every other connection, health checks included.
+ServiceExecutor estimates what each WeatherForecastService call costs and
+runs it accordingly:
+
+* inline - cheap calls (a single day or a few rows) run on the event loop,
+  where a thread hop would cost more than the call itself
+* thread - moderate calls run in a thread pool; NumPy releases the GIL for
+  most of the generation, and the loop stays free to serve other requests
+* process - the heaviest calls run in a process pool, each worker holding its
+  own WeatherForecastService with the same seed (generation is deterministic,
+  so results are identical); without process workers they use the threads
+
+Each pool admits at most workers + max_queue calls at a time; further calls
+are rejected with ExecutorSaturated instead of queueing without bound. A
+call that does not finish within the timeout raises ExecutorTimeout (a call
+still waiting in the queue is withdrawn; a running one keeps its slot until
+it ends). Every call's time is split into queue time (submitted until a
+worker picked it up), execution time and overhead (result hand-back and
+event loop wake-up).
+
+Calls made while INLINE_CALLS is set run inline whatever their cost; the
+request profiler sets it so a profiled request's service time is spent on
+the thread it profiles.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from metrics import MetricsRegistry
+
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+POOLS = (INLINE, THREAD, PROCESS)
+
+# Set for the duration of a request whose service calls must all run inline
+INLINE_CALLS: contextvars.ContextVar[bool] = contextvars.ContextVar("inline_calls", default=False)
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a pool's queue is full"""
+
+    def __init__(self, pool: str, retry_after: float = 1.0):
+        super().__init__(f"The {pool} pool is saturated, retry later")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class ExecutorTimeout(Exception):
+    """Raised when a call does not complete within the executor timeout"""
+
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"{name} did not complete within {timeout:g} seconds")
+        self.name = name
+        self.timeout = timeout
+
+
+class CostModel:
+    """
+    Estimated cost of a service call, in generated rows
+
+    Detailed rows weigh three times a basic row and statistics rows twice
+    (they also feed the quantile sketches). Calls whose cost reaches
+    thread_cost leave the event loop; those reaching process_cost go to the
+    process pool. Unknown methods are assumed to be moderate.
+
+    Args:
+        thread_cost: Lowest cost run in the thread pool
+        process_cost: Lowest cost run in the process pool
+    """
+
+    COSTS: Dict[str, Callable[..., int]] = {
+        "get_forecast": lambda days=5, fields=None: days,
+        "get_forecast_by_city": lambda city, days=5: days,
+        "get_current_weather": lambda city=None, fields=None: 1,
+        "get_detailed_forecast": lambda date, city=None, fields=None: 3,
+        "get_detailed_forecasts": lambda days=5, fields=None: 3 * days,
+        "get_weather_alerts": lambda city=None: 1,
+        "get_weather_statistics": lambda days=7: 2 * days,
+        "get_forecast_views": lambda city, views: sum(
+            3 * days if kind == "detailed" else 2 * days if kind == "statistics" else max(days, 1)
+            for kind, days, _ in views
+        ),
+        # 24 vectorised rows per day
+        "get_hourly_forecast": lambda days=1, *options: 24 * days
+    }
+
+    def __init__(self, thread_cost: int = 64, process_cost: int = 2048):
+        self.thread_cost = thread_cost
+        self.process_cost = process_cost
+
+    def cost(self, name: str, args: Sequence[Any]) -> Optional[int]:
+        """Estimated rows of a call, or None for methods without an estimate"""
+        estimate = self.COSTS.get(name)
+        return estimate(*args) if estimate is not None else None
+
+    def classify(self, name: str, args: Sequence[Any]) -> str:
+        """Pool a call should run in"""
+        cost = self.cost(name, args)
+        if cost is None:
+            return THREAD
+        if cost >= self.process_cost:
+            return PROCESS
+        if cost >= self.thread_cost:
+            return THREAD
+        return INLINE
+
+
+class _PoolStats:
+    """Counters and timing totals of one pool"""
+
+    __slots__ = (
+        "in_flight", "submitted", "completed", "failed", "rejected", "timeouts",
+        "queue_seconds", "execution_seconds", "overhead_seconds", "max_queue_seconds"
+    )
+
+    def __init__(self):
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.queue_seconds = 0.0
+        self.execution_seconds = 0.0
+        self.overhead_seconds = 0.0
+        self.max_queue_seconds = 0.0
+
+    def record(self, queued: float, executed: float, overhead: float) -> None:
+        self.completed += 1
+        self.queue_seconds += queued
+        self.execution_seconds += executed
+        self.overhead_seconds += overhead
+        self.max_queue_seconds = max(self.max_queue_seconds, queued)
+
+    def to_dict(self, workers: int, capacity: int) -> Dict[str, Any]:
+        done = self.completed or 1
+        return {
+            "workers": workers,
+            "capacity": capacity,
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "mean_queue_ms": round(self.queue_seconds / done * 1000, 3),
+            "mean_execution_ms": round(self.execution_seconds / done * 1000, 3),
+            "mean_overhead_ms": round(self.overhead_seconds / done * 1000, 3),
+            "max_queue_ms": round(self.max_queue_seconds * 1000, 3)
+        }
+
+
+def _timed_call(call: Callable[..., Any], args: Sequence[Any]) -> Tuple[Any, float, float]:
+    # time.monotonic is system-wide, so timestamps from process workers compare
+    started = time.monotonic()
+    result = call(*args)
+    return result, started, time.monotonic()
+
+
+# Service of a process pool worker, created by _init_worker
+_worker_service = None
+
+
+def _init_worker(seed: int) -> None:
+    global _worker_service
+    from service import WeatherForecastService
+    _worker_service = WeatherForecastService(seed=seed)
+
+
+def _process_call(name: str, args: Sequence[Any]) -> Tuple[Any, float, float]:
+    return _timed_call(getattr(_worker_service, name), args)
+
+
+class ServiceExecutor:
+    """
+    Runs WeatherForecastService calls inline, in threads or in processes by cost
+
+    Args:
+        service: Service whose methods run inline and in the thread pool
+        seed: Seed of the services created in process pool workers
+        cost_model: Classifies calls into pools
+        thread_workers: Thread pool size
+        process_workers: Process pool size; 0 sends process-class calls to the threads
+        max_queue: Calls allowed to wait per pool on top of the running ones
+        timeout: Seconds a call may take, queue time included
+        metrics: Registry receiving queue/execution histograms and rejection counters
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        seed: int = 0,
+        cost_model: Optional[CostModel] = None,
+        thread_workers: int = 4,
+        process_workers: int = 0,
+        max_queue: int = 64,
+        timeout: float = 10.0,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        self.service = service
+        self.seed = seed
+        self.cost_model = cost_model if cost_model is not None else CostModel()
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.metrics = metrics
+        self._threads: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._processes: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {pool: _PoolStats() for pool in POOLS}
+
+    def _workers(self, pool: str) -> int:
+        return {INLINE: 1, THREAD: self.thread_workers, PROCESS: self.process_workers}[pool]
+
+    def _capacity(self, pool: str) -> int:
+        # Inline calls run to completion on the loop, one at a time
+        return 1 if pool == INLINE else self._workers(pool) + self.max_queue
+
+    def _pool_for(self, name: str, args: Sequence[Any]) -> str:
+        pool = self.cost_model.classify(name, args)
+        if pool == PROCESS and self.process_workers < 1:
+            return THREAD
+        return pool
+
+    def _executor(self, pool: str) -> concurrent.futures.Executor:
+        with self._lock:
+            if pool == THREAD:
+                if self._threads is None:
+                    self._threads = concurrent.futures.ThreadPoolExecutor(
+                        self.thread_workers, thread_name_prefix="service"
+                    )
+                return self._threads
+            if self._processes is None:
+                self._processes = concurrent.futures.ProcessPoolExecutor(
+                    self.process_workers, initializer=_init_worker, initargs=(self.seed,)
+                )
+            return self._processes
+
+    def _observe(self, pool: str, name: str, queued: float, executed: float, overhead: float) -> None:
+        self._stats[pool].record(queued, executed, overhead)
+        if self.metrics is not None:
+            self.metrics.executor_queue.labels(pool, name).observe(queued)
+            self.metrics.executor_execution.labels(pool, name).observe(executed)
+
+    async def run(self, name: str, *args: Any) -> Any:
+        """
+        Run a service method in the pool its cost calls for
+
+        Args:
+            name: WeatherForecastService method name
+            *args: Positional arguments of the method
+
+        Returns:
+            The method's result
+
+        Raises:
+            ExecutorSaturated: If the pool already holds its capacity of calls
+            ExecutorTimeout: If the call did not finish within the timeout
+        """
+        pool = INLINE if INLINE_CALLS.get() else self._pool_for(name, args)
+        stats = self._stats[pool]
+        stats.submitted += 1
+
+        if pool == INLINE:
+            result, started, finished = _timed_call(getattr(self.service, name), args)
+            self._observe(pool, name, 0.0, finished - started, 0.0)
+            return result
+
+        if stats.in_flight >= self._capacity(pool):
+            stats.rejected += 1
+            if self.metrics is not None:
+                self.metrics.executor_rejected.labels(pool).inc()
+            raise ExecutorSaturated(pool)
+
+        executor = self._executor(pool)
+        submitted = time.monotonic()
+        if pool == PROCESS:
+            future = executor.submit(_process_call, name, args)
+        else:
+            future = executor.submit(_timed_call, getattr(self.service, name), args)
+        # The slot is held until the work really ends, even after a timeout
+        stats.in_flight += 1
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, pool))
+
+        try:
+            result, started, finished = await asyncio.wait_for(
+                asyncio.wrap_future(future), self.timeout
+            )
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            if self.metrics is not None:
+                self.metrics.executor_timeouts.labels(pool).inc()
+            raise ExecutorTimeout(name, self.timeout) from None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.failed += 1
+            raise
+        self._observe(pool, name, started - submitted, finished - started, time.monotonic() - finished)
+        return result
+
+    def _release(self, pool: str) -> None:
+        self._stats[pool].in_flight -= 1
+
+    def shutdown(self) -> None:
+        """Stop the pools; queued calls are cancelled, running ones finish"""
+        with self._lock:
+            pools, self._threads, self._processes = (self._threads, self._processes), None, None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-pool counters and the queue / execution time breakdown"""
+        return {
+            "timeout_seconds": self.timeout,
+            "max_queue": self.max_queue,
+            "thread_cost": self.cost_model.thread_cost,
+            "process_cost": self.cost_model.process_cost,
+            "pools": {
+                pool: self._stats[pool].to_dict(self._workers(pool), self._capacity(pool))
+                for pool in POOLS
+            }
+        }
@@ -0,0 +1,338 @@
+"""
+Columnar bulk export of forecast data
+
+Builds export batches straight from the engine's column blocks: numeric
+columns are flattened views of the NumPy arrays, and categorical columns
+(city, summary, wind direction, alert type, severity) stay as index arrays
+over a small dictionary. Batches are written one at a time as CSV, an Arrow
+IPC stream or Parquet row groups, so memory is bounded by the batch size
+rather than the export size.
+
+pyarrow is optional: without it only CSV is offered, and clients asking for
+Arrow or Parquet receive 406 Not Acceptable.
+"""
+import csv
+import functools
+import importlib
+import io
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from engine import ALERT_TYPES, SEVERITIES, SUMMARIES, WIND_DIRECTIONS, ForecastColumns
+
+
+CSV = "csv"
+ARROW = "arrow"
+PARQUET = "parquet"
+
+MEDIA_TYPES = {
+    CSV: "text/csv",
+    ARROW: "application/vnd.apache.arrow.stream",
+    PARQUET: "application/vnd.apache.parquet",
+}
+
+# Other media types clients commonly send for the same formats
+MEDIA_TYPE_ALIASES = {
+    "application/csv": CSV,
+    "application/x-parquet": PARQUET,
+    "application/vnd.apache.arrow.file": ARROW,
+}
+
+EXTENSIONS = {CSV: "csv", ARROW: "arrows", PARQUET: "parquet"}
+
+@functools.lru_cache(maxsize=None)
+def _pyarrow() -> Optional[Any]:
+    """The pyarrow module, or None if it is not installed (imported on first use)"""
+    try:
+        pa = importlib.import_module("pyarrow")
+        importlib.import_module("pyarrow.ipc")
+        importlib.import_module("pyarrow.parquet")
+    except ImportError:
+        return None
+    return pa
+
+
+def available_formats() -> List[str]:
+    """Export formats supported by this installation"""
+    return [CSV, ARROW, PARQUET] if _pyarrow() is not None else [CSV]
+
+
+def _not_acceptable(fmt: str) -> HTTPException:
+    return HTTPException(
+        status_code=406,
+        detail=f"Export format '{fmt}' needs pyarrow, which is not installed; "
+               f"available: {', '.join(available_formats())}"
+    )
+
+
+def _accept_entries(accept: str) -> List[tuple]:
+    """(media type, q) pairs of an Accept header, highest preference first"""
+    entries = []
+    for position, part in enumerate(accept.split(",")):
+        fields = [field.strip() for field in part.split(";")]
+        if not fields[0]:
+            continue
+        q = 1.0
+        for parameter in fields[1:]:
+            name, _, value = parameter.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            entries.append((-q, position, fields[0].lower()))
+    return [(media, -q) for q, _, media in sorted(entries)]
+
+
+def negotiate_export_format(request: Request, requested: Optional[str]) -> str:
+    """
+    Pick the export format from an explicit parameter or the Accept header
+
+    Args:
+        request: Incoming request
+        requested: Explicit format ("csv", "arrow" or "parquet"), if given
+
+    Returns:
+        The export format; CSV when the client accepts anything
+
+    Raises:
+        HTTPException: 400 for an unknown format, 406 when no acceptable
+            format is available
+    """
+    if requested:
+        if requested not in MEDIA_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported export format '{requested}', use one of: {', '.join(MEDIA_TYPES)}"
+            )
+        if requested not in available_formats():
+            raise _not_acceptable(requested)
+        return requested
+
+    accept = request.headers.get("accept", "")
+    if not accept:
+        return CSV
+    by_media_type = {media: fmt for fmt, media in MEDIA_TYPES.items()}
+    by_media_type.update(MEDIA_TYPE_ALIASES)
+    unavailable = None
+    for media, _ in _accept_entries(accept):
+        if media in ("*/*", "text/*"):
+            return CSV
+        fmt = by_media_type.get(media)
+        if fmt is None:
+            continue
+        if fmt in available_formats():
+            return fmt
+        unavailable = unavailable or fmt
+    if unavailable:
+        raise _not_acceptable(unavailable)
+    raise HTTPException(
+        status_code=406,
+        detail=f"None of the accepted media types can be produced; use one of: "
+               f"{', '.join(MEDIA_TYPES[fmt] for fmt in available_formats())}"
+    )
+
+
+class Column(NamedTuple):
+    """
+    One export column
+
+    values is a flat array; for categorical columns it holds indexes into
+    labels. mask marks null entries (True = null).
+    """
+    name: str
+    values: np.ndarray
+    labels: Optional[Sequence[str]] = None
+    mask: Optional[np.ndarray] = None
+
+
+def _labels(values: Iterable[Any]) -> List[str]:
+    return [getattr(value, "value", value) for value in values]
+
+
+SUMMARY_LABELS = list(SUMMARIES)
+WIND_DIRECTION_LABELS = _labels(WIND_DIRECTIONS)
+ALERT_TYPE_LABELS = _labels(ALERT_TYPES)
+SEVERITY_LABELS = _labels(SEVERITIES)
+
+
+def block_columns(block: ForecastColumns, dates: np.ndarray) -> List[Column]:
+    """
+    Flatten a (cities, days) block into export columns, city by city
+
+    Args:
+        block: Generated forecast columns
+        dates: The block's dates as datetime64[us]
+    """
+    n_cities, n_days = len(block.cities), len(block.dates)
+    c = block.columns
+
+    def flat(name: str) -> np.ndarray:
+        return c[name].reshape(-1)
+
+    columns = [
+        Column("city", np.repeat(np.arange(n_cities), n_days), [city or "" for city in block.cities]),
+        Column("date", np.tile(dates, n_cities)),
+        Column("temperature_c", flat("temperature_c")),
+        Column("temperature_f", flat("temperature_f")),
+        Column("summary", flat("summary"), SUMMARY_LABELS),
+        Column("humidity", flat("humidity")),
+        Column("wind_speed", flat("wind_speed")),
+        Column("wind_direction", flat("wind_direction"), WIND_DIRECTION_LABELS),
+        Column("precipitation", flat("precipitation")),
+        Column("pressure", flat("pressure"))
+    ]
+    if block.detailed:
+        no_alert = ~flat("alert")
+        end_times = np.tile(dates, n_cities) + flat("alert_hours").astype("timedelta64[h]")
+        columns += [
+            Column("cloud_cover", flat("cloud_cover")),
+            Column("uv_index", flat("uv_index")),
+            Column("visibility", flat("visibility")),
+            Column("dew_point_c", flat("dew_point_c")),
+            Column("heat_index_c", flat("heat_index_c")),
+            Column("wind_chill_c", flat("wind_chill_c")),
+            Column("apparent_temperature_c", flat("apparent_temperature_c")),
+            Column("alert_type", flat("alert_type"), ALERT_TYPE_LABELS, no_alert),
+            Column("alert_severity", flat("severity"), SEVERITY_LABELS, no_alert),
+            Column("alert_end_time", end_times, None, no_alert)
+        ]
+    return columns
+
+
+def _csv_strings(column: Column) -> np.ndarray:
+    if column.labels is not None:
+        strings = np.asarray(column.labels, dtype=object)[column.values]
+    elif column.values.dtype.kind == "M":
+        strings = np.datetime_as_string(column.values, unit="us").astype(object)
+    else:
+        strings = column.values.astype(str).astype(object)
+    if column.mask is not None:
+        strings[column.mask] = ""
+    return strings
+
+
+def csv_batches(batches: Iterable[List[Column]]) -> Iterator[bytes]:
+    """Encode batches as CSV, with a header row before the first batch"""
+    header_written = False
+    for columns in batches:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if not header_written:
+            writer.writerow([column.name for column in columns])
+            header_written = True
+        writer.writerows(zip(*(_csv_strings(column) for column in columns)))
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow_array(pa: Any, column: Column) -> Any:
+    mask = column.mask
+    if column.labels is not None:
+        indices = pa.array(column.values.astype(np.int32), mask=mask)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(column.labels, pa.string()))
+    if column.values.dtype.kind == "M":
+        return pa.array(column.values, pa.timestamp("us"), mask=mask)
+    return pa.array(column.values, mask=mask)
+
+
+def _record_batch(pa: Any, columns: List[Column]) -> Any:
+    return pa.RecordBatch.from_arrays(
+        [_arrow_array(pa, column) for column in columns],
+        names=[column.name for column in columns]
+    )
+
+
+class _ChunkSink:
+    """Write-only file object collecting bytes until they are drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _arrow_stream(batches: Iterable[List[Column]], parquet: bool) -> Iterator[bytes]:
+    pa = _pyarrow()
+    sink = _ChunkSink()
+    writer = None
+    for columns in batches:
+        batch = _record_batch(pa, columns)
+        if writer is None:
+            if parquet:
+                writer = pa.parquet.ParquetWriter(sink, batch.schema)
+            else:
+                writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def encode(batches: Iterable[List[Column]], fmt: str) -> Iterator[bytes]:
+    """Encode export batches in the given format"""
+    if fmt == CSV:
+        return csv_batches(batches)
+    return _arrow_stream(batches, parquet=fmt == PARQUET)
+
+
+def iter_export_batches(blocks: Iterable[ForecastColumns]) -> Iterator[List[Column]]:
+    """
+    Turn generated column blocks into export batches
+
+    Blocks are expected to share one dates list (as produced by
+    WeatherForecastService.iter_column_blocks), so the date column is only
+    converted once.
+    """
+    dates_us = None
+    for block in blocks:
+        if dates_us is None:
+            dates_us = np.array(block.dates, dtype="datetime64[us]")
+        yield block_columns(block, dates_us)
+
+
+def export_response(batches: Iterable[List[Column]], fmt: str, name: str = "forecast") -> StreamingResponse:
+    """
+    Stream an export as a file download
+
+    Args:
+        batches: Export batches, usually a generator
+        fmt: Export format
+        name: Base name of the suggested file name
+    """
+    stamp = datetime.now().strftime("%Y%m%d")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}-{stamp}.{EXTENSIONS[fmt]}"',
+        "Cache-Control": "no-cache"
+    }
+    return StreamingResponse(encode(batches, fmt), media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,613 @@
+"""
+Persistent per-city forecast history with pre-aggregated rollups
+
+ForecastHistory keeps every recorded forecast in SQLite, one row per city
+and day (a later recording of the same day replaces the earlier one), so the
+day rows are the daily level of the series. Monthly and yearly rollups are
+maintained on every write: appended days are merged into their month and
+year rows, and a month or year whose days were revised is re-aggregated
+from the level below (at most 31 day rows or 12 month rows). Each rollup
+row holds count, sum, sum of squares, min and max of the numeric fields and
+a histogram of integer temperatures, so averages, standard deviation,
+extremes and exact temperature percentiles over any date range are merged
+from whole years, whole months and at most two partial months of day rows,
+a few dozen rows however long the range.
+
+Statistics over many windows of one city series (last 7, 30, 90 days and
+so on) are answered from a SeriesIndex of the city (see rangeindex.py) in
+constant time per window. Indexes are built from the day rows on first use,
+kept for the most recently queried cities and updated on every write.
+
+HistoryRecorder writes recorded forecasts behind the request path: forecasts
+are queued and a background task writes them in batches off the event loop.
+"""
+import asyncio
+import logging
+import math
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from engine import city_key
+from models import WeatherStatistics, WindDirection
+from rangeindex import SeriesIndex, WindowAggregate
+from records import ForecastRecord
+
+
+logger = logging.getLogger(__name__)
+
+# Temperatures (Celsius) counted in rollup histograms; values outside are clamped
+TEMPERATURE_MIN = -90
+TEMPERATURE_MAX = 60
+HISTOGRAM_BINS = TEMPERATURE_MAX - TEMPERATURE_MIN + 1
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cities (
+    city TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily (
+    city TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    temperature_c INTEGER NOT NULL,
+    temperature_f INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    humidity INTEGER NOT NULL,
+    wind_speed REAL NOT NULL,
+    wind_direction TEXT NOT NULL,
+    precipitation REAL NOT NULL,
+    pressure INTEGER NOT NULL,
+    PRIMARY KEY (city, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS monthly (
+    city TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    {rollup},
+    PRIMARY KEY (city, period)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS yearly (
+    city TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    {rollup},
+    PRIMARY KEY (city, period)
+) WITHOUT ROWID;
+"""
+
+ROLLUP_COLUMNS = (
+    "n", "t_sum", "t_sq", "t_min", "t_max", "h_sum",
+    "p_sum", "p_max", "w_sum", "w_max", "t_hist"
+)
+
+# Columns of a day row needed to aggregate it
+AGGREGATED = ("temperature_c", "humidity", "precipitation", "wind_speed")
+
+
+def month_of(day: date) -> int:
+    """Month key of a date: months since year 0"""
+    return day.year * 12 + day.month - 1
+
+
+def _month_start(month: int) -> date:
+    return date(month // 12, month % 12 + 1, 1)
+
+
+class Rollup:
+    """
+    Mergeable aggregate of a set of days
+
+    Holds what WeatherStatistics needs: count, sums, sums of squares and
+    extremes, plus a histogram of integer temperatures for percentiles.
+    """
+
+    __slots__ = ROLLUP_COLUMNS
+
+    def __init__(self):
+        self.n = 0
+        self.t_sum = 0.0
+        self.t_sq = 0.0
+        self.t_min = math.inf
+        self.t_max = -math.inf
+        self.h_sum = 0.0
+        self.p_sum = 0.0
+        self.p_max = -math.inf
+        self.w_sum = 0.0
+        self.w_max = -math.inf
+        self.t_hist = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+
+    @classmethod
+    def of(cls, temperature: np.ndarray, humidity: np.ndarray,
+           precipitation: np.ndarray, wind_speed: np.ndarray) -> "Rollup":
+        """Aggregate of day values given as arrays"""
+        rollup = cls()
+        if temperature.size == 0:
+            return rollup
+        temperature = temperature.astype(np.float64)
+        rollup.n = int(temperature.size)
+        rollup.t_sum = float(temperature.sum())
+        rollup.t_sq = float((temperature * temperature).sum())
+        rollup.t_min = float(temperature.min())
+        rollup.t_max = float(temperature.max())
+        rollup.h_sum = float(humidity.sum())
+        rollup.p_sum = float(precipitation.sum())
+        rollup.p_max = float(precipitation.max())
+        rollup.w_sum = float(wind_speed.sum())
+        rollup.w_max = float(wind_speed.max())
+        bins = np.clip(np.rint(temperature).astype(np.int64) - TEMPERATURE_MIN, 0, HISTOGRAM_BINS - 1)
+        rollup.t_hist = np.bincount(bins, minlength=HISTOGRAM_BINS)
+        return rollup
+
+    @classmethod
+    def of_window(cls, window: WindowAggregate) -> "Rollup":
+        """Aggregate of a SeriesIndex window"""
+        rollup = cls()
+        (rollup.n, rollup.t_sum, rollup.t_sq, rollup.t_min, rollup.t_max, rollup.h_sum,
+         rollup.p_sum, rollup.p_max, rollup.w_sum, rollup.w_max) = window[:10]
+        low = window.t_low - TEMPERATURE_MIN
+        high = low + window.t_counts.size
+        if low >= 0 and high <= HISTOGRAM_BINS:
+            rollup.t_hist[low:high] = window.t_counts
+        else:
+            np.add.at(rollup.t_hist, np.clip(np.arange(low, high), 0, HISTOGRAM_BINS - 1), window.t_counts)
+        return rollup
+
+    @classmethod
+    def of_rows(cls, rows: Sequence[Tuple]) -> "Rollup":
+        """Aggregate of (temperature_c, humidity, precipitation, wind_speed) rows"""
+        if not rows:
+            return cls()
+        values = np.array(rows, dtype=np.float64)
+        return cls.of(values[:, 0], values[:, 1], values[:, 2], values[:, 3])
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "Rollup":
+        rollup = cls()
+        (rollup.n, rollup.t_sum, rollup.t_sq, rollup.t_min, rollup.t_max, rollup.h_sum,
+         rollup.p_sum, rollup.p_max, rollup.w_sum, rollup.w_max, hist) = row
+        rollup.t_hist = np.frombuffer(hist, dtype=np.int64).copy()
+        return rollup
+
+    def to_row(self) -> Tuple:
+        return (
+            self.n, self.t_sum, self.t_sq, self.t_min, self.t_max, self.h_sum,
+            self.p_sum, self.p_max, self.w_sum, self.w_max, self.t_hist.tobytes()
+        )
+
+    def merge(self, other: "Rollup") -> "Rollup":
+        """Fold another aggregate into this one (returns self)"""
+        if other.n == 0:
+            return self
+        self.n += other.n
+        self.t_sum += other.t_sum
+        self.t_sq += other.t_sq
+        self.t_min = min(self.t_min, other.t_min)
+        self.t_max = max(self.t_max, other.t_max)
+        self.h_sum += other.h_sum
+        self.p_sum += other.p_sum
+        self.p_max = max(self.p_max, other.p_max)
+        self.w_sum += other.w_sum
+        self.w_max = max(self.w_max, other.w_max)
+        self.t_hist += other.t_hist
+        return self
+
+    def temperature_percentile(self, p: float) -> float:
+        """Linear-interpolated temperature percentile (p in 0-1), exact for integer temperatures"""
+        return self.temperature_percentiles((p,))[0]
+
+    def temperature_percentiles(self, ps: Sequence[float]) -> List[float]:
+        """temperature_percentile of several p at once"""
+        cumulative = np.cumsum(self.t_hist)
+        ranks = [(self.n - 1) * p for p in ps]
+        # Values at sorted positions low and low + 1 of every rank
+        positions = []
+        for rank in ranks:
+            positions += [int(rank) + 1, min(int(rank) + 2, self.n)]
+        values = (np.searchsorted(cumulative, positions) + TEMPERATURE_MIN).tolist()
+        return [
+            values[2 * i] + (values[2 * i + 1] - values[2 * i]) * (rank - int(rank))
+            for i, rank in enumerate(ranks)
+        ]
+
+    def statistics(self) -> WeatherStatistics:
+        """The aggregate as the statistics response model"""
+        if self.n == 0:
+            raise ValueError("No forecasts were aggregated")
+        mean = self.t_sum / self.n
+        variance = max(0.0, self.t_sq / self.n - mean * mean)
+        p50, p90, p99 = (round(value, 2) for value in self.temperature_percentiles(PERCENTILES))
+        return WeatherStatistics(
+            average_temperature_c=round(mean, 2),
+            max_temperature_c=int(self.t_max),
+            min_temperature_c=int(self.t_min),
+            average_humidity=round(self.h_sum / self.n, 2),
+            total_precipitation=round(self.p_sum, 2),
+            average_wind_speed=round(self.w_sum / self.n, 2),
+            days_analyzed=self.n,
+            temperature_stddev_c=round(math.sqrt(variance), 2),
+            temperature_p50_c=p50,
+            temperature_p90_c=p90,
+            temperature_p99_c=p99,
+            max_wind_speed=round(self.w_max, 2),
+            max_precipitation=round(self.p_max, 2)
+        )
+
+
+def split_range(start: date, end: date) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    """
+    Cover [start, end] with whole years, whole months and day ranges
+
+    Returns:
+        (day ordinal ranges, month keys, years); day ranges only cover the
+        partial months at either end
+    """
+    days: List[Tuple[int, int]] = []
+    months: List[int] = []
+    years: List[int] = []
+    cursor = start
+    while cursor <= end:
+        if cursor.month == 1 and cursor.day == 1 and date(cursor.year, 12, 31) <= end:
+            years.append(cursor.year)
+            cursor = date(cursor.year + 1, 1, 1)
+            continue
+        next_month = _month_start(month_of(cursor) + 1)
+        if cursor.day == 1 and next_month - timedelta(days=1) <= end:
+            months.append(month_of(cursor))
+        else:
+            last = min(end, next_month - timedelta(days=1))
+            days.append((cursor.toordinal(), last.toordinal()))
+        cursor = next_month
+    return days, months, years
+
+
+class ForecastHistory:
+    """
+    SQLite store of recorded forecasts with monthly and yearly rollups
+
+    Args:
+        path: Database file (":memory:" keeps the history in this process)
+        max_indexes: Cities whose window index is kept in memory
+    """
+
+    def __init__(self, path: str = ":memory:", max_indexes: int = 64):
+        self.path = path
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[str, SeriesIndex]" = OrderedDict()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        rollup = ",\n    ".join(
+            f"{column} {'BLOB' if column == 't_hist' else 'REAL'} NOT NULL" for column in ROLLUP_COLUMNS
+        )
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("PRAGMA busy_timeout=5000")
+            self._db.executescript(SCHEMA.format(rollup=rollup))
+        self.recorded = 0
+        self.unchanged = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def record(self, city: Optional[str], forecasts: Sequence[ForecastRecord]) -> int:
+        """
+        Store a city's forecasts and update its rollups
+
+        A forecast for a day already stored replaces it; recordings that
+        differ only in the time of day are skipped.
+
+        Returns:
+            Number of day rows added or changed
+        """
+        key = city_key(city)
+        latest: Dict[int, ForecastRecord] = {}
+        for forecast in forecasts:
+            latest[forecast.date.toordinal()] = forecast
+        if not latest:
+            return 0
+
+        with self._lock:
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                changed, first_changed = self._write(db, key, city, latest)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            index = self._indexes.get(key)
+            if index is not None and changed:
+                index.replace_from(first_changed, db.execute(
+                    f"SELECT day, {', '.join(AGGREGATED)} FROM daily WHERE city = ? AND day >= ? ORDER BY day",
+                    (key, first_changed)
+                ).fetchall())
+        self.recorded += changed
+        self.unchanged += len(latest) - changed
+        return changed
+
+    def _write(self, db: sqlite3.Connection, key: str, city: Optional[str],
+               latest: Dict[int, ForecastRecord]) -> Tuple[int, Optional[int]]:
+        """Store changed days and update rollups; returns (days changed, first changed day)"""
+        if city is not None and city.strip():
+            db.execute("INSERT OR IGNORE INTO cities VALUES (?, ?)", (key, " ".join(city.split())))
+
+        ordinals = sorted(latest)
+        stored = {
+            row[0]: row[1:] for row in db.execute(
+                "SELECT day, date, temperature_c, temperature_f, summary, humidity, wind_speed, "
+                "wind_direction, precipitation, pressure FROM daily "
+                "WHERE city = ? AND day BETWEEN ? AND ?", (key, ordinals[0], ordinals[-1])
+            )
+        }
+
+        rows = []
+        appended: Dict[int, List[Tuple]] = {}
+        revised_months = set()
+        for ordinal in ordinals:
+            forecast = latest[ordinal]
+            values = (
+                forecast.date.isoformat(), forecast.temperature_c, forecast.temperature_f,
+                forecast.summary, forecast.humidity, forecast.wind_speed,
+                WindDirection(forecast.wind_direction).value, forecast.precipitation, forecast.pressure
+            )
+            previous = stored.get(ordinal)
+            # The time of day is not part of a day's forecast
+            if previous is not None and previous[1:] == values[1:]:
+                continue
+            rows.append((key, ordinal) + values)
+            month = month_of(forecast.date)
+            if previous is None:
+                appended.setdefault(month, []).append(
+                    (forecast.temperature_c, forecast.humidity, forecast.precipitation, forecast.wind_speed)
+                )
+            else:
+                revised_months.add(month)
+        if not rows:
+            return 0, None
+        db.executemany(f"INSERT OR REPLACE INTO daily VALUES ({', '.join('?' * 11)})", rows)
+
+        # Months: merge appended days, or re-aggregate a revised month from its days
+        month_deltas: Dict[int, Rollup] = {}
+        for month in revised_months | appended.keys():
+            if month in revised_months:
+                first = _month_start(month).toordinal()
+                last = _month_start(month + 1).toordinal() - 1
+                rollup = Rollup.of_rows(db.execute(
+                    f"SELECT {', '.join(AGGREGATED)} FROM daily WHERE city = ? AND day BETWEEN ? AND ?",
+                    (key, first, last)
+                ).fetchall())
+            else:
+                month_deltas[month] = Rollup.of_rows(appended[month])
+                rollup = self._rollup(db, "monthly", key, month)
+                rollup = (rollup or Rollup()).merge(month_deltas[month])
+            self._store_rollup(db, "monthly", key, month, rollup)
+
+        # Years: merge the appended months' deltas, or re-aggregate from months
+        revised_years = {month // 12 for month in revised_months}
+        year_deltas: Dict[int, Rollup] = {}
+        for month, delta in month_deltas.items():
+            if month // 12 not in revised_years:
+                year_deltas.setdefault(month // 12, Rollup()).merge(delta)
+        for year in revised_years:
+            rollup = Rollup()
+            for row in db.execute(
+                f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM monthly WHERE city = ? AND period BETWEEN ? AND ?",
+                (key, year * 12, year * 12 + 11)
+            ):
+                rollup.merge(Rollup.from_row(row))
+            self._store_rollup(db, "yearly", key, year, rollup)
+        for year, delta in year_deltas.items():
+            rollup = (self._rollup(db, "yearly", key, year) or Rollup()).merge(delta)
+            self._store_rollup(db, "yearly", key, year, rollup)
+        return len(rows), rows[0][1]
+
+    @staticmethod
+    def _rollup(db: sqlite3.Connection, table: str, key: str, period: int) -> Optional[Rollup]:
+        row = db.execute(
+            f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM {table} WHERE city = ? AND period = ?", (key, period)
+        ).fetchone()
+        return Rollup.from_row(row) if row is not None else None
+
+    @staticmethod
+    def _store_rollup(db: sqlite3.Connection, table: str, key: str, period: int, rollup: Rollup) -> None:
+        if rollup.n == 0:
+            db.execute(f"DELETE FROM {table} WHERE city = ? AND period = ?", (key, period))
+            return
+        db.execute(
+            f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * (len(ROLLUP_COLUMNS) + 2))})",
+            (key, period) + rollup.to_row()
+        )
+
+    def aggregate(self, city: Optional[str], start: date, end: date) -> Rollup:
+        """Merged rollup of a city's stored days in [start, end]"""
+        key = city_key(city)
+        day_ranges, months, years = split_range(start, end)
+        rollup = Rollup()
+        with self._lock:
+            db = self._db
+            for first, last in day_ranges:
+                rollup.merge(Rollup.of_rows(db.execute(
+                    f"SELECT {', '.join(AGGREGATED)} FROM daily WHERE city = ? AND day BETWEEN ? AND ?",
+                    (key, first, last)
+                ).fetchall()))
+            for table, periods in (("monthly", months), ("yearly", years)):
+                if not periods:
+                    continue
+                rows = db.execute(
+                    f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM {table} "
+                    f"WHERE city = ? AND period IN ({', '.join('?' * len(periods))})",
+                    (key, *periods)
+                ).fetchall()
+                for row in rows:
+                    rollup.merge(Rollup.from_row(row))
+        return rollup
+
+    def statistics(self, city: Optional[str], start: date, end: date) -> Optional[WeatherStatistics]:
+        """
+        Statistics of a city's stored forecasts between two dates (inclusive)
+
+        Returns:
+            The statistics, or None if no day of the range is stored
+        """
+        rollup = self.aggregate(city, start, end)
+        return rollup.statistics() if rollup.n else None
+
+    def _index(self, key: str) -> SeriesIndex:
+        """Window index of a city, built from its day rows if not kept (lock held)"""
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+            return index
+        index = SeriesIndex()
+        rows = self._db.execute(
+            f"SELECT day, {', '.join(AGGREGATED)} FROM daily WHERE city = ? ORDER BY day", (key,)
+        ).fetchall()
+        if rows:
+            index.replace_from(rows[0][0], rows)
+        self._indexes[key] = index
+        while len(self._indexes) > self.max_indexes:
+            self._indexes.popitem(last=False)
+        return index
+
+    def window_statistics(
+        self, city: Optional[str], windows: Sequence[Tuple[date, date]]
+    ) -> List[Optional[WeatherStatistics]]:
+        """
+        Statistics of a city's stored forecasts over each of several date windows
+
+        Each window is answered from the city's index in constant time,
+        whatever its length.
+
+        Returns:
+            Statistics per window (inclusive), None where no day of it is stored
+        """
+        with self._lock:
+            index = self._index(city_key(city))
+            aggregates = [index.window(start.toordinal(), end.toordinal()) for start, end in windows]
+        return [Rollup.of_window(window).statistics() if window else None for window in aggregates]
+
+    def forecasts(self, city: Optional[str], start: date, end: date) -> List[ForecastRecord]:
+        """A city's stored forecasts between two dates (inclusive), in date order"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT date, temperature_c, temperature_f, summary, humidity, wind_speed, "
+                "wind_direction, precipitation, pressure FROM daily "
+                "WHERE city = ? AND day BETWEEN ? AND ? ORDER BY day",
+                (city_key(city), start.toordinal(), end.toordinal())
+            ).fetchall()
+        return [
+            ForecastRecord(datetime.fromisoformat(row[0]), *row[1:6], WindDirection(row[6]), *row[7:])
+            for row in rows
+        ]
+
+    def span(self, city: Optional[str]) -> Optional[Tuple[date, date]]:
+        """First and last stored day of a city, or None"""
+        with self._lock:
+            first, last = self._db.execute(
+                "SELECT MIN(day), MAX(day) FROM daily WHERE city = ?", (city_key(city),)
+            ).fetchone()
+        return (date.fromordinal(first), date.fromordinal(last)) if first is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Row counts and write counters"""
+        with self._lock:
+            counts = {
+                table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("daily", "monthly", "yearly")
+            }
+            cities = self._db.execute("SELECT COUNT(DISTINCT city) FROM daily").fetchone()[0]
+            index_bytes = sum(index.nbytes() for index in self._indexes.values())
+        return {
+            "path": self.path,
+            "cities": cities,
+            "days": counts["daily"],
+            "monthly_rollups": counts["monthly"],
+            "yearly_rollups": counts["yearly"],
+            "indexed_cities": len(self._indexes),
+            "index_bytes": index_bytes,
+            "recorded": self.recorded,
+            "unchanged": self.unchanged
+        }
+
+
+class HistoryRecorder:
+    """
+    Write-behind queue in front of ForecastHistory
+
+    submit() only queues; a background task writes queued forecasts in a
+    worker thread, so request handlers never wait for the database. When
+    more than max_pending batches are waiting the oldest are dropped.
+
+    Args:
+        history: Store to write to
+        max_pending: Queued batches kept before dropping the oldest
+        interval: Seconds between writes while forecasts keep arriving
+    """
+
+    def __init__(self, history: ForecastHistory, max_pending: int = 1024, interval: float = 0.5):
+        self.history = history
+        self.max_pending = max_pending
+        self.interval = interval
+        self._pending: Dict[str, Tuple[Optional[str], List[ForecastRecord]]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, city: Optional[str], forecasts: Iterable[ForecastRecord]) -> None:
+        """Queue a city's forecasts for recording (later submissions for a city win)"""
+        key = city_key(city)
+        batch = self._pending.pop(key, (city, []))
+        batch[1].extend(forecasts)
+        self._pending[key] = batch
+        while len(self._pending) > self.max_pending:
+            self._pending.pop(next(iter(self._pending)))
+            self.dropped += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write everything queued now, in the calling thread"""
+        pending, self._pending = self._pending, {}
+        changed = 0
+        for city, forecasts in pending.values():
+            try:
+                changed += self.history.record(city, forecasts)
+            except Exception:
+                self.failed += 1
+                logger.exception("Recording forecast history for %s failed", city)
+        return changed
+
+    async def start(self) -> None:
+        """Start the writer task on the running event loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="history-recorder")
+
+    async def stop(self) -> None:
+        """Stop the writer task and write what is still queued"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.to_thread(self.flush)
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": self.pending, "dropped": self.dropped, "failed": self.failed}
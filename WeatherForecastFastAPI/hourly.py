@@ -0,0 +1,236 @@
+"""
+Hourly forecast series: lazy generation, bucket aggregation and downsampling
+
+Hourly values are derived from the day's forecast (engine.generate_columns),
+so an hourly series agrees with the daily one: temperature follows a daily
+cycle around the day's temperature (coolest before dawn, warmest mid
+afternoon), humidity moves against it, wind varies around the day's speed,
+the day's precipitation is spread over its hours and pressure drifts around
+the day's value. Hour-to-hour variation comes from keyed uniforms of the
+(city, hour), so a given hour of a city is always the same.
+
+The series is produced by a pipeline of generators over HourlyBlock column
+blocks, each stage consuming the previous one block by block:
+
+    iter_hourly_blocks -> iter_buckets -> downsample (optional)
+
+Bucketing aggregates every block on its own (blocks hold whole buckets), so
+a coarse series never holds the hourly values of the whole horizon.
+Downsampling keeps a point budget with Largest-Triangle-Three-Buckets,
+which keeps peaks and troughs of the chosen field that plain decimation
+would drop; it needs the whole (bucketed) series, the last stage.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from engine import generate_columns, keyed_uniforms_at
+from records import HourlyRecord
+
+
+# Columns of an hourly block, in HourlyForecast order after time and hours
+COLUMNS = (
+    "temperature_c", "temperature_min_c", "temperature_max_c",
+    "humidity", "wind_speed", "precipitation", "pressure"
+)
+
+# Half the day's temperature swing (Celsius) and the hour of the warmest point
+DIURNAL_AMPLITUDE = 4.0
+WARMEST_HOUR = 15
+
+# Set on hourly uniform keys so they never coincide with daily (ordinal) keys
+_HOURLY_KEY = np.uint64(1 << 63)
+_HOURLY_FIELDS = 5
+
+
+class HourlyBlock(NamedTuple):
+    """Consecutive points of an hourly series, column-wise"""
+    times: np.ndarray  # datetime64[h] start of each point
+    hours: np.ndarray  # hours aggregated into each point
+    columns: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def take(self, indexes: np.ndarray) -> "HourlyBlock":
+        return HourlyBlock(
+            self.times[indexes], self.hours[indexes],
+            {name: column[indexes] for name, column in self.columns.items()}
+        )
+
+    @classmethod
+    def concat(cls, blocks: List["HourlyBlock"]) -> "HourlyBlock":
+        return cls(
+            np.concatenate([block.times for block in blocks]),
+            np.concatenate([block.hours for block in blocks]),
+            {name: np.concatenate([block.columns[name] for block in blocks]) for name in COLUMNS}
+        )
+
+    def to_records(self) -> List[HourlyRecord]:
+        columns = [self.columns[name].tolist() for name in COLUMNS]
+        return [
+            HourlyRecord(*values)
+            for values in zip(self.times.astype("datetime64[s]").tolist(), self.hours.tolist(), *columns)
+        ]
+
+
+def next_hour(now: Optional[datetime] = None) -> datetime:
+    """Start of the hour after now"""
+    now = now or datetime.now()
+    return now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+
+def iter_hourly_blocks(
+    city: Optional[str],
+    start: datetime,
+    hours: int,
+    block_hours: int = 384,
+    seed: int = 0
+) -> Iterator[HourlyBlock]:
+    """
+    Lazily generate an hourly series, block_hours points at a time
+
+    Args:
+        city: City name; None means the default location
+        start: First hour (minutes and below are ignored)
+        hours: Length of the series
+        block_hours: Points per block (the last block may be shorter)
+        seed: Global seed, as for the daily forecasts
+
+    Yields:
+        Blocks of one-hour points
+    """
+    first_hour = np.datetime64(start.replace(minute=0, second=0, microsecond=0), "h")
+    for offset in range(0, hours, block_hours):
+        times = first_hour + np.arange(offset, min(offset + block_hours, hours))
+        days = times.astype("datetime64[D]")
+        first_day = days[0]
+        day_index = (days - first_day).astype(np.int64)
+        n_days = int(day_index[-1]) + 1
+        midnight = datetime.combine(first_day.item(), datetime.min.time())
+        dates = [midnight + timedelta(days=i) for i in range(n_days)]
+        daily = generate_columns(dates, [city], seed=seed).columns
+
+        # Uniforms for every hour of the covered days, so each day's
+        # precipitation is spread over all 24 of its hours
+        day_hours = first_day.astype("datetime64[h]") + np.arange(n_days * 24)
+        keys = day_hours.astype(np.int64).astype(np.uint64) | _HOURLY_KEY
+        u = keyed_uniforms_at(_HOURLY_FIELDS, [city], keys, seed)[:, 0, :].reshape(_HOURLY_FIELDS, n_days, 24)
+        hour_of_day = (times - days).astype(np.int64)
+
+        cycle = np.cos(2 * math.pi * (hour_of_day - WARMEST_HOUR) / 24)
+        temperature = np.round(
+            daily["temperature_c"][0, day_index] + DIURNAL_AMPLITUDE * cycle
+            + (u[0, day_index, hour_of_day] - 0.5) * 3, 1
+        )
+        humidity = np.round(np.clip(
+            daily["humidity"][0, day_index] - 2 * DIURNAL_AMPLITUDE * cycle
+            + (u[1, day_index, hour_of_day] - 0.5) * 10, 0, 100
+        ), 1)
+        wind_speed = np.round(daily["wind_speed"][0, day_index] * (0.6 + 0.8 * u[2, day_index, hour_of_day]), 2)
+        weights = u[3] ** 4
+        share = weights[day_index, hour_of_day] / weights.sum(axis=1)[day_index]
+        precipitation = np.round(daily["precipitation"][0, day_index] * share, 2)
+        pressure = np.round(daily["pressure"][0, day_index] + (u[4, day_index, hour_of_day] - 0.5) * 3, 1)
+
+        yield HourlyBlock(times, np.ones(len(times), dtype=np.int64), {
+            "temperature_c": temperature,
+            "temperature_min_c": temperature,
+            "temperature_max_c": temperature,
+            "humidity": humidity,
+            "wind_speed": wind_speed,
+            "precipitation": precipitation,
+            "pressure": pressure
+        })
+
+
+def iter_buckets(blocks: Iterable[HourlyBlock], bucket_hours: int) -> Iterator[HourlyBlock]:
+    """
+    Aggregate points into buckets of bucket_hours consecutive points
+
+    Means for temperature, humidity, wind speed and pressure, the extremes
+    of the temperature bounds and the total precipitation. Every block but
+    the last must hold a multiple of bucket_hours points.
+    """
+    for block in blocks:
+        if bucket_hours == 1:
+            yield block
+            continue
+        starts = np.arange(0, len(block), bucket_hours)
+        hours = np.add.reduceat(block.hours, starts)
+        columns = block.columns
+
+        def mean(name: str, decimals: int) -> np.ndarray:
+            return np.round(np.add.reduceat(columns[name] * block.hours, starts) / hours, decimals)
+
+        yield HourlyBlock(block.times[starts], hours, {
+            "temperature_c": mean("temperature_c", 1),
+            "temperature_min_c": np.minimum.reduceat(columns["temperature_min_c"], starts),
+            "temperature_max_c": np.maximum.reduceat(columns["temperature_max_c"], starts),
+            "humidity": mean("humidity", 1),
+            "wind_speed": mean("wind_speed", 2),
+            "precipitation": np.round(np.add.reduceat(columns["precipitation"], starts), 2),
+            "pressure": mean("pressure", 1)
+        })
+
+
+def lttb_indexes(values: np.ndarray, points: int) -> np.ndarray:
+    """
+    Indexes of the points Largest-Triangle-Three-Buckets keeps
+
+    The first and last points are kept; the others are split into points - 2
+    buckets and from each bucket the point forming the largest triangle with
+    the point kept before it and the mean of the next bucket is kept. Points
+    are taken as evenly spaced, as the points of an hourly series are.
+
+    Args:
+        values: Series values
+        points: Number of points to keep (at least 3)
+
+    Returns:
+        Sorted indexes into values
+    """
+    n = len(values)
+    if points >= n or n <= 2:
+        return np.arange(n)
+    points = max(points, 3)
+    # Bucket boundaries over values[1:-1]; bucket i is edges[i]:edges[i + 1]
+    edges = (np.arange(points - 1) * ((n - 2) / (points - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Mean (x, y) of every bucket, with the last point as one more bucket
+    sums = np.add.reduceat(values[:-1], edges[:-1])
+    sizes = np.diff(edges)
+    mean_y = np.append(sums / sizes, values[-1])
+    mean_x = np.append((edges[:-1] + edges[1:] - 1) / 2, n - 1)
+
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    # Buckets hold a few points each, so plain floats beat per-bucket array calls
+    y = values.tolist()
+    bounds, next_x, next_y = edges.tolist(), mean_x.tolist(), mean_y.tolist()
+    a = 0
+    for bucket in range(points - 2):
+        ax, ay = a, y[a]
+        dx, dy = ax - next_x[bucket + 1], next_y[bucket + 1] - ay
+        best = -1.0
+        for i in range(bounds[bucket], bounds[bucket + 1]):
+            # Twice the triangle area (a, candidate, next bucket mean)
+            area = abs(dx * (y[i] - ay) - (ax - i) * dy)
+            if area > best:
+                best, a = area, i
+        kept[bucket + 1] = a
+    return kept
+
+
+def downsample(blocks: Iterable[HourlyBlock], points: int, metric: str) -> Iterator[HourlyBlock]:
+    """Keep at most points points of a series, chosen by LTTB on one column"""
+    blocks = list(blocks)
+    if not blocks:
+        return
+    series = blocks[0] if len(blocks) == 1 else HourlyBlock.concat(blocks)
+    if len(series) <= points:
+        yield series
+        return
+    yield series.take(lttb_indexes(series.columns[metric], points))
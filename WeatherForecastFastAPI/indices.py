@@ -0,0 +1,185 @@
+"""
+Derived comfort indices computed over whole forecast columns
+
+Every index is computed element-wise with NumPy over column arrays of any
+shape (a (cities, days) forecast block, a 10k-row batch), so a block gets
+its indices in one vectorised pass instead of one Python call per row:
+
+* dew point - Magnus formula with the Alduchov & Eskridge (1996) constants
+* heat index - the US National Weather Service algorithm (Steadman's simple
+  formula, then the Rothfusz regression with its low and high humidity
+  adjustments), defined from 26.7 C (80 F)
+* wind chill - the 2001 North American (JAG/TI) formula, defined at or
+  below 10 C with wind of at least 4.8 km/h
+* apparent (feels-like) temperature - the heat index when hot, the wind
+  chill when cold and windy, the air temperature otherwise
+
+Outside its range an index equals the air temperature. Alert-threshold
+flags are kept as a bitmask column (one bit per entry of THRESHOLDS) and
+only turned into flag names when rows are materialised.
+"""
+from typing import Collection, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+# Response field names of the indices, in model order
+INDEX_FIELDS = ("dew_point_c", "heat_index_c", "wind_chill_c", "apparent_temperature_c", "comfort_flags")
+
+# Forecast columns each index is derived from
+INDEX_SOURCES = {
+    "dew_point_c": ("temperature_c", "humidity"),
+    "heat_index_c": ("temperature_c", "humidity"),
+    "wind_chill_c": ("temperature_c", "wind_speed"),
+    "apparent_temperature_c": ("temperature_c", "humidity", "wind_speed"),
+    "comfort_flags": ("temperature_c", "humidity", "wind_speed")
+}
+
+# Validity limits of the heat index and wind chill
+HEAT_INDEX_MIN_C = 26.7
+WIND_CHILL_MAX_C = 10.0
+WIND_CHILL_MIN_WIND = 4.8
+
+# Magnus formula constants (Celsius)
+_MAGNUS_A = 17.625
+_MAGNUS_B = 243.04
+
+
+class Threshold(NamedTuple):
+    """An alert threshold on one index: the flag is raised at or beyond value"""
+    flag: str
+    index: str
+    above: bool
+    value: float
+
+
+# NWS heat index categories "danger" (103 F) and "extreme danger" (125 F),
+# Environment Canada's wind chill frostbite risk levels, and the dew point
+# from which humidity is oppressive (75 F)
+THRESHOLDS = (
+    Threshold("heat_danger", "heat_index_c", True, 39.4),
+    Threshold("extreme_heat", "heat_index_c", True, 51.7),
+    Threshold("frostbite_risk", "wind_chill_c", False, -28.0),
+    Threshold("extreme_cold", "wind_chill_c", False, -40.0),
+    Threshold("oppressive_humidity", "dew_point_c", True, 24.0)
+)
+FLAG_NAMES = tuple(threshold.flag for threshold in THRESHOLDS)
+
+# Flag names of every bitmask value, so a mask column maps to names at once
+_FLAG_LISTS = np.empty(1 << len(THRESHOLDS), dtype=object)
+_FLAG_LISTS[:] = [
+    tuple(flag for bit, flag in enumerate(FLAG_NAMES) if mask >> bit & 1)
+    for mask in range(1 << len(THRESHOLDS))
+]
+
+
+def dew_point(temperature_c: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """Dew point (Celsius) from air temperature (Celsius) and relative humidity (%)"""
+    t = np.asarray(temperature_c, dtype=np.float64)
+    gamma = np.log(np.clip(humidity, 1, 100) / 100) + _MAGNUS_A * t / (_MAGNUS_B + t)
+    return _MAGNUS_B * gamma / (_MAGNUS_A - gamma)
+
+
+def heat_index(temperature_c: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """Heat index (Celsius); the air temperature below 26.7 C"""
+    t_c = np.asarray(temperature_c, dtype=np.float64)
+    result = t_c.copy()
+    # Only the cells in range are computed
+    hot = t_c >= HEAT_INDEX_MIN_C
+    if not hot.any():
+        return result
+    t = t_c[hot] * 1.8 + 32
+    rh = np.asarray(humidity, dtype=np.float64)[hot]
+
+    simple = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + rh * 0.094)
+    # The Rothfusz regression, grouped by powers of the temperature
+    regression = (
+        (-42.379 + 10.14333127 * rh - 5.481717e-2 * rh * rh)
+        + t * (2.04901523 - 0.22475541 * rh + 8.5282e-4 * rh * rh)
+        + t * t * (-6.83783e-3 + 1.22874e-3 * rh - 1.99e-6 * rh * rh)
+    )
+    dry = (rh < 13) & (t <= 112)
+    if dry.any():
+        regression[dry] -= (13 - rh[dry]) / 4 * np.sqrt(np.clip(17 - np.abs(t[dry] - 95), 0, None) / 17)
+    humid = (rh > 85) & (t <= 87)
+    if humid.any():
+        regression[humid] += (rh[humid] - 85) / 10 * (87 - t[humid]) / 5
+
+    index_f = np.where((simple + t) / 2 < 80, simple, regression)
+    result[hot] = (index_f - 32) / 1.8
+    return result
+
+
+def wind_chill(temperature_c: np.ndarray, wind_speed: np.ndarray) -> np.ndarray:
+    """Wind chill (Celsius) from wind speed in km/h; the air temperature outside its range"""
+    t = np.asarray(temperature_c, dtype=np.float64)
+    wind = np.asarray(wind_speed, dtype=np.float64)
+    v = np.power(wind, 0.16)
+    chill = 13.12 + 0.6215 * t + v * (0.3965 * t - 11.37)
+    return np.where((t <= WIND_CHILL_MAX_C) & (wind >= WIND_CHILL_MIN_WIND), chill, t)
+
+
+def derive_indices(
+    columns: Mapping[str, np.ndarray],
+    names: Optional[Collection[str]] = None,
+    decimals: Optional[int] = 1
+) -> Dict[str, np.ndarray]:
+    """
+    Compute derived indices over forecast columns in one pass
+
+    Indices already present in columns are reused, and intermediate indices
+    (the apparent temperature needs the heat index and wind chill, the flags
+    need all three) are computed once. Thresholds are applied to the rounded
+    values, so a flag agrees with the index a client sees.
+
+    Args:
+        columns: Forecast columns, at least the sources of the indices asked for
+            (temperature_c, humidity, wind_speed; see INDEX_SOURCES)
+        names: Indices to return (default: every entry of INDEX_FIELDS)
+        decimals: Rounding of the index temperatures (None: unrounded)
+
+    Returns:
+        Index columns by name, shaped like the source columns; comfort_flags
+        is a uint8 bitmask over THRESHOLDS
+    """
+    names = INDEX_FIELDS if names is None else tuple(name for name in INDEX_FIELDS if name in names)
+    computed: Dict[str, np.ndarray] = {}
+
+    def index(name: str) -> np.ndarray:
+        if name in computed:
+            return computed[name]
+        if name in columns:
+            values = columns[name]
+        elif name == "comfort_flags":
+            values = np.zeros(np.shape(columns["temperature_c"]), dtype=np.uint8)
+            for bit, threshold in enumerate(THRESHOLDS):
+                source = index(threshold.index)
+                crossed = source >= threshold.value if threshold.above else source <= threshold.value
+                values |= crossed.astype(np.uint8) << np.uint8(bit)
+        else:
+            if name == "dew_point_c":
+                values = dew_point(columns["temperature_c"], columns["humidity"])
+            elif name == "heat_index_c":
+                values = heat_index(columns["temperature_c"], columns["humidity"])
+            elif name == "wind_chill_c":
+                values = wind_chill(columns["temperature_c"], columns["wind_speed"])
+            else:
+                hot = np.asarray(columns["temperature_c"]) >= HEAT_INDEX_MIN_C
+                values = np.where(hot, index("heat_index_c"), index("wind_chill_c"))
+            if decimals is not None:
+                values = np.round(values, decimals)
+        computed[name] = values
+        return values
+
+    return {name: index(name) for name in names}
+
+
+def flag_lists(flags: np.ndarray) -> List[Tuple[str, ...]]:
+    """Flag names raised in every entry of a comfort_flags bitmask column"""
+    return _FLAG_LISTS[flags].tolist()
+
+
+def flag_counts(flags: np.ndarray) -> np.ndarray:
+    """How many entries of a bitmask column raise each flag, in THRESHOLDS order"""
+    flags = np.asarray(flags).reshape(-1)
+    return np.array([np.count_nonzero(flags >> np.uint8(bit) & 1) for bit in range(len(THRESHOLDS))])
@@ -1,22 +1,81 @@
-from fastapi import FastAPI, HTTPException, Query, Path, Body
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Path, Body, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
-from typing import List, Optional
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 from models import (
     WeatherForecast,
     DetailedWeatherForecast,
+    HourlyForecast,
+    HourlyMetric,
     WeatherAlert,
+    CityAlert,
+    AlertType,
+    Severity,
+    AlertStoreStats,
+    AdmissionStats,
+    ExecutorStats,
     WeatherForecastRequest,
+    BatchForecastRequest,
+    BatchForecastResponse,
+    CompositeQueryRequest,
+    CompositeQueryResponse,
     WeatherStatistics,
-    HealthCheck
+    HealthCheck,
+    CacheStats,
+    CacheReport,
+    PrewarmStats,
+    HistoryIngestResult,
+    HistoryStats,
+    ProfilingStats,
+    RequestProfile,
+    WindowStatistics,
+    CityMatch,
+    NearbyCity
 )
+from records import ForecastRecord, select_fields
+from engine import DETAILED_FORECAST_FIELDS, FORECAST_FIELDS, response_fields
 from service import WeatherForecastService
+from providers import ProviderError, create_provider
+from prewarm import HotSetTracker, PrewarmScheduler
+from cities import KNOWN_CITIES, CityRegistry
+from alerts import AlertMonitor, AlertStore
+from cache import CachedWeatherForecastService, TTLCache
+from history import ForecastHistory, HistoryRecorder
+from admission import AdmissionController, AdmissionMiddleware
+from executor import CostModel, ExecutorSaturated, ExecutorTimeout, ServiceExecutor
+from responses import ResponseCache, json_response
+from openapi_cache import OpenAPICache
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, MetricsRegistry, instrument
+from profiling import Profiler, ProfilingMiddleware
+from batch import fan_out
+from composite import DEFAULT_DAYS as QUERY_DEFAULT_DAYS, Operation, run_query
+from streaming import negotiate_format, push_response, stream_response
+from export import MEDIA_TYPES as EXPORT_MEDIA_TYPES, export_response, iter_export_batches, negotiate_export_format
+import config
 
-# Create FastAPI application
-app = FastAPI(
-    title="Weather Forecast API",
-    description="""
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    if config.PREWARM_ENABLED:
+        await prewarmer.start()
+    await alert_monitor.start()
+    await history_recorder.start()
+    profiler.start()
+    yield
+    profiler.stop()
+    await alert_monitor.stop()
+    await prewarmer.stop()
+    await history_recorder.stop()
+    await weather_service.provider.aclose()
+    service_executor.shutdown()
+
+
+# OpenAPI metadata of the application (see create_app)
+DESCRIPTION = """
     A comprehensive Weather Forecast API built with FastAPI.
 
     ## Features
@@ -36,50 +95,222 @@ app = FastAPI(
     * **GET /api/forecast/city/{city}** - Get city-specific forecast
     * **GET /api/forecast/detailed** - Get detailed forecast for a date
     * **GET /api/forecast/detailed/multi** - Get detailed multi-day forecasts
+    * **GET /api/forecast/hourly** - Hourly series with bucket aggregation and downsampling
     * **GET /api/forecast/alerts** - Get weather alerts
+    * **GET /api/alerts** - Query stored alerts by time window, city, type and severity
+    * **GET /api/alerts/subscribe** - Push new and expiring alerts (SSE)
+    * **GET /api/alerts/stats** - Alert store statistics
     * **GET /api/forecast/statistics** - Get weather statistics
+    * **GET /api/forecast/stream** - Stream a forecast horizon (NDJSON / SSE)
+    * **GET /api/forecast/detailed/stream** - Stream detailed forecasts (NDJSON / SSE)
+    * **GET /api/forecast/statistics/stream** - Stream statistics snapshots (NDJSON / SSE)
+    * **GET /api/forecast/export** - Bulk export for many cities (CSV / Arrow / Parquet)
+    * **GET /api/history/{city}** - Recorded forecasts of a city
+    * **POST /api/history/{city}** - Record forecasts of a city
+    * **GET /api/history/{city}/statistics** - Statistics of recorded forecasts over a date range
+    * **GET /api/history/{city}/statistics/range** - Statistics of recorded forecasts over many windows
     * **POST /api/forecast/request** - Custom forecast request
+    * **POST /api/forecast/batch** - Multi-city batch forecast
+    * **POST /api/forecast/query** - Several operations in one request, sharing generation per city
+    * **GET /api/cities/search** - City autocomplete and fuzzy search
+    * **GET /api/cities/nearest** - Nearest cities to a coordinate
     * **GET /api/forecast/health** - Health check
-    """,
-    version="1.0.0",
-    contact={
-        "name": "Weather API Team",
-        "email": "weather@example.com"
-    },
-    license_info={
-        "name": "MIT",
-    },
-    openapi_tags=[
-        {"name": "Weather Forecast", "description": "Basic weather forecast operations"},
-        {"name": "Detailed Forecast", "description": "Detailed weather forecasts with extended data"},
-        {"name": "Weather Alerts", "description": "Weather alert operations"},
-        {"name": "Statistics", "description": "Weather statistics and analytics"},
-        {"name": "Health", "description": "API health monitoring"}
-    ],
-    swagger_ui_parameters={
-        "persistAuthorization": False,
-        "displayRequestDuration": True,
-        "filter": True,
-    },
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json"
-)
-
-# Add CORS middleware to allow all origins (completely open)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins
-    allow_credentials=True,
-    allow_methods=["*"],  # Allow all methods
-    allow_headers=["*"],  # Allow all headers
-)
-
-# Initialize service
-weather_service = WeatherForecastService()
-
-
-@app.get(
+    * **GET /api/forecast/cache** - Cache statistics
+    * **GET /api/forecast/provider** - Provider statistics
+    * **GET /api/forecast/prewarm** - Prewarming statistics
+    * **GET /api/forecast/executor** - Service call executor statistics
+    * **GET /api/forecast/admission** - Admission control statistics
+    * **GET /api/forecast/history** - Forecast history statistics
+    * **GET /api/forecast/profiling** - Profiling state and stored request profiles
+    * **GET /api/forecast/profiling/profiles/{profile_id}** - A stored request profile
+    * **GET /api/forecast/profiling/flame** - Sampled stacks per route (folded flame graph data)
+    * **GET /metrics** - Prometheus metrics
+    """
+
+OPENAPI_TAGS = [
+    {"name": "Weather Forecast", "description": "Basic weather forecast operations"},
+    {"name": "Detailed Forecast", "description": "Detailed weather forecasts with extended data"},
+    {"name": "Weather Alerts", "description": "Weather alert operations"},
+    {"name": "Statistics", "description": "Weather statistics and analytics"},
+    {"name": "Streaming", "description": "NDJSON / Server-Sent-Events streams for long horizons"},
+    {"name": "Export", "description": "Columnar bulk export (CSV, Arrow IPC, Parquet)"},
+    {"name": "History", "description": "Recorded forecasts and statistics over arbitrary date ranges"},
+    {"name": "Cities", "description": "City search, autocomplete and nearest-city lookup"},
+    {"name": "Health", "description": "API health monitoring"}
+]
+
+SWAGGER_UI_PARAMETERS = {
+    "persistAuthorization": False,
+    "displayRequestDuration": True,
+    "filter": True,
+}
+
+# Files the OpenAPI schema is generated from; a change to any of them
+# invalidates the prebuilt document
+OPENAPI_SOURCES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ("main.py", "models.py", "config.py", "streaming.py", "export.py")
+]
+
+# Settings that appear in the OpenAPI schema (query parameter bounds)
+OPENAPI_SETTINGS = {"STREAM_MAX_DAYS": config.STREAM_MAX_DAYS, "HOURLY_MAX_DAYS": config.HOURLY_MAX_DAYS}
+
+# Routes are collected on a router and handed to the application by create_app
+router = APIRouter()
+
+metrics = MetricsRegistry()
+
+# Request profiles on demand (X-Profile header) and continuous stack sampling
+profiler = Profiler(
+    enabled=config.PROFILING_ENABLED,
+    token=config.PROFILING_TOKEN,
+    max_profiles=config.PROFILING_MAX_PROFILES,
+    sampling=config.PROFILING_SAMPLING,
+    interval=config.PROFILING_SAMPLE_INTERVAL_MS / 1000,
+    max_stacks=config.PROFILING_MAX_STACKS
+)
+
+# Sheds low-priority work with 429 when latency shows the server is saturated
+admission = AdmissionController(
+    router.routes,
+    initial_limit=config.ADMISSION_INITIAL_LIMIT,
+    min_limit=config.ADMISSION_MIN_LIMIT,
+    max_limit=config.ADMISSION_MAX_LIMIT,
+    max_request_cost=config.ADMISSION_MAX_REQUEST_COST,
+    enabled=config.ADMISSION_ENABLED,
+    metrics=metrics
+)
+
+# Generating service, with every method call timed into the service histogram
+forecast_service = instrument(
+    WeatherForecastService(
+        seed=config.FORECAST_SEED,
+        provider=create_provider(
+            config.PROVIDER,
+            seed=config.FORECAST_SEED,
+            upstream_url=config.UPSTREAM_URL,
+            max_connections=config.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive=config.UPSTREAM_MAX_KEEPALIVE,
+            keepalive_expiry=config.UPSTREAM_KEEPALIVE_EXPIRY,
+            timeout=config.UPSTREAM_TIMEOUT_SECONDS
+        )
+    ),
+    metrics.service_latency
+)
+
+# Forecast data cache: in-process, or shared by every worker through a cache file
+if config.SHARED_CACHE_PATH:
+    from sharedcache import SharedTTLCache
+
+    forecast_cache = SharedTTLCache(
+        config.SHARED_CACHE_PATH,
+        max_entries=config.CACHE_MAX_ENTRIES,
+        ttl=config.CACHE_TTL_SECONDS,
+        stale_ttl=config.CACHE_STALE_SECONDS,
+        slot_bytes=config.SHARED_CACHE_SLOT_BYTES
+    )
+else:
+    forecast_cache = TTLCache(
+        max_entries=config.CACHE_MAX_ENTRIES,
+        ttl=config.CACHE_TTL_SECONDS,
+        stale_ttl=config.CACHE_STALE_SECONDS
+    )
+
+# Recorded forecasts with monthly and yearly rollups, written behind the request path
+forecast_history = ForecastHistory(
+    config.HISTORY_PATH or ":memory:", max_indexes=config.HISTORY_INDEX_MAX_CITIES
+)
+history_recorder = HistoryRecorder(forecast_history, max_pending=config.HISTORY_MAX_PENDING)
+
+# Runs expensive cache misses off the event loop, in threads or processes by cost
+service_executor = ServiceExecutor(
+    forecast_service,
+    seed=config.FORECAST_SEED,
+    cost_model=CostModel(
+        thread_cost=config.EXECUTOR_THREAD_COST,
+        process_cost=config.EXECUTOR_PROCESS_COST
+    ),
+    thread_workers=config.EXECUTOR_THREAD_WORKERS,
+    process_workers=config.EXECUTOR_PROCESS_WORKERS,
+    max_queue=config.EXECUTOR_MAX_QUEUE,
+    timeout=config.EXECUTOR_TIMEOUT_SECONDS,
+    metrics=metrics
+)
+
+# Initialize service behind the forecast cache
+weather_service = CachedWeatherForecastService(
+    forecast_service,
+    forecast_cache,
+    tracker=HotSetTracker(half_life=config.PREWARM_HALF_LIFE_SECONDS),
+    executor=service_executor,
+    history=history_recorder if config.HISTORY_RECORD else None
+)
+
+# Keeps the most requested city forecasts warm (started from the lifespan)
+prewarmer = PrewarmScheduler(
+    weather_service,
+    weather_service.tracker,
+    seed_cities=weather_service.CITIES,
+    hot_set_size=config.PREWARM_HOT_SET_SIZE,
+    interval=config.PREWARM_INTERVAL_SECONDS,
+    refresh_ahead=config.PREWARM_REFRESH_AHEAD_SECONDS,
+    workers=config.PREWARM_WORKERS
+)
+
+# Canonical city index used to resolve user input before generation
+city_registry = CityRegistry(KNOWN_CITIES)
+if config.CITIES_FILE:
+    city_registry.load_csv(config.CITIES_FILE)
+
+
+def canonical_city(city: Optional[str]) -> Optional[str]:
+    """
+    Resolve user input to a registered city name, keeping unknown names as given
+
+    Only exact matches of the normalized name are resolved. A fuzzy match
+    would replace an unknown city with a different registered one (Nome
+    with Rome), and serve or record its forecasts under that name; typo
+    correction is left to /api/cities/search.
+    """
+    if city is None or city.strip() == "":
+        return city
+    match = city_registry.get(city)
+    return match.name if match else city.strip()
+
+
+FIELDS_DESCRIPTION = (
+    "Fields to return, comma-separated or repeated; the date is always included "
+    "and fields left out are not generated (default: every field)"
+)
+
+
+def requested_fields(fields: Optional[List[str]], detailed: bool = False) -> Optional[Tuple[str, ...]]:
+    """Canonical sparse fieldset of a fields query, or None for every field"""
+    names = [name.strip() for value in fields or () for name in value.split(",") if name.strip()]
+    if not names:
+        return None
+    selected = response_fields(names, detailed)
+    return None if len(selected) == len(DETAILED_FORECAST_FIELDS if detailed else FORECAST_FIELDS) else selected
+
+
+# Time-indexed alert store, fed from the service and expired in the background
+alert_store = AlertStore(retention=config.ALERTS_RETENTION_SECONDS)
+alert_monitor = AlertMonitor(
+    weather_service,
+    alert_store,
+    cities=weather_service.CITIES,
+    interval=config.ALERTS_REFRESH_INTERVAL_SECONDS
+)
+
+
+# Serialized response bodies with ETags for conditional GETs
+response_cache = ResponseCache(
+    TTLCache(max_entries=config.RESPONSE_CACHE_MAX_ENTRIES, ttl=config.CACHE_TTL_SECONDS),
+    serialization=metrics.serialization_latency
+)
+
+
+@router.get(
     "/api/forecast",
     response_model=List[WeatherForecast],
     summary="Get weather forecast",
@@ -87,17 +318,23 @@ weather_service = WeatherForecastService()
     tags=["Weather Forecast"]
 )
 async def get_forecast(
+    request: Request,
     days: int = Query(
         5,
         ge=1,
         le=30,
         description="Number of days to forecast"
+    ),
+    fields: Optional[List[str]] = Query(
+        None,
+        description=FIELDS_DESCRIPTION
     )
 ):
     """
     Get weather forecast for multiple days.
 
     - **days**: Number of days to forecast (default: 5, range: 1-30)
+    - **fields**: Optional fields to return (e.g. `temperature_c,summary`)
 
     Returns a list of weather forecasts with:
     - Temperature (Celsius and Fahrenheit)
@@ -105,10 +342,12 @@ async def get_forecast(
     - Humidity, wind speed, precipitation
     - Atmospheric pressure
     """
-    return weather_service.get_forecast(days)
+    return response_cache.respond(
+        request, await weather_service.call("get_forecast", days, requested_fields(fields))
+    )
 
 
-@app.get(
+@router.get(
     "/api/forecast/current",
     response_model=WeatherForecast,
     summary="Get current weather",
@@ -116,22 +355,31 @@ async def get_forecast(
     tags=["Weather Forecast"]
 )
 async def get_current_weather(
+    request: Request,
     city: Optional[str] = Query(
         None,
         description="City name (optional)"
+    ),
+    fields: Optional[List[str]] = Query(
+        None,
+        description=FIELDS_DESCRIPTION
     )
 ):
     """
     Get current weather conditions.
 
     - **city**: Optional city name
+    - **fields**: Optional fields to return (e.g. `temperature_c,summary`)
 
     Returns current weather including temperature, humidity, wind, and more.
     """
-    return weather_service.get_current_weather(city)
+    return response_cache.respond(
+        request,
+        await weather_service.call("get_current_weather", canonical_city(city), requested_fields(fields))
+    )
 
 
-@app.get(
+@router.get(
     "/api/forecast/city/{city}",
     response_model=List[WeatherForecast],
     summary="Get forecast by city",
@@ -139,6 +387,7 @@ async def get_current_weather(
     tags=["Weather Forecast"]
 )
 async def get_forecast_by_city(
+    request: Request,
     city: str = Path(
         ...,
         description="City name",
@@ -149,6 +398,10 @@ async def get_forecast_by_city(
         ge=1,
         le=30,
         description="Number of days to forecast"
+    ),
+    fields: Optional[List[str]] = Query(
+        None,
+        description=FIELDS_DESCRIPTION
     )
 ):
     """
@@ -156,16 +409,20 @@ async def get_forecast_by_city(
 
     - **city**: City name (required, path parameter)
     - **days**: Number of days to forecast (default: 5, range: 1-30)
+    - **fields**: Optional fields to return (e.g. `temperature_c,summary`)
 
     Returns city-specific weather forecast for multiple days.
     """
     if not city or city.strip() == "":
         raise HTTPException(status_code=400, detail="City name cannot be empty")
 
-    return weather_service.get_forecast_by_city(city, days)
+    selected = requested_fields(fields)
+    forecasts = await weather_service.fetch_forecast_by_city(canonical_city(city), days)
+    # Provider forecasts come whole (and are cached and recorded whole); only the response is trimmed
+    return response_cache.respond(request, forecasts if selected is None else select_fields(forecasts, selected))
 
 
-@app.get(
+@router.get(
     "/api/forecast/detailed",
     response_model=DetailedWeatherForecast,
     summary="Get detailed forecast",
@@ -173,6 +430,7 @@ async def get_forecast_by_city(
     tags=["Detailed Forecast"]
 )
 async def get_detailed_forecast(
+    request: Request,
     date: datetime = Query(
         ...,
         description="Date for the forecast (ISO format: YYYY-MM-DDTHH:MM:SS)"
@@ -180,6 +438,10 @@ async def get_detailed_forecast(
     city: Optional[str] = Query(
         None,
         description="City name (optional)"
+    ),
+    fields: Optional[List[str]] = Query(
+        None,
+        description=FIELDS_DESCRIPTION
     )
 ):
     """
@@ -187,6 +449,7 @@ async def get_detailed_forecast(
 
     - **date**: Date for the forecast (required, ISO format)
     - **city**: Optional city name
+    - **fields**: Optional fields to return (e.g. `temperature_c,summary`)
 
     Returns detailed forecast including:
     - All basic weather data
@@ -198,10 +461,15 @@ async def get_detailed_forecast(
     if date < datetime.now():
         raise HTTPException(status_code=400, detail="Date cannot be in the past")
 
-    return weather_service.get_detailed_forecast(date, city)
+    return response_cache.respond(
+        request,
+        await weather_service.call(
+            "get_detailed_forecast", date, canonical_city(city), requested_fields(fields, detailed=True)
+        )
+    )
 
 
-@app.get(
+@router.get(
     "/api/forecast/detailed/multi",
     response_model=List[DetailedWeatherForecast],
     summary="Get detailed forecasts",
@@ -209,25 +477,92 @@ async def get_detailed_forecast(
     tags=["Detailed Forecast"]
 )
 async def get_detailed_forecasts(
+    request: Request,
     days: int = Query(
         5,
         ge=1,
         le=30,
         description="Number of days to forecast"
+    ),
+    fields: Optional[List[str]] = Query(
+        None,
+        description=FIELDS_DESCRIPTION
     )
 ):
     """
     Get detailed weather forecasts for multiple days.
 
     - **days**: Number of days to forecast (default: 5, range: 1-30)
+    - **fields**: Optional fields to return (e.g. `temperature_c,summary`)
 
     Returns a list of detailed forecasts with extended information including
     cloud cover, UV index, visibility, and potential weather alerts.
     """
-    return weather_service.get_detailed_forecasts(days)
+    return response_cache.respond(
+        request, await weather_service.call("get_detailed_forecasts", days, requested_fields(fields, detailed=True))
+    )
 
 
-@app.get(
+@router.get(
+    "/api/forecast/hourly",
+    response_model=List[HourlyForecast],
+    summary="Get hourly forecast",
+    description="Get an hourly forecast series, optionally aggregated into buckets and downsampled to a point budget",
+    tags=["Weather Forecast"]
+)
+async def get_hourly_forecast(
+    request: Request,
+    days: int = Query(
+        1,
+        ge=1,
+        le=config.HOURLY_MAX_DAYS,
+        description="Number of days (24 hours each) to forecast"
+    ),
+    city: Optional[str] = Query(
+        None,
+        description="City name (optional)"
+    ),
+    bucket_hours: int = Query(
+        1,
+        ge=1,
+        le=24 * 7,
+        description="Consecutive hours aggregated into each point"
+    ),
+    points: Optional[int] = Query(
+        None,
+        ge=3,
+        description="Point budget; longer series are downsampled with LTTB"
+    ),
+    metric: HourlyMetric = Query(
+        HourlyMetric.TEMPERATURE,
+        description="Field whose peaks and troughs downsampling preserves"
+    )
+):
+    """
+    Get an hourly forecast series for charting.
+
+    - **days**: Number of days to forecast (default: 1)
+    - **city**: Optional city name
+    - **bucket_hours**: Aggregate this many hours into each point (default: 1)
+    - **points**: Optional point budget
+    - **metric**: Field used to pick the points kept by downsampling
+
+    The series starts at the next full hour and agrees with the daily
+    forecast. Buckets report mean temperature, humidity, wind speed and
+    pressure, the lowest and highest hourly temperature and the total
+    precipitation. With a point budget smaller than the series, the points
+    are chosen by Largest-Triangle-Three-Buckets on **metric**, which keeps
+    the visual shape (peaks and troughs) of the line a chart would draw.
+    """
+    return response_cache.respond(
+        request,
+        await weather_service.call(
+            "get_hourly_forecast", days, canonical_city(city), bucket_hours, points, metric.value
+        )
+    )
+
+
+@router.get(
     "/api/forecast/alerts",
     response_model=List[WeatherAlert],
     summary="Get weather alerts",
@@ -235,6 +570,7 @@ async def get_detailed_forecasts(
     tags=["Weather Alerts"]
 )
 async def get_weather_alerts(
+    request: Request,
     city: Optional[str] = Query(
         None,
         description="City name (optional)"
@@ -251,10 +587,131 @@ async def get_weather_alerts(
     - Description
     - Start and end times
     """
-    return weather_service.get_weather_alerts(city)
+    return response_cache.respond(request, alert_monitor.active(canonical_city(city)))
+
+
+@router.get(
+    "/api/alerts",
+    response_model=List[CityAlert],
+    summary="Query weather alerts",
+    description="Get stored alerts active during a time window, filtered by city, type and severity",
+    tags=["Weather Alerts"]
+)
+async def query_weather_alerts(
+    start: Optional[datetime] = Query(
+        None,
+        description="Window start (ISO format, default: now)"
+    ),
+    end: Optional[datetime] = Query(
+        None,
+        description="Window end (ISO format, default: the window start)"
+    ),
+    city: Optional[List[str]] = Query(
+        None,
+        description="City names (repeat the parameter for several cities; default: every stored city)"
+    ),
+    alert_type: Optional[List[AlertType]] = Query(
+        None,
+        description="Alert types to include (repeatable)"
+    ),
+    min_severity: Optional[Severity] = Query(
+        None,
+        description="Lowest severity to include"
+    )
+):
+    """
+    Query the alert store.
+
+    - **start** / **end**: Time window; an alert matches if it is active at any point in it
+    - **city**: Optional cities (repeatable)
+    - **alert_type**: Optional alert types (repeatable)
+    - **min_severity**: Optional lowest severity (Low < Moderate < High < Severe)
+
+    Returns matching alerts ordered by start time, with their id and city.
+    """
+    start = start or datetime.now()
+    cities = None
+    if city:
+        cities = [canonical_city(name) for name in city]
+        for name in cities:
+            alert_monitor.ensure(name)
+    entries = alert_store.query(start, end, cities, alert_type, min_severity)
+    return [entry.to_model() for entry in entries]
+
+
+@router.get(
+    "/api/alerts/subscribe",
+    response_model=List[CityAlert],
+    summary="Subscribe to weather alerts",
+    description="Server-Sent Events stream of alerts as they are created and expire",
+    tags=["Weather Alerts"]
+)
+async def subscribe_weather_alerts(
+    request: Request,
+    city: Optional[List[str]] = Query(
+        None,
+        description="City names (repeatable; default: every city)"
+    ),
+    alert_type: Optional[List[AlertType]] = Query(
+        None,
+        description="Alert types to include (repeatable)"
+    ),
+    min_severity: Optional[Severity] = Query(
+        None,
+        description="Lowest severity to include"
+    )
+):
+    """
+    Subscribe to alert changes.
+
+    - **city**: Optional cities (repeatable); they are watched while the stream is open
+    - **alert_type**: Optional alert types (repeatable)
+    - **min_severity**: Optional lowest severity
+
+    The stream starts with one `active` event per matching alert that has not
+    ended, then sends a `created` event for each new alert and an `expired`
+    event when an alert ends. Idle periods carry heartbeat comments.
+    """
+    cities = [canonical_city(name) for name in city] if city else None
+    if cities:
+        alert_monitor.watch(cities)
+    subscription = alert_store.subscribe(
+        cities, alert_type, min_severity, max_queue=config.ALERTS_SUBSCRIBER_QUEUE
+    )
+    active = alert_store.query(datetime.now(), datetime.max, cities, alert_type, min_severity)
 
+    def close() -> None:
+        alert_store.unsubscribe(subscription)
+        if cities:
+            alert_monitor.unwatch(cities)
+
+    return push_response(
+        request,
+        subscription.get,
+        initial=[("active", entry.to_model()) for entry in active],
+        heartbeat=config.ALERTS_HEARTBEAT_SECONDS,
+        on_close=close
+    )
+
+
+@router.get(
+    "/api/alerts/stats",
+    response_model=AlertStoreStats,
+    summary="Alert store statistics",
+    description="Get the size of the alert store, open subscriptions and expiry counters",
+    tags=["Weather Alerts"]
+)
+async def get_alert_store_stats():
+    """
+    Alert store statistics endpoint.
+
+    Returns stored alerts, cities, alerts not yet ended, open subscriptions,
+    watched cities, and the number of alerts expired and purged so far.
+    """
+    return AlertStoreStats(**alert_store.stats(), watched_cities=alert_monitor.watched)
 
-@app.get(
+
+@router.get(
     "/api/forecast/statistics",
     response_model=WeatherStatistics,
     summary="Get weather statistics",
@@ -262,28 +719,440 @@ async def get_weather_alerts(
     tags=["Statistics"]
 )
 async def get_weather_statistics(
+    request: Request,
     days: int = Query(
         7,
         ge=1,
-        le=365,
+        le=3650,
         description="Number of days to analyze"
     )
 ):
     """
     Get weather statistics for a specified period.
 
-    - **days**: Number of days to analyze (default: 7, range: 1-365)
+    - **days**: Number of days to analyze (default: 7, range: 1-3650)
 
     Returns comprehensive statistics including:
     - Average, maximum, and minimum temperatures
+    - Temperature standard deviation and p50/p90/p99 percentiles
     - Average humidity
-    - Total precipitation
-    - Average wind speed
+    - Total and maximum daily precipitation
+    - Average and maximum wind speed
+
+    Statistics are computed in a single streaming pass, so memory use does
+    not grow with the number of days.
+    """
+    return response_cache.respond(request, await weather_service.call("get_weather_statistics", days))
+
+
+STREAM_FORMAT_DESCRIPTION = "Stream format: ndjson or sse (defaults from the Accept header)"
+
+
+@router.get(
+    "/api/forecast/stream",
+    response_model=List[WeatherForecast],
+    summary="Stream weather forecast",
+    description="Stream a forecast horizon as NDJSON or Server-Sent Events",
+    tags=["Streaming"]
+)
+async def stream_forecast(
+    request: Request,
+    days: int = Query(
+        30,
+        ge=1,
+        le=config.STREAM_MAX_DAYS,
+        description="Number of days to forecast"
+    ),
+    city: Optional[str] = Query(
+        None,
+        description="City name (optional)"
+    ),
+    format: Optional[str] = Query(
+        None,
+        description=STREAM_FORMAT_DESCRIPTION
+    ),
+    fields: Optional[List[str]] = Query(
+        None,
+        description=FIELDS_DESCRIPTION
+    )
+):
+    """
+    Stream weather forecasts as they are generated.
+
+    - **days**: Number of days to forecast (default: 30)
+    - **city**: Optional city name
+    - **fields**: Optional fields to return (e.g. `temperature_c,summary`)
+    - **format**: `ndjson` (one forecast per line) or `sse` (one `forecast` event each)
+
+    Each item has the same shape as the items of `/api/forecast`.
+    """
+    fmt = negotiate_format(request, format)
+    return stream_response(weather_service.iter_forecasts(days, canonical_city(city), requested_fields(fields)), fmt)
+
+
+@router.get(
+    "/api/forecast/detailed/stream",
+    response_model=List[DetailedWeatherForecast],
+    summary="Stream detailed forecasts",
+    description="Stream detailed forecasts as NDJSON or Server-Sent Events",
+    tags=["Streaming"]
+)
+async def stream_detailed_forecasts(
+    request: Request,
+    days: int = Query(
+        30,
+        ge=1,
+        le=config.STREAM_MAX_DAYS,
+        description="Number of days to forecast"
+    ),
+    city: Optional[str] = Query(
+        None,
+        description="City name (optional)"
+    ),
+    format: Optional[str] = Query(
+        None,
+        description=STREAM_FORMAT_DESCRIPTION
+    ),
+    fields: Optional[List[str]] = Query(
+        None,
+        description=FIELDS_DESCRIPTION
+    )
+):
+    """
+    Stream detailed weather forecasts as they are generated.
+
+    - **days**: Number of days to forecast (default: 30)
+    - **city**: Optional city name
+    - **fields**: Optional fields to return (e.g. `temperature_c,summary`)
+    - **format**: `ndjson` (one forecast per line) or `sse` (one `forecast` event each)
+
+    Each item has the same shape as the items of `/api/forecast/detailed/multi`.
+    """
+    fmt = negotiate_format(request, format)
+    return stream_response(
+        weather_service.iter_detailed_forecasts(
+            days, canonical_city(city), requested_fields(fields, detailed=True)
+        ),
+        fmt
+    )
+
+
+@router.get(
+    "/api/forecast/statistics/stream",
+    response_model=List[WeatherStatistics],
+    summary="Stream weather statistics",
+    description="Stream progressively refined statistics as NDJSON or Server-Sent Events",
+    tags=["Streaming"]
+)
+async def stream_weather_statistics(
+    request: Request,
+    days: int = Query(
+        365,
+        ge=1,
+        le=config.STREAM_MAX_DAYS,
+        description="Number of days to analyze"
+    ),
+    format: Optional[str] = Query(
+        None,
+        description=STREAM_FORMAT_DESCRIPTION
+    )
+):
+    """
+    Stream weather statistics while the period is being analyzed.
+
+    - **days**: Number of days to analyze (default: 365)
+    - **format**: `ndjson` (one snapshot per line) or `sse` (one `statistics` event each)
+
+    A snapshot is emitted after each generated block of days; the last one
+    covers the whole period and equals `/api/forecast/statistics`.
+    """
+    fmt = negotiate_format(request, format)
+    return stream_response(weather_service.iter_weather_statistics(days), fmt, event="statistics")
+
+
+@router.get(
+    "/api/forecast/export",
+    summary="Bulk export forecasts",
+    description="Export forecasts for many cities as CSV, an Arrow IPC stream or Parquet",
+    tags=["Export"],
+    responses={
+        200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}},
+        406: {"description": "The requested format is not available"}
+    }
+)
+async def export_forecasts(
+    request: Request,
+    city: Optional[List[str]] = Query(
+        None,
+        description="City to export (repeatable)"
+    ),
+    all_cities: bool = Query(
+        False,
+        description="Export every registered city"
+    ),
+    days: int = Query(
+        30,
+        ge=1,
+        le=config.STREAM_MAX_DAYS,
+        description="Number of days to forecast"
+    ),
+    detailed: bool = Query(
+        False,
+        description="Include the detailed forecast fields and alerts"
+    ),
+    format: Optional[str] = Query(
+        None,
+        description="csv, arrow or parquet; defaults to the Accept header, then csv"
+    )
+):
+    """
+    Export forecasts for many cities in a columnar format.
+
+    - **city**: City names (repeatable); ignored when all_cities is true
+    - **all_cities**: Export every registered city
+    - **days**: Number of days to forecast (default: 30)
+    - **detailed**: Add cloud cover, UV index, visibility and the day's alert
+    - **format**: `csv`, `arrow` (Arrow IPC stream) or `parquet`; without it
+      the format follows the Accept header (`text/csv`,
+      `application/vnd.apache.arrow.stream`, `application/vnd.apache.parquet`)
+
+    One row per (city, date), ordered by city then date. The export is
+    generated and written in batches of cities, so it is never held in
+    memory as a whole. Arrow and Parquet require pyarrow on the server;
+    without it those formats are answered with 406.
+    """
+    fmt = negotiate_export_format(request, format)
+    if all_cities:
+        cities = [entry.name for entry in city_registry.cities]
+    elif city:
+        cities = list(dict.fromkeys(canonical_city(name) for name in city))
+    else:
+        cities = [None]
+    if len(cities) > config.EXPORT_MAX_CITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"An export may contain at most {config.EXPORT_MAX_CITIES} cities"
+        )
+
+    blocks = weather_service.iter_column_blocks(
+        days, cities, detailed=detailed, max_rows=config.EXPORT_BATCH_ROWS
+    )
+    return export_response(iter_export_batches(blocks), fmt)
+
+
+def history_range(city: str, start: Optional[date], end: Optional[date]) -> Optional[Tuple[date, date]]:
+    """Resolve an optional date range against a city's stored span"""
+    if start is None or end is None:
+        span = forecast_history.span(city)
+        if span is None:
+            return None
+        start, end = start or span[0], end or span[1]
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    return start, end
+
+
+@router.get(
+    "/api/history/{city}",
+    response_model=List[WeatherForecast],
+    summary="Get recorded forecasts",
+    description="Get the forecasts recorded for a city between two dates",
+    tags=["History"]
+)
+async def get_history(
+    city: str = Path(
+        ...,
+        description="City name",
+        min_length=1
+    ),
+    start: Optional[date] = Query(
+        None,
+        description="First day (YYYY-MM-DD, default: first recorded day)"
+    ),
+    end: Optional[date] = Query(
+        None,
+        description="Last day (YYYY-MM-DD, default: last recorded day)"
+    )
+):
+    """
+    Get recorded forecasts of a city.
+
+    - **city**: City name (required, path parameter)
+    - **start** / **end**: Optional inclusive date range
+
+    Returns one forecast per recorded day, in date order; a later recording
+    of a day replaces the earlier one.
+    """
+    city = canonical_city(city)
+    window = history_range(city, start, end)
+    if window is None:
+        return json_response([])
+    if (window[1] - window[0]).days >= config.HISTORY_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A history request may cover at most {config.HISTORY_MAX_DAYS} days"
+        )
+    return json_response(await asyncio.to_thread(forecast_history.forecasts, city, *window))
+
+
+@router.post(
+    "/api/history/{city}",
+    response_model=HistoryIngestResult,
+    summary="Record forecasts",
+    description="Record forecasts (e.g. observations or an external model run) for a city",
+    tags=["History"]
+)
+async def record_history(
+    city: str = Path(
+        ...,
+        description="City name",
+        min_length=1
+    ),
+    forecasts: List[WeatherForecast] = Body(
+        ...,
+        description="Forecasts to record, one per day"
+    )
+):
+    """
+    Record forecasts of a city.
+
+    - **city**: City name (required, path parameter)
+    - Request body: list of forecasts
+
+    A forecast for a day already recorded replaces it, and the monthly and
+    yearly rollups of the changed days are updated in the same transaction.
+    """
+    city = canonical_city(city)
+    if len(forecasts) > config.HISTORY_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.HISTORY_MAX_DAYS} forecasts may be recorded at once"
+        )
+    records = [ForecastRecord.from_model(forecast) for forecast in forecasts]
+    recorded = await asyncio.to_thread(forecast_history.record, city, records)
+    return HistoryIngestResult(city=city, received=len(forecasts), recorded=recorded)
+
+
+@router.get(
+    "/api/history/{city}/statistics",
+    response_model=WeatherStatistics,
+    summary="Get statistics of recorded forecasts",
+    description="Get weather statistics of a city's recorded forecasts between two dates",
+    tags=["History"],
+    responses={404: {"description": "No forecast of the city is recorded in the range"}}
+)
+async def get_history_statistics(
+    city: str = Path(
+        ...,
+        description="City name",
+        min_length=1
+    ),
+    start: Optional[date] = Query(
+        None,
+        description="First day (YYYY-MM-DD, default: first recorded day)"
+    ),
+    end: Optional[date] = Query(
+        None,
+        description="Last day (YYYY-MM-DD, default: last recorded day)"
+    )
+):
+    """
+    Get statistics of a city's recorded forecasts.
+
+    - **city**: City name (required, path parameter)
+    - **start** / **end**: Optional inclusive date range
+
+    Returns the same statistics as `/api/forecast/statistics`, with
+    **days_analyzed** the number of recorded days in the range. They are
+    merged from the yearly and monthly rollups the range covers and the day
+    rows of at most two partial months, so the cost hardly grows with the
+    length of the range.
+    """
+    city = canonical_city(city)
+    window = history_range(city, start, end)
+    statistics = None
+    if window is not None:
+        statistics = await asyncio.to_thread(forecast_history.statistics, city, *window)
+    if statistics is None:
+        raise HTTPException(status_code=404, detail=f"No recorded forecasts for {city} in this range")
+    return json_response(statistics)
+
+
+# Longest trailing window of /api/history/{city}/statistics/range (100 years)
+MAX_WINDOW_DAYS = 36600
+
+
+@router.get(
+    "/api/history/{city}/statistics/range",
+    response_model=List[WindowStatistics],
+    summary="Get statistics of recorded forecasts over windows",
+    description="Get weather statistics of a city's recorded forecasts over a date range and trailing windows",
+    tags=["History"]
+)
+async def get_history_window_statistics(
+    city: str = Path(
+        ...,
+        description="City name",
+        min_length=1
+    ),
+    start: Optional[date] = Query(
+        None,
+        description="First day of a custom range (YYYY-MM-DD)"
+    ),
+    end: Optional[date] = Query(
+        None,
+        description="Last day of the range and of every trailing window (default: last recorded day)"
+    ),
+    last: Optional[List[int]] = Query(
+        None,
+        description="Trailing window lengths in days, ending at end (repeatable, e.g. 7, 30, 90)"
+    )
+):
+    """
+    Get statistics of a city's recorded forecasts over several windows.
+
+    - **city**: City name (required, path parameter)
+    - **start** / **end**: Optional custom range (inclusive)
+    - **last**: Trailing windows in days ending at **end** (repeatable)
+
+    Returns one entry per window: the custom range first (when **start** is
+    given, or when no trailing window is asked for, the whole recorded span),
+    then the trailing windows in the order given. **statistics** is null for
+    a window with no recorded day. Every window is answered from the city's
+    prefix-sum and sparse-table index in constant time, however long it is.
     """
-    return weather_service.get_weather_statistics(days)
+    city = canonical_city(city)
+    windows = []
+    if start is not None or not last:
+        window = history_range(city, start, end)
+        if window is None:
+            raise HTTPException(status_code=404, detail=f"No recorded forecasts for {city}")
+        windows.append(window)
+    if last:
+        if any(days < 1 or days > MAX_WINDOW_DAYS for days in last):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Window lengths must be between 1 and {MAX_WINDOW_DAYS} days"
+            )
+        if end is None:
+            span = forecast_history.span(city)
+            if span is None:
+                raise HTTPException(status_code=404, detail=f"No recorded forecasts for {city}")
+            end = span[1]
+        windows += [(end - timedelta(days=days - 1), end) for days in last]
+    if len(windows) > config.HISTORY_MAX_WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A request may ask for at most {config.HISTORY_MAX_WINDOWS} windows"
+        )
+    statistics = await asyncio.to_thread(forecast_history.window_statistics, city, windows)
+    return json_response([
+        {"start": first, "end": last_day, "statistics": window_statistics}
+        for (first, last_day), window_statistics in zip(windows, statistics)
+    ])
 
 
-@app.post(
+@router.post(
     "/api/forecast/request",
     response_model=List[WeatherForecast],
     summary="Create custom forecast request",
@@ -309,12 +1178,191 @@ async def create_forecast_request(
         raise HTTPException(status_code=400, detail="Days must be between 1 and 30")
 
     if request.city and request.city.strip() != "":
-        return weather_service.get_forecast_by_city(request.city, request.days)
+        forecasts = await weather_service.fetch_forecast_by_city(canonical_city(request.city), request.days)
     else:
-        return weather_service.get_forecast(request.days)
+        forecasts = await weather_service.call("get_forecast", request.days)
+    return json_response(forecasts)
+
+
+@router.post(
+    "/api/forecast/batch",
+    response_model=BatchForecastResponse,
+    summary="Batch forecast for many cities",
+    description="Get forecasts for a list of cities (or every known city) in a single request",
+    tags=["Weather Forecast"]
+)
+async def create_batch_forecast(
+    request: BatchForecastRequest = Body(
+        ...,
+        description="Batch forecast request parameters"
+    )
+):
+    """
+    Get weather forecasts for many cities in one round trip.
+
+    Request body:
+    - **cities**: List of city names (ignored when all_cities is true)
+    - **all_cities**: Forecast every known city
+    - **days**: Number of days to forecast (default: 5, range: 1-30)
+
+    Cities are fetched concurrently. Failures are reported per city in
+    **errors** instead of failing the whole batch.
+    """
+    cities = weather_service.CITIES if request.all_cities else request.cities
+    if len(cities) > config.BATCH_MAX_CITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {config.BATCH_MAX_CITIES} cities"
+        )
+
+    async def fetch(city: str):
+        return await weather_service.fetch_forecast_by_city(canonical_city(city), request.days)
+
+    forecasts, errors = await fan_out(cities, fetch, concurrency=config.BATCH_CONCURRENCY)
+    return json_response({"days": request.days, "forecasts": forecasts, "errors": errors})
+
+
+@router.post(
+    "/api/forecast/query",
+    response_model=CompositeQueryResponse,
+    summary="Composite query",
+    description="Run several forecast operations (current, forecast, detailed, statistics, alerts) in one request",
+    tags=["Weather Forecast"]
+)
+async def run_composite_query(
+    request: CompositeQueryRequest = Body(
+        ...,
+        description="Operations to run"
+    )
+):
+    """
+    Run several operations in one round trip.
+
+    Request body:
+    - **operations**: List of operations, each with
+      - **op**: `current`, `forecast`, `detailed`, `statistics` or `alerts`
+      - **city**: Optional city name
+      - **days**: Days to forecast or analyze (defaults as on the operation's endpoint)
+      - **fields**: Optional fields to return (current, forecast and detailed)
+
+    Each result holds what the operation's endpoint returns, except that
+    statistics are per city: with a city they cover that city's forecasts,
+    which `/api/forecast/statistics` does not offer; without one they equal
+    the endpoint's. Operations run concurrently, and the generated ones for one city (current, detailed,
+    statistics and forecasts without a city) share a single generation pass.
+    Failures are reported per operation in **error**.
+    """
+    if len(request.operations) > config.QUERY_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A query may contain at most {config.QUERY_MAX_OPERATIONS} operations"
+        )
+
+    operations = []
+    for index, operation in enumerate(request.operations):
+        op = operation.op.value
+        try:
+            fields = requested_fields(operation.fields, detailed=op == "detailed")
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Operation {index}: {exc}")
+        days = operation.days or QUERY_DEFAULT_DAYS[op]
+        operations.append(Operation(op, canonical_city(operation.city), days, fields))
+
+    results, errors, groups = await run_query(weather_service, operations, alert_monitor.active)
+    return json_response({
+        "results": [
+            {"op": operation.op, "city": operation.city, "data": result, "error": errors.get(index)}
+            for index, (operation, result) in enumerate(zip(operations, results))
+        ],
+        "generation_groups": groups
+    })
+
+
+@router.get(
+    "/api/cities/search",
+    response_model=List[CityMatch],
+    summary="Search cities",
+    description="Autocomplete and typo-tolerant city search",
+    tags=["Cities"]
+)
+async def search_cities(
+    q: str = Query(
+        ...,
+        min_length=1,
+        description="City name, prefix or misspelling"
+    ),
+    limit: int = Query(
+        10,
+        ge=1,
+        le=50,
+        description="Maximum number of results"
+    ),
+    max_distance: Optional[int] = Query(
+        None,
+        ge=0,
+        le=2,
+        description="Maximum edit distance for fuzzy matches (default scales with query length)"
+    )
+):
+    """
+    Search the city index.
+
+    - **q**: Query (case, accents and punctuation are ignored)
+    - **limit**: Maximum number of results (default: 10)
+    - **max_distance**: Edit budget for fuzzy matches
+
+    Returns exact matches first, then prefix completions, then fuzzy matches
+    ordered by edit distance.
+    """
+    return [
+        CityMatch(**result.city._asdict(), match=result.match, distance=result.distance)
+        for result in city_registry.search(q, limit, max_distance)
+    ]
+
+
+@router.get(
+    "/api/cities/nearest",
+    response_model=List[NearbyCity],
+    summary="Nearest cities",
+    description="Find the cities closest to a latitude/longitude",
+    tags=["Cities"]
+)
+async def get_nearest_cities(
+    lat: float = Query(
+        ...,
+        ge=-90,
+        le=90,
+        description="Latitude in degrees"
+    ),
+    lon: float = Query(
+        ...,
+        ge=-180,
+        le=180,
+        description="Longitude in degrees"
+    ),
+    k: int = Query(
+        5,
+        ge=1,
+        le=50,
+        description="Number of cities to return"
+    )
+):
+    """
+    Find the nearest cities to a coordinate.
 
+    - **lat**: Latitude (-90 to 90)
+    - **lon**: Longitude (-180 to 180)
+    - **k**: Number of cities to return (default: 5)
 
-@app.get(
+    Returns cities ordered by great-circle distance.
+    """
+    return [
+        NearbyCity(**city._asdict(), distance_km=distance)
+        for city, distance in city_registry.nearest(lat, lon, k)
+    ]
+
+
+@router.get(
     "/api/forecast/health",
     response_model=HealthCheck,
     summary="Health check",
@@ -334,7 +1382,201 @@ async def get_health():
     )
 
 
-@app.get(
+@router.get(
+    "/api/forecast/cache",
+    response_model=CacheReport,
+    summary="Cache statistics",
+    description="Get hit/miss counters of the forecast data and serialized response caches",
+    tags=["Health"]
+)
+async def get_cache_stats():
+    """
+    Cache statistics endpoint.
+
+    Returns entry count, hit/miss counters, hit ratio, evictions and expirations
+    for both the forecast data cache and the serialized response cache.
+
+    With several workers the forecast cache is shared (`shared: true`) and its
+    counters cover every worker; response cache counters are those of the
+    worker that answered.
+    """
+    return CacheReport(
+        forecasts=CacheStats(**weather_service.cache.stats()),
+        responses=CacheStats(**response_cache.cache.stats())
+    )
+
+
+@router.get(
+    "/api/forecast/provider",
+    response_model=Dict[str, Any],
+    summary="Provider statistics",
+    description="Get the active forecast provider and its upstream/coalescing counters",
+    tags=["Health"]
+)
+async def get_provider_stats():
+    """
+    Provider statistics endpoint.
+
+    Returns the provider name and, for the HTTP provider, upstream calls,
+    coalesced calls, in-flight requests and upstream errors.
+    """
+    return weather_service.provider.stats()
+
+
+@router.get(
+    "/api/forecast/prewarm",
+    response_model=PrewarmStats,
+    summary="Prewarming statistics",
+    description="Get the hot set, queue depth and refresh timings of the prewarming scheduler",
+    tags=["Health"]
+)
+async def get_prewarm_stats():
+    """
+    Prewarming scheduler statistics endpoint.
+
+    Returns the current hot set of cities, the refresh queue depth, refreshes
+    in progress, stale-while-revalidate refreshes in flight and refresh timings.
+    """
+    return PrewarmStats(enabled=config.PREWARM_ENABLED, **prewarmer.stats())
+
+
+@router.get(
+    "/api/forecast/executor",
+    response_model=ExecutorStats,
+    summary="Executor statistics",
+    description="Get queue depth, rejections, timeouts and queue vs execution time per executor pool",
+    tags=["Health"]
+)
+async def get_executor_stats():
+    """
+    Service call executor statistics endpoint.
+
+    Returns, for the inline, thread and process pools, the calls in flight,
+    completed, failed, rejected (queue full) and timed out, and the mean time
+    calls spent queued, executing and handing their result back.
+    """
+    return ExecutorStats(**service_executor.stats())
+
+
+@router.get(
+    "/api/forecast/admission",
+    response_model=AdmissionStats,
+    summary="Admission control statistics",
+    description="Get the adaptive concurrency limit, load in flight and requests admitted / shed per priority",
+    tags=["Health"]
+)
+async def get_admission_stats():
+    """
+    Admission control statistics endpoint.
+
+    Returns the current adaptive limit and the cost units in flight, the
+    baseline and recent latency per cost unit that drive the limit, and the
+    requests admitted and shed with 429 for each priority class.
+    """
+    return AdmissionStats(**admission.stats())
+
+
+@router.get(
+    "/api/forecast/history",
+    response_model=HistoryStats,
+    summary="Forecast history statistics",
+    description="Get the size of the forecast history store and its write counters",
+    tags=["Health"]
+)
+async def get_history_stats():
+    """
+    Forecast history statistics endpoint.
+
+    Returns the cities, days and rollup rows stored, the days recorded and
+    skipped as unchanged since startup, and the batches waiting to be
+    written, dropped and failed.
+    """
+    stats = await asyncio.to_thread(forecast_history.stats)
+    return HistoryStats(recording=config.HISTORY_RECORD, **stats, **history_recorder.stats())
+
+
+@router.get(
+    "/api/forecast/profiling",
+    response_model=ProfilingStats,
+    summary="Profiling statistics",
+    description="Get the profiling configuration, continuous sampler state and the stored request profiles",
+    tags=["Health"]
+)
+async def get_profiling_stats():
+    """
+    Profiling statistics endpoint.
+
+    Returns whether requests may ask for a profile with the X-Profile header
+    and whether they need a token, the continuous sampler's state with its
+    samples per route, and a summary of every stored request profile.
+    """
+    return ProfilingStats(**profiler.stats())
+
+
+@router.get(
+    "/api/forecast/profiling/profiles/{profile_id}",
+    response_model=RequestProfile,
+    summary="Request profile",
+    description="Get a stored request profile by the id returned in its X-Profile-Id header (or latest)",
+    tags=["Health"]
+)
+async def get_request_profile(
+    profile_id: str = Path(..., description="Profile id from the X-Profile-Id response header, or latest")
+):
+    """
+    Request profile endpoint.
+
+    A cProfile profile lists the functions with the largest cumulative time
+    and the time spent in each category (the application, pydantic,
+    starlette, orjson, numpy, ...); a sampled profile holds the folded stacks
+    of the request.
+    """
+    profile = profiler.profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return RequestProfile(**profile)
+
+
+@router.get(
+    "/api/forecast/profiling/flame",
+    response_class=Response,
+    summary="Sampled flame graph data",
+    description="Stacks sampled by the continuous sampler, in the folded format of flamegraph.pl and speedscope",
+    tags=["Health"]
+)
+async def get_flame_graph(
+    route: Optional[str] = Query(None, description="Route template to return (default: every route, as the root frame)")
+):
+    """
+    Flame graph endpoint.
+
+    Returns one "frame;frame;... count" line per sampled stack. Without a
+    route, every route's stacks are returned under the route as root frame,
+    with the event loop's own work and the service threads as routes of
+    their own.
+    """
+    return Response(content=profiler.flame.folded(route), media_type="text/plain; charset=utf-8")
+
+
+@router.get(
+    "/metrics",
+    response_class=Response,
+    summary="Prometheus metrics",
+    description="Request latency, response size, in-flight, service and serialization metrics",
+    tags=["Health"]
+)
+async def get_metrics():
+    """
+    Metrics endpoint in the Prometheus text exposition format.
+
+    Exposes per-route request counts by status, latency and response size
+    histograms, requests in flight, and latency histograms of the service
+    methods and of response serialization.
+    """
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@router.get(
     "/",
     include_in_schema=False
 )
@@ -350,7 +1592,6 @@ async def root():
 
 
 # Exception handlers
-@app.exception_handler(ValueError)
 async def value_error_handler(request, exc):
     return JSONResponse(
         status_code=400,
@@ -358,6 +1599,118 @@ async def value_error_handler(request, exc):
     )
 
 
+async def provider_error_handler(request, exc):
+    return JSONResponse(
+        status_code=502,
+        content={"detail": str(exc)}
+    )
+
+
+async def executor_saturated_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": f"{exc.retry_after:g}"}
+    )
+
+
+async def executor_timeout_handler(request, exc):
+    return JSONResponse(
+        status_code=504,
+        content={"detail": str(exc)}
+    )
+
+
+def create_app() -> FastAPI:
+    """
+    Build the ASGI application
+
+    Services, caches and background tasks are module-level and shared by
+    every application built here; the factory assembles the routes,
+    middleware and documentation around them. The OpenAPI document is read
+    from its prebuilt cache file when it is current, so a new process does
+    not generate it on its first /openapi.json or /docs request. Serve with
+    ``uvicorn main:app`` or ``uvicorn --factory main:create_app``.
+    """
+    app = FastAPI(
+        lifespan=lifespan,
+        title="Weather Forecast API",
+        description=DESCRIPTION,
+        version="1.0.0",
+        contact={
+            "name": "Weather API Team",
+            "email": "weather@example.com"
+        },
+        license_info={
+            "name": "MIT",
+        },
+        openapi_tags=OPENAPI_TAGS,
+        # The router's routes are used as built; include_router would build
+        # a second copy of every route on the first request
+        routes=router.routes,
+        # Documentation routes are served from the prebuilt document below
+        docs_url=None,
+        redoc_url=None,
+        openapi_url=None
+    )
+
+    app.add_exception_handler(ValueError, value_error_handler)
+    app.add_exception_handler(ProviderError, provider_error_handler)
+    app.add_exception_handler(ExecutorSaturated, executor_saturated_handler)
+    app.add_exception_handler(ExecutorTimeout, executor_timeout_handler)
+
+    # Admission runs inside CORS so shed responses still carry the CORS headers
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+
+    # Add CORS middleware to allow all origins (completely open)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins
+        allow_credentials=True,
+        allow_methods=["*"],  # Allow all methods
+        allow_headers=["*"],  # Allow all headers
+        expose_headers=["ETag", "X-Profile-Id"],  # Let browser clients revalidate with If-None-Match
+    )
+
+    # Latency/size histograms per route; added last so it wraps every other layer
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    # Outside the metrics so profiling overhead stays out of the latency
+    # histograms; without profiling or sampling configured it is left out
+    if config.PROFILING_ENABLED or config.PROFILING_SAMPLING:
+        app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+    openapi_cache = OpenAPICache(app, config.OPENAPI_CACHE_PATH, OPENAPI_SOURCES, OPENAPI_SETTINGS)
+    openapi_cache.load()
+    openapi_cache.install(
+        openapi_url="/openapi.json",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        swagger_ui_parameters=SWAGGER_UI_PARAMETERS
+    )
+    app.state.openapi_cache = openapi_cache
+    return app
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
+    import tempfile
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    if config.WORKERS > 1:
+        from sharedcache import SharedTTLCache
+
+        # Every worker imports main:app itself and attaches to one fresh cache file
+        cache_path = config.SHARED_CACHE_PATH or os.path.join(
+            tempfile.gettempdir(), f"weather-forecast-cache-{os.getpid()}.bin"
+        )
+        SharedTTLCache.reset(cache_path)
+        os.environ["WEATHER_SHARED_CACHE_PATH"] = cache_path
+        try:
+            uvicorn.run("main:app", host=config.HOST, port=config.PORT, workers=config.WORKERS)
+        finally:
+            SharedTTLCache.reset(cache_path)
+    else:
+        uvicorn.run(app, host=config.HOST, port=config.PORT)
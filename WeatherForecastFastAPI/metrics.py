@@ -0,0 +1,355 @@
+"""
+Request and service instrumentation with Prometheus text exposition
+
+Histograms use fixed bucket bounds, so recording a value is a bisect and two
+additions under a lock. MetricsMiddleware is a plain ASGI middleware (no
+per-request task or body buffering) that labels requests by route template.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; fine-grained at the low end where cached responses land
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Labelled metric family; children are created on first use"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        """Child metric for one combination of label values"""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, child in sorted(self._children.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that goes up and down (e.g. requests in flight)"""
+
+    kind = "gauge"
+
+
+class _HistogramValues:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets
+
+    Bucket counts are stored per bucket and only made cumulative when
+    rendered, as Prometheus expects.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValues:
+        return _HistogramValues(self.buckets)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bounds = self.buckets + (float("inf"),)
+        for values, child in sorted(self._children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metric families exported by the service"""
+
+    def __init__(self, prefix: str = "weather"):
+        self.http_requests = Counter(
+            f"{prefix}_http_requests_total", "HTTP requests by route and status",
+            ("method", "route", "status")
+        )
+        self.http_latency = Histogram(
+            f"{prefix}_http_request_duration_seconds",
+            "Time from request start to the last response byte", ("method", "route")
+        )
+        self.http_response_size = Histogram(
+            f"{prefix}_http_response_size_bytes", "Response body size",
+            ("method", "route"), buckets=SIZE_BUCKETS
+        )
+        self.http_in_flight = Gauge(
+            f"{prefix}_http_requests_in_flight", "HTTP requests currently being served", ("method",)
+        )
+        self.service_latency = Histogram(
+            f"{prefix}_service_call_duration_seconds",
+            "Time spent in WeatherForecastService methods", ("method",)
+        )
+        self.serialization_latency = Histogram(
+            f"{prefix}_serialization_duration_seconds",
+            "Time spent serializing response models to JSON", ("route",)
+        )
+        self.executor_queue = Histogram(
+            f"{prefix}_executor_queue_seconds",
+            "Time service calls waited for an executor worker", ("pool", "method")
+        )
+        self.executor_execution = Histogram(
+            f"{prefix}_executor_execution_seconds",
+            "Time service calls ran on an executor worker", ("pool", "method")
+        )
+        self.executor_rejected = Counter(
+            f"{prefix}_executor_rejected_total",
+            "Service calls rejected because the executor queue was full", ("pool",)
+        )
+        self.executor_timeouts = Counter(
+            f"{prefix}_executor_timeouts_total",
+            "Service calls that exceeded the executor timeout", ("pool",)
+        )
+        self.admission_limit = Gauge(
+            f"{prefix}_admission_limit", "Current adaptive concurrency limit, in cost units"
+        )
+        self.admission_in_flight = Gauge(
+            f"{prefix}_admission_in_flight", "Cost units of the admitted requests in flight"
+        )
+        self.admission_rejected = Counter(
+            f"{prefix}_admission_rejected_total", "Requests shed with 429 by priority", ("priority",)
+        )
+
+    @property
+    def families(self) -> List[_Metric]:
+        return [value for value in vars(self).values() if isinstance(value, _Metric)]
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for family in self.families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+def route_label(scope: Dict[str, Any]) -> str:
+    """Route template of a request (e.g. /api/forecast/city/{city}), bounded in cardinality"""
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE) if route is not None else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, size, status and in-flight requests
+
+    Latency runs until the last body chunk is sent, so streamed responses are
+    measured in full. Requests that match no route share one label value.
+
+    Args:
+        app: Wrapped ASGI application
+        metrics: Registry to record into
+    """
+
+    def __init__(self, app: Callable, metrics: MetricsRegistry):
+        self.app = app
+        self.metrics = metrics
+        # (method, route, status) -> (request counter, latency, size) children
+        self._children: Dict[Tuple[str, str, int], Tuple[_Value, _HistogramValues, _HistogramValues]] = {}
+
+    def _route_children(self, method: str, route: str, status: int):
+        key = (method, route, status)
+        children = self._children.get(key)
+        if children is None:
+            metrics = self.metrics
+            children = self._children.setdefault(key, (
+                metrics.http_requests.labels(method, route, str(status)),
+                metrics.http_latency.labels(method, route),
+                metrics.http_response_size.labels(method, route)
+            ))
+        return children
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = self.metrics.http_in_flight.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            elif message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            requests, latency, response_size = self._route_children(method, route_label(scope), status)
+            requests.inc()
+            latency.observe(elapsed)
+            response_size.observe(size)
+
+
+def instrument(obj: Any, histogram: Histogram, names: Optional[Iterable[str]] = None) -> Any:
+    """
+    Time an object's public methods into a histogram labelled by method name
+
+    Methods are replaced on the instance, so callers holding the object (for
+    example the caching facade) are timed without changes. Coroutine
+    functions are timed until they complete; generator methods are left
+    alone because their work happens after the call returns.
+
+    Args:
+        obj: Object to instrument in place
+        histogram: Histogram with a single "method" label
+        names: Methods to time (defaults to every public method)
+
+    Returns:
+        The same object
+    """
+    if names is None:
+        names = [name for name in dir(type(obj)) if not name.startswith("_")]
+    for name in names:
+        method = getattr(obj, name, None)
+        if not callable(method) or inspect.isclass(method) or inspect.isgeneratorfunction(method):
+            continue
+        setattr(obj, name, _timed(method, histogram.labels(name)))
+    return obj
+
+
+def _timed(method: Callable, child: _HistogramValues) -> Callable:
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def timed_async(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return timed_async
+
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - start)
+    return timed
@@ -1,6 +1,6 @@
-from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import Any, Optional, List, Dict
+from pydantic import BaseModel, Field, model_validator
 from enum import Enum
 
 
@@ -34,6 +34,24 @@ class WindDirection(str, Enum):
     NW = "NW"
 
 
+class HourlyMetric(str, Enum):
+    """Field of an hourly forecast that downsampling preserves the shape of"""
+    TEMPERATURE = "temperature_c"
+    HUMIDITY = "humidity"
+    WIND_SPEED = "wind_speed"
+    PRECIPITATION = "precipitation"
+    PRESSURE = "pressure"
+
+
+class QueryOperationType(str, Enum):
+    """Operation of a composite query"""
+    CURRENT = "current"
+    FORECAST = "forecast"
+    DETAILED = "detailed"
+    STATISTICS = "statistics"
+    ALERTS = "alerts"
+
+
 class WeatherForecast(BaseModel):
     """Basic weather forecast model"""
     date: datetime = Field(..., description="Date and time of the forecast")
@@ -62,6 +80,34 @@ class WeatherForecast(BaseModel):
         }
 
 
+class HourlyForecast(BaseModel):
+    """Hourly weather forecast point, or an aggregate of consecutive hours"""
+    time: datetime = Field(..., description="Start of the hour (or of the aggregated hours)")
+    hours: int = Field(..., description="Hours aggregated into the point", ge=1)
+    temperature_c: float = Field(..., description="Mean temperature in Celsius")
+    temperature_min_c: float = Field(..., description="Lowest hourly temperature in Celsius")
+    temperature_max_c: float = Field(..., description="Highest hourly temperature in Celsius")
+    humidity: float = Field(..., description="Mean humidity percentage", ge=0, le=100)
+    wind_speed: float = Field(..., description="Mean wind speed in km/h", ge=0)
+    precipitation: float = Field(..., description="Precipitation in mm over the point's hours", ge=0)
+    pressure: float = Field(..., description="Mean atmospheric pressure in hPa")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "time": "2025-10-30T14:00:00",
+                "hours": 3,
+                "temperature_c": 21.4,
+                "temperature_min_c": 20.8,
+                "temperature_max_c": 22.1,
+                "humidity": 58.3,
+                "wind_speed": 14.25,
+                "precipitation": 0.6,
+                "pressure": 1012.7
+            }
+        }
+
+
 class WeatherAlert(BaseModel):
     """Weather alert model"""
     alert_type: AlertType = Field(..., description="Type of weather alert")
@@ -82,6 +128,25 @@ class WeatherAlert(BaseModel):
         }
 
 
+class CityAlert(WeatherAlert):
+    """Weather alert held by the alert store"""
+    id: int = Field(..., description="Alert identifier, unique within the running service")
+    city: Optional[str] = Field(None, description="City the alert applies to (None for the default location)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": 17,
+                "city": "London",
+                "alert_type": "Thunderstorm",
+                "severity": "High",
+                "description": "Weather alert 1 for London",
+                "start_time": "2025-10-30T14:00:00",
+                "end_time": "2025-10-30T18:00:00"
+            }
+        }
+
+
 class DetailedWeatherForecast(BaseModel):
     """Detailed weather forecast with extended information"""
     date: datetime = Field(..., description="Date and time of the forecast")
@@ -96,6 +161,21 @@ class DetailedWeatherForecast(BaseModel):
     cloud_cover: int = Field(..., description="Cloud cover percentage", ge=0, le=100)
     uv_index: float = Field(..., description="UV index", ge=0, le=11)
     visibility: int = Field(..., description="Visibility in km", ge=0)
+    dew_point_c: float = Field(..., description="Dew point in Celsius")
+    heat_index_c: float = Field(
+        ..., description="Heat index in Celsius (NWS); the air temperature below 26.7 C"
+    )
+    wind_chill_c: float = Field(
+        ..., description="Wind chill in Celsius; the air temperature above 10 C or below 4.8 km/h of wind"
+    )
+    apparent_temperature_c: float = Field(
+        ..., description="Feels-like temperature in Celsius: the heat index when hot, the wind chill when cold"
+    )
+    comfort_flags: List[str] = Field(
+        ...,
+        description="Alert thresholds crossed: heat_danger, extreme_heat, frostbite_risk, "
+                    "extreme_cold, oppressive_humidity"
+    )
     alerts: Optional[List[WeatherAlert]] = Field(None, description="Active weather alerts")
 
     class Config:
@@ -113,6 +193,11 @@ class DetailedWeatherForecast(BaseModel):
                 "cloud_cover": 45,
                 "uv_index": 6.5,
                 "visibility": 10,
+                "dew_point_c": 15.2,
+                "heat_index_c": 22.0,
+                "wind_chill_c": 22.0,
+                "apparent_temperature_c": 22.0,
+                "comfort_flags": [],
                 "alerts": []
             }
         }
@@ -132,6 +217,130 @@ class WeatherForecastRequest(BaseModel):
         }
 
 
+class BatchForecastRequest(BaseModel):
+    """Request model for a multi-city batch forecast"""
+    cities: Optional[List[str]] = Field(None, description="City names to forecast")
+    all_cities: bool = Field(False, description="Forecast every known city instead of a list")
+    days: int = Field(5, description="Number of days to forecast", ge=1, le=30)
+
+    @model_validator(mode="after")
+    def check_cities(self):
+        if not self.all_cities and not self.cities:
+            raise ValueError("Provide a list of cities or set all_cities to true")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "cities": ["London", "Tokyo", "Paris"],
+                "all_cities": False,
+                "days": 3
+            }
+        }
+
+
+class BatchForecastResponse(BaseModel):
+    """Response model for a multi-city batch forecast"""
+    days: int = Field(..., description="Number of days forecast for each city")
+    forecasts: Dict[str, List[WeatherForecast]] = Field(..., description="Forecasts keyed by city")
+    errors: Dict[str, str] = Field(default_factory=dict, description="Per-city failures keyed by city")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "days": 1,
+                "forecasts": {
+                    "London": [{
+                        "date": "2025-10-30T10:00:00",
+                        "temperature_c": 22,
+                        "temperature_f": 72,
+                        "summary": "Sunny",
+                        "humidity": 65,
+                        "wind_speed": 15.5,
+                        "wind_direction": "NW",
+                        "precipitation": 0.0,
+                        "pressure": 1013
+                    }]
+                },
+                "errors": {
+                    " ": "City name cannot be empty"
+                }
+            }
+        }
+
+
+class QueryOperation(BaseModel):
+    """One operation of a composite query"""
+    op: QueryOperationType = Field(..., description="Operation to run")
+    city: Optional[str] = Field(
+        None, description="City name (optional; statistics then cover that city's forecasts)"
+    )
+    days: Optional[int] = Field(
+        None, ge=1, le=3650,
+        description="Days to forecast (forecast, detailed: 1-30, default 5) or analyze (statistics: default 7)"
+    )
+    fields: Optional[List[str]] = Field(
+        None, description="Fields to return (current, forecast and detailed); the date is always included"
+    )
+
+    @model_validator(mode="after")
+    def check_options(self):
+        if self.op in (QueryOperationType.FORECAST, QueryOperationType.DETAILED) and (self.days or 0) > 30:
+            raise ValueError(f"{self.op.value} operations cover at most 30 days")
+        if self.fields and self.op in (QueryOperationType.STATISTICS, QueryOperationType.ALERTS):
+            raise ValueError(f"{self.op.value} operations do not take fields")
+        return self
+
+
+class CompositeQueryRequest(BaseModel):
+    """Request model for a composite query"""
+    operations: List[QueryOperation] = Field(..., min_length=1, description="Operations to run")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "operations": [
+                    {"op": "current", "city": "London"},
+                    {"op": "alerts", "city": "London"},
+                    {"op": "statistics", "city": "London", "days": 7}
+                ]
+            }
+        }
+
+
+class QueryResult(BaseModel):
+    """Outcome of one operation of a composite query"""
+    op: QueryOperationType = Field(..., description="Operation")
+    city: Optional[str] = Field(None, description="City the operation ran for")
+    data: Optional[Any] = Field(
+        None, description="What the operation's endpoint returns (statistics: of the operation's city)"
+    )
+    error: Optional[str] = Field(None, description="Why the operation failed (data is then null)")
+
+
+class CompositeQueryResponse(BaseModel):
+    """Response model for a composite query"""
+    results: List[QueryResult] = Field(..., description="One result per operation, in request order")
+    generation_groups: int = Field(
+        ..., description="Generation passes the generated operations were merged into (one per city)"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "results": [
+                    {"op": "current", "city": "London", "data": {
+                        "date": "2025-10-30T10:00:00", "temperature_c": 22, "temperature_f": 71,
+                        "summary": "Mild", "humidity": 65, "wind_speed": 15.5, "wind_direction": "NW",
+                        "precipitation": 0.0, "pressure": 1013
+                    }, "error": None},
+                    {"op": "alerts", "city": "London", "data": [], "error": None}
+                ],
+                "generation_groups": 1
+            }
+        }
+
+
 class WeatherStatistics(BaseModel):
     """Weather statistics model"""
     average_temperature_c: float = Field(..., description="Average temperature in Celsius")
@@ -141,6 +350,21 @@ class WeatherStatistics(BaseModel):
     total_precipitation: float = Field(..., description="Total precipitation in mm")
     average_wind_speed: float = Field(..., description="Average wind speed in km/h")
     days_analyzed: int = Field(..., description="Number of days analyzed")
+    temperature_stddev_c: float = Field(..., description="Standard deviation of temperature in Celsius")
+    temperature_p50_c: float = Field(..., description="Median (p50) temperature in Celsius")
+    temperature_p90_c: float = Field(..., description="90th percentile temperature in Celsius")
+    temperature_p99_c: float = Field(..., description="99th percentile temperature in Celsius")
+    max_wind_speed: float = Field(..., description="Maximum wind speed in km/h")
+    max_precipitation: float = Field(..., description="Maximum daily precipitation in mm")
+    average_dew_point_c: Optional[float] = Field(None, description="Average dew point in Celsius")
+    max_heat_index_c: Optional[float] = Field(None, description="Highest heat index in Celsius")
+    min_wind_chill_c: Optional[float] = Field(None, description="Lowest wind chill in Celsius")
+    average_apparent_temperature_c: Optional[float] = Field(
+        None, description="Average feels-like temperature in Celsius"
+    )
+    comfort_flag_days: Optional[Dict[str, int]] = Field(
+        None, description="Days on which each comfort alert threshold was crossed"
+    )
 
     class Config:
         json_schema_extra = {
@@ -151,7 +375,21 @@ class WeatherStatistics(BaseModel):
                 "average_humidity": 68.3,
                 "total_precipitation": 15.6,
                 "average_wind_speed": 12.4,
-                "days_analyzed": 7
+                "days_analyzed": 7,
+                "temperature_stddev_c": 4.2,
+                "temperature_p50_c": 18.0,
+                "temperature_p90_c": 24.1,
+                "temperature_p99_c": 24.9,
+                "max_wind_speed": 31.7,
+                "max_precipitation": 9.4,
+                "average_dew_point_c": 11.8,
+                "max_heat_index_c": 25.0,
+                "min_wind_chill_c": 9.1,
+                "average_apparent_temperature_c": 18.2,
+                "comfort_flag_days": {
+                    "heat_danger": 0, "extreme_heat": 0, "frostbite_risk": 0,
+                    "extreme_cold": 0, "oppressive_humidity": 0
+                }
             }
         }
 
@@ -170,3 +408,305 @@ class HealthCheck(BaseModel):
                 "service": "Weather Forecast API"
             }
         }
+
+
+class CacheStats(BaseModel):
+    """Response cache counters"""
+    entries: int = Field(..., description="Entries currently cached")
+    max_entries: int = Field(..., description="Maximum entries before LRU eviction")
+    ttl_seconds: float = Field(..., description="Seconds an entry stays fresh")
+    stale_ttl_seconds: float = Field(..., description="Seconds an expired entry may still be served stale")
+    hits: int = Field(..., description="Lookups served from the cache")
+    stale_hits: int = Field(..., description="Lookups served stale while a refresh ran")
+    misses: int = Field(..., description="Lookups that had to generate data")
+    hit_ratio: float = Field(..., description="Hits divided by total lookups")
+    evictions: int = Field(..., description="Entries evicted by the LRU policy")
+    expirations: int = Field(..., description="Entries dropped because their TTL elapsed")
+    shared: bool = Field(False, description="Entries and counters are shared by every worker process")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "entries": 42,
+                "max_entries": 1024,
+                "ttl_seconds": 300.0,
+                "stale_ttl_seconds": 600.0,
+                "hits": 1250,
+                "stale_hits": 4,
+                "misses": 42,
+                "hit_ratio": 0.9675,
+                "evictions": 0,
+                "expirations": 3,
+                "shared": False
+            }
+        }
+
+
+class CacheReport(BaseModel):
+    """Counters of every response and data cache"""
+    forecasts: CacheStats = Field(..., description="Forecast data cache in front of the service")
+    responses: CacheStats = Field(..., description="Serialized response body (ETag) cache")
+
+
+class HotCity(BaseModel):
+    """A city forecast horizon kept warm by the prewarming scheduler"""
+    city: str = Field(..., description="City name")
+    days: int = Field(..., description="Forecast horizon in days")
+    score: float = Field(..., description="Decayed request frequency (0 for seed cities)")
+
+
+class PrewarmStats(BaseModel):
+    """Prewarming scheduler state and refresh timings"""
+    enabled: bool = Field(..., description="Whether prewarming is configured")
+    running: bool = Field(..., description="Whether the scheduler tasks are running")
+    interval_seconds: float = Field(..., description="Seconds between planning passes")
+    refresh_ahead_seconds: float = Field(..., description="Entries expiring within this window are refreshed")
+    hot_set: List[HotCity] = Field(..., description="Entries considered hot at the last planning pass")
+    queue_depth: int = Field(..., description="Refreshes waiting for a worker")
+    in_progress: int = Field(..., description="Refreshes currently running")
+    background_revalidations: int = Field(..., description="Stale-while-revalidate refreshes in flight")
+    refreshes: int = Field(..., description="Completed refreshes")
+    failures: int = Field(..., description="Failed refreshes")
+    last_refresh_seconds: Optional[float] = Field(None, description="Duration of the last refresh")
+    average_refresh_seconds: Optional[float] = Field(None, description="Mean refresh duration")
+    max_refresh_seconds: Optional[float] = Field(None, description="Longest refresh duration")
+    last_cycle: Optional[datetime] = Field(None, description="Time of the last planning pass")
+
+
+class CityMatch(BaseModel):
+    """City returned by a search"""
+    name: str = Field(..., description="Canonical city name")
+    country: str = Field(..., description="Country")
+    latitude: float = Field(..., description="Latitude in degrees")
+    longitude: float = Field(..., description="Longitude in degrees")
+    match: str = Field(..., description="How the city matched: exact, prefix or fuzzy")
+    distance: int = Field(..., description="Edit distance between the query and the city name")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "London",
+                "country": "United Kingdom",
+                "latitude": 51.5074,
+                "longitude": -0.1278,
+                "match": "fuzzy",
+                "distance": 1
+            }
+        }
+
+
+class NearbyCity(BaseModel):
+    """City returned by a nearest-city query"""
+    name: str = Field(..., description="Canonical city name")
+    country: str = Field(..., description="Country")
+    latitude: float = Field(..., description="Latitude in degrees")
+    longitude: float = Field(..., description="Longitude in degrees")
+    distance_km: float = Field(..., description="Great-circle distance from the query point in km")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "Paris",
+                "country": "France",
+                "latitude": 48.8566,
+                "longitude": 2.3522,
+                "distance_km": 0.75
+            }
+        }
+
+
+class AlertStoreStats(BaseModel):
+    """Alert store size and counters"""
+    alerts: int = Field(..., description="Alerts currently stored")
+    cities: int = Field(..., description="Cities with stored alerts")
+    pending_expiry: int = Field(..., description="Stored alerts that have not ended yet")
+    subscribers: int = Field(..., description="Open alert subscriptions")
+    watched_cities: int = Field(..., description="Cities whose alerts are re-ingested every day")
+    expired: int = Field(..., description="Alerts announced as expired")
+    purged: int = Field(..., description="Alerts dropped after the retention period")
+
+
+class ExecutorPoolStats(BaseModel):
+    """Counters and time breakdown of one executor pool"""
+    workers: int = Field(..., description="Workers in the pool (1 for inline)")
+    capacity: int = Field(..., description="Calls admitted at once: workers plus queue slots")
+    in_flight: int = Field(..., description="Calls queued or running")
+    submitted: int = Field(..., description="Calls dispatched to the pool")
+    completed: int = Field(..., description="Calls that finished")
+    failed: int = Field(..., description="Calls that raised an error")
+    rejected: int = Field(..., description="Calls refused because the queue was full")
+    timeouts: int = Field(..., description="Calls that exceeded the timeout")
+    mean_queue_ms: float = Field(..., description="Mean time waiting for a worker")
+    mean_execution_ms: float = Field(..., description="Mean time running on a worker")
+    mean_overhead_ms: float = Field(..., description="Mean time handing the result back")
+    max_queue_ms: float = Field(..., description="Longest time a call waited for a worker")
+
+
+class ExecutorStats(BaseModel):
+    """Service call executor configuration and per-pool statistics"""
+    timeout_seconds: float = Field(..., description="Seconds a call may take, queue time included")
+    max_queue: int = Field(..., description="Calls allowed to wait per pool")
+    thread_cost: int = Field(..., description="Lowest estimated cost (rows) run in the thread pool")
+    process_cost: int = Field(..., description="Lowest estimated cost (rows) run in the process pool")
+    pools: Dict[str, ExecutorPoolStats] = Field(..., description="Statistics keyed by pool: inline, thread, process")
+
+
+class AdmissionPriorityStats(BaseModel):
+    """Admission counters of one priority class"""
+    share: Optional[float] = Field(None, description="Share of the limit the class may fill (none: never shed)")
+    admitted: int = Field(..., description="Requests admitted")
+    rejected: int = Field(..., description="Requests shed with 429")
+
+
+class AdmissionStats(BaseModel):
+    """Adaptive admission limit, load and per-priority counters"""
+    enabled: bool = Field(..., description="Whether requests are being shed")
+    limit: float = Field(..., description="Current limit on the cost units in flight")
+    min_limit: float = Field(..., description="Lowest the limit may shrink to")
+    max_limit: float = Field(..., description="Highest the limit may grow to")
+    in_flight: float = Field(..., description="Cost units of the requests in flight")
+    baseline_ms_per_unit: Optional[float] = Field(None, description="Long-run latency per cost unit")
+    recent_ms_per_unit: Optional[float] = Field(None, description="Recent latency per cost unit")
+    priorities: Dict[str, AdmissionPriorityStats] = Field(
+        ..., description="Counters keyed by priority: critical, high, normal, low"
+    )
+
+
+class HistoryIngestResult(BaseModel):
+    """Outcome of recording forecasts into the history"""
+    city: str = Field(..., description="City the forecasts were recorded for")
+    received: int = Field(..., description="Forecasts in the request")
+    recorded: int = Field(..., description="Days added or changed (others were already stored)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "city": "London",
+                "received": 7,
+                "recorded": 7
+            }
+        }
+
+
+class WindowStatistics(BaseModel):
+    """Statistics of recorded forecasts over one date window"""
+    start: date = Field(..., description="First day of the window")
+    end: date = Field(..., description="Last day of the window")
+    statistics: Optional[WeatherStatistics] = Field(
+        None, description="Statistics of the recorded days (null when none is recorded)"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "start": "2025-10-01",
+                "end": "2025-10-07",
+                "statistics": {
+                    "average_temperature_c": 17.43,
+                    "max_temperature_c": 24,
+                    "min_temperature_c": 11,
+                    "average_humidity": 64.29,
+                    "total_precipitation": 12.4,
+                    "average_wind_speed": 14.1,
+                    "days_analyzed": 7,
+                    "temperature_stddev_c": 4.21,
+                    "temperature_p50_c": 17.0,
+                    "temperature_p90_c": 22.4,
+                    "temperature_p99_c": 23.84,
+                    "max_wind_speed": 27.5,
+                    "max_precipitation": 6.1
+                }
+            }
+        }
+
+
+class HistoryStats(BaseModel):
+    """Forecast history store contents and write counters"""
+    path: str = Field(..., description="SQLite database file")
+    recording: bool = Field(..., description="Whether provider forecasts are recorded")
+    cities: int = Field(..., description="Cities with stored days")
+    days: int = Field(..., description="Stored city days")
+    monthly_rollups: int = Field(..., description="Stored monthly rollup rows")
+    yearly_rollups: int = Field(..., description="Stored yearly rollup rows")
+    indexed_cities: int = Field(..., description="Cities whose window statistics index is in memory")
+    index_bytes: int = Field(..., description="Memory used by the window statistics indexes")
+    recorded: int = Field(..., description="Days added or changed since startup")
+    unchanged: int = Field(..., description="Recorded days skipped because they were already stored")
+    pending: int = Field(..., description="City batches waiting to be written")
+    dropped: int = Field(..., description="City batches dropped because the queue was full")
+    failed: int = Field(..., description="City batches that could not be written")
+
+
+class ProfileSummary(BaseModel):
+    """A stored request profile, without its report"""
+    id: str = Field(..., description="Profile id (X-Profile-Id response header)")
+    mode: str = Field(..., description="cprofile or sample")
+    method: str = Field(..., description="HTTP method")
+    path: str = Field(..., description="Request path")
+    route: str = Field(..., description="Route template the request matched")
+    status: int = Field(..., description="Response status")
+    duration_ms: float = Field(..., description="Time the request took while profiled")
+
+
+class ProfileFunction(BaseModel):
+    """One function of a cProfile profile"""
+    function: str = Field(..., description="Function name with its file and line")
+    category: str = Field(..., description="Package or module group: app, pydantic, starlette, orjson, asyncio, ...")
+    calls: int = Field(..., description="Calls, recursive ones included")
+    primitive_calls: int = Field(..., description="Calls that were not recursive")
+    self_ms: float = Field(..., description="Time spent in the function itself")
+    cumulative_ms: float = Field(..., description="Time spent in the function and its callees")
+
+
+class RequestProfile(ProfileSummary):
+    """Profile of a single request"""
+    started_at: float = Field(..., description="Unix time the request started")
+    total_calls: Optional[int] = Field(None, description="Function calls recorded (cprofile)")
+    self_ms_by_category: Optional[Dict[str, float]] = Field(
+        None, description="Time spent in the functions of each category, largest first (cprofile)"
+    )
+    functions: Optional[List[ProfileFunction]] = Field(
+        None, description="Functions with the largest cumulative time (cprofile)"
+    )
+    samples: Optional[int] = Field(None, description="Stack samples taken of the request (sample)")
+    interval_ms: Optional[float] = Field(None, description="Interval between samples (sample)")
+    stacks: Optional[List[str]] = Field(None, description="Folded stacks with their sample counts (sample)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": "3f9c2a7b51d04e8a",
+                "mode": "cprofile",
+                "method": "GET",
+                "path": "/api/forecast/detailed/multi",
+                "route": "/api/forecast/detailed/multi",
+                "status": 200,
+                "duration_ms": 4.81,
+                "started_at": 1760000000.0,
+                "total_calls": 2315,
+                "self_ms_by_category": {"app": 1.42, "numpy": 0.96, "orjson": 0.31, "pydantic": 0.22},
+                "functions": [
+                    {
+                        "function": "get_detailed_forecasts (service.py:212)",
+                        "category": "app",
+                        "calls": 1,
+                        "primitive_calls": 1,
+                        "self_ms": 0.05,
+                        "cumulative_ms": 2.87
+                    }
+                ]
+            }
+        }
+
+
+class ProfilingStats(BaseModel):
+    """Profiling configuration, continuous sampler state and stored profiles"""
+    enabled: bool = Field(..., description="Whether requests may ask for a profile (X-Profile header)")
+    token_required: bool = Field(..., description="Whether the X-Profile-Token header must be sent")
+    sampling: bool = Field(..., description="Whether the continuous stack sampler is running")
+    interval_ms: float = Field(..., description="Interval between continuous samples")
+    samples: int = Field(..., description="Continuous samples recorded")
+    sampler_overhead_ms: float = Field(..., description="Time the sampler thread spent taking samples")
+    routes: Dict[str, int] = Field(..., description="Continuous samples per route, most sampled first")
+    skipped: int = Field(..., description="Profile requests served unprofiled because another was in progress")
+    profiles: List[ProfileSummary] = Field(..., description="Stored profiles, newest first")
@@ -0,0 +1,174 @@
+"""
+Prebuilt OpenAPI document cached on disk
+
+FastAPI generates the OpenAPI schema on the first /openapi.json (or /docs)
+request by walking every route and model, which takes far longer than any
+API call, and every new process pays it again. OpenAPICache keeps the
+serialized document in a file, stamped with a fingerprint of everything the
+schema is derived from: the application sources, the FastAPI and Pydantic
+versions and the settings that appear in it (e.g. query parameter bounds).
+At startup the file is read as bytes if its fingerprint still matches;
+otherwise the schema is generated on first use and the file is rewritten.
+
+The document can be built ahead of time, e.g. while building an image:
+
+    python openapi_cache.py
+"""
+import hashlib
+import os
+import sys
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+import fastapi
+import orjson
+import pydantic
+from fastapi import FastAPI, Request, Response
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+
+from responses import CACHE_CONTROL, JSON_MEDIA_TYPE, etag_matches
+
+
+def fingerprint(app: FastAPI, sources: Sequence[str], settings: Mapping[str, Any]) -> str:
+    """Digest of the inputs the OpenAPI schema of an application depends on"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (fastapi.__version__, pydantic.VERSION, app.title, app.version, app.openapi_version):
+        digest.update(part.encode() + b"\0")
+    for name, value in sorted(settings.items()):
+        digest.update(f"{name}={value!r}\0".encode())
+    for path in sources:
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+class OpenAPICache:
+    """
+    Serialized OpenAPI document of an application, backed by a file
+
+    Replaces app.openapi, so FastAPI and other callers see the cached schema
+    too. The document is parsed only if something asks for it as a dict;
+    /openapi.json serves the stored bytes.
+
+    Args:
+        app: Application the schema describes
+        path: Cache file; empty to keep the document in memory only
+        sources: Files whose content the schema depends on
+        settings: Configuration values that appear in the schema
+    """
+
+    def __init__(
+        self,
+        app: FastAPI,
+        path: str,
+        sources: Sequence[str],
+        settings: Optional[Mapping[str, Any]] = None
+    ):
+        self.app = app
+        self.path = path
+        self.sources = sources
+        self.settings = settings or {}
+        self._generate = app.openapi
+        self._fingerprint: Optional[str] = None
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self.loaded = False
+        app.openapi = self.schema
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self.app, self.sources, self.settings)
+        return self._fingerprint
+
+    def load(self) -> bool:
+        """Read the cache file if it matches the application; returns whether it did"""
+        if not self.path:
+            return False
+        try:
+            with open(self.path, "rb") as cached:
+                stamp, _, body = cached.read().partition(b"\n")
+        except OSError:
+            return False
+        if stamp.decode("ascii", "replace") != self.fingerprint or not body:
+            return False
+        self._set_body(body)
+        self.app.openapi_schema = None
+        self.loaded = True
+        return True
+
+    def build(self) -> bytes:
+        """Generate the document and write the cache file (best effort)"""
+        self.app.openapi_schema = None
+        body = orjson.dumps(self._generate())
+        self._set_body(body)
+        if self.path:
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(temporary, "wb") as cached:
+                    cached.write(self.fingerprint.encode("ascii") + b"\n" + body)
+                os.replace(temporary, self.path)
+            except OSError:
+                # A read-only deployment still serves the in-memory document
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+        return body
+
+    def _set_body(self, body: bytes) -> None:
+        self._body = body
+        self._etag = f'"{self.fingerprint}"'
+
+    def body(self) -> bytes:
+        """Serialized document, generated and cached on first use if not loaded"""
+        if self._body is None:
+            return self.build()
+        return self._body
+
+    def schema(self) -> Dict[str, Any]:
+        """The document as a dict (replaces app.openapi)"""
+        if self.app.openapi_schema is None:
+            self.app.openapi_schema = orjson.loads(self.body())
+        return self.app.openapi_schema
+
+    def install(
+        self,
+        openapi_url: str = "/openapi.json",
+        docs_url: Optional[str] = "/docs",
+        redoc_url: Optional[str] = "/redoc",
+        swagger_ui_parameters: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Serve the document and the documentation pages
+
+        The application must be created with openapi_url=None so FastAPI does
+        not register its own (generating) routes.
+        """
+        title = self.app.title
+
+        async def openapi(request: Request) -> Response:
+            body = self.body()
+            headers = {"ETag": self._etag, "Cache-Control": CACHE_CONTROL}
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match and etag_matches(if_none_match, self._etag):
+                return Response(status_code=304, headers=headers)
+            return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+        self.app.add_route(openapi_url, openapi, include_in_schema=False)
+        if docs_url:
+            async def swagger_ui(request: Request) -> Response:
+                return get_swagger_ui_html(
+                    openapi_url=openapi_url, title=f"{title} - Swagger UI",
+                    swagger_ui_parameters=swagger_ui_parameters
+                )
+            self.app.add_route(docs_url, swagger_ui, include_in_schema=False)
+        if redoc_url:
+            async def redoc(request: Request) -> Response:
+                return get_redoc_html(openapi_url=openapi_url, title=f"{title} - ReDoc")
+            self.app.add_route(redoc_url, redoc, include_in_schema=False)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from main import app
+
+    cache = app.state.openapi_cache
+    print(f"Wrote {cache.path} ({len(cache.build()):,} bytes)")
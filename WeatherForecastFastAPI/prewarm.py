@@ -0,0 +1,249 @@
+"""
+Background prewarming of hot city forecasts
+
+HotSetTracker keeps exponentially decayed request counts per (city, days).
+PrewarmScheduler runs on the event loop (started from the app lifespan) and
+refreshes the hottest entries before their cache TTL runs out, so popular
+cities never take a cold generation or upstream hit.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from engine import city_key
+
+
+logger = logging.getLogger(__name__)
+
+
+class HotSetTracker:
+    """
+    Decayed request frequency per (city, days)
+
+    Each request adds 1 to its key's score; scores halve every half_life
+    seconds, so the hot set follows current traffic rather than all-time totals.
+
+    Args:
+        half_life: Seconds for a score to decay by half
+        max_tracked: Keys kept before the coldest half is dropped
+        timer: Monotonic clock, injectable for testing
+    """
+
+    def __init__(
+        self,
+        half_life: float = 600.0,
+        max_tracked: int = 1000,
+        timer: Callable[[], float] = time.monotonic
+    ):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._timer = timer
+        # key -> (score at last update, time of last update, display city name)
+        self._scores: Dict[Tuple[str, int], Tuple[float, float, str]] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * math.pow(0.5, (now - updated) / self.half_life)
+
+    def record(self, city: Optional[str], days: int) -> None:
+        """Count one request for a city forecast horizon"""
+        if city is None:
+            return
+        key = (city_key(city), days)
+        now = self._timer()
+        with self._lock:
+            entry = self._scores.get(key)
+            score = self._decayed(entry[0], entry[1], now) if entry else 0.0
+            name = entry[2] if entry else city.strip()
+            self._scores[key] = (score + 1.0, now, name)
+            if len(self._scores) > self.max_tracked:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        ranked = sorted(
+            self._scores.items(),
+            key=lambda item: self._decayed(item[1][0], item[1][1], now),
+            reverse=True
+        )
+        self._scores = dict(ranked[:self.max_tracked // 2])
+
+    def top(self, n: int) -> List[Tuple[str, int, float]]:
+        """
+        The n most requested (city, days) pairs right now
+
+        Returns:
+            List of (city, days, decayed score), hottest first
+        """
+        now = self._timer()
+        with self._lock:
+            scored = [
+                (name, days, self._decayed(score, updated, now))
+                for (_, days), (score, updated, name) in self._scores.items()
+            ]
+        scored.sort(key=lambda item: item[2], reverse=True)
+        return scored[:n]
+
+
+class PrewarmScheduler:
+    """
+    Refreshes hot city forecasts before they expire
+
+    Every interval the planner picks the hot set (the most requested cities,
+    topped up with seed cities) and queues each entry whose cache TTL is
+    missing or about to run out. A small pool of workers drains the queue.
+
+    Args:
+        service: Caching service facade (CachedWeatherForecastService)
+        tracker: Request frequency tracker shared with the facade
+        seed_cities: Cities always considered hot (e.g. WeatherForecastService.CITIES)
+        default_days: Horizon prewarmed for seed cities
+        hot_set_size: Number of (city, days) entries kept warm
+        interval: Seconds between planning passes
+        refresh_ahead: Refresh entries expiring within this many seconds
+        workers: Concurrent refreshes
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        tracker: HotSetTracker,
+        seed_cities: Sequence[str] = (),
+        default_days: int = 5,
+        hot_set_size: int = 20,
+        interval: float = 30.0,
+        refresh_ahead: float = 60.0,
+        workers: int = 4
+    ):
+        self.service = service
+        self.tracker = tracker
+        self.seed_cities = list(seed_cities)
+        self.default_days = default_days
+        self.hot_set_size = hot_set_size
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.workers = workers
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[Tuple[str, int]] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._hot_set: List[Tuple[str, int, float]] = []
+        self.in_progress = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh_seconds: Optional[float] = None
+        self.max_refresh_seconds: Optional[float] = None
+        self._total_refresh_seconds = 0.0
+        self.last_cycle: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Start the planner and worker tasks on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._plan_loop(), name="prewarm-planner")]
+        self._tasks += [
+            asyncio.create_task(self._worker(), name=f"prewarm-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel all scheduler tasks and wait for them to finish"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queued.clear()
+
+    def hot_set(self) -> List[Tuple[str, int, float]]:
+        """Current hot set: most requested entries, topped up with seed cities"""
+        hot = self.tracker.top(self.hot_set_size)
+        seen = {(city_key(city), days) for city, days, _ in hot}
+        for city in self.seed_cities:
+            if len(hot) >= self.hot_set_size:
+                break
+            if (city_key(city), self.default_days) not in seen:
+                hot.append((city, self.default_days, 0.0))
+        return hot
+
+    def plan(self) -> int:
+        """
+        Queue every hot entry that is missing or about to expire
+
+        Returns:
+            Number of entries queued by this pass
+        """
+        self._hot_set = self.hot_set()
+        self.last_cycle = datetime.now()
+        queued = 0
+        for city, days, _ in self._hot_set:
+            remaining = self.service.cache.remaining_ttl(self.service.forecast_key(city, days))
+            if remaining is not None and remaining > self.refresh_ahead:
+                continue
+            key = (city_key(city), days)
+            if key in self._queued:
+                continue
+            self._queued.add(key)
+            self._queue.put_nowait((city, days))
+            queued += 1
+        return queued
+
+    async def _plan_loop(self) -> None:
+        while True:
+            try:
+                self.plan()
+            except Exception:
+                logger.exception("Prewarm planning pass failed")
+            await asyncio.sleep(self.interval)
+
+    async def _worker(self) -> None:
+        while True:
+            city, days = await self._queue.get()
+            self.in_progress += 1
+            start = time.perf_counter()
+            try:
+                await self.service.refresh_forecast_by_city(city, days)
+                self._record_refresh(time.perf_counter() - start)
+            except Exception:
+                self.failures += 1
+                logger.warning("Prewarm refresh failed for %s (%d days)", city, days, exc_info=True)
+            finally:
+                self.in_progress -= 1
+                self._queued.discard((city_key(city), days))
+                self._queue.task_done()
+
+    def _record_refresh(self, seconds: float) -> None:
+        self.refreshes += 1
+        self._total_refresh_seconds += seconds
+        self.last_refresh_seconds = seconds
+        if self.max_refresh_seconds is None or seconds > self.max_refresh_seconds:
+            self.max_refresh_seconds = seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of scheduler state and refresh timings"""
+        average = self._total_refresh_seconds / self.refreshes if self.refreshes else None
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "refresh_ahead_seconds": self.refresh_ahead,
+            "hot_set": [
+                {"city": city, "days": days, "score": round(score, 3)}
+                for city, days, score in self._hot_set
+            ],
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_progress": self.in_progress,
+            "background_revalidations": self.service.refreshing,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "average_refresh_seconds": average,
+            "max_refresh_seconds": self.max_refresh_seconds,
+            "last_cycle": self.last_cycle
+        }
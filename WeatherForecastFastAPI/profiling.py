@@ -0,0 +1,484 @@
+"""
+Opt-in request profiling and continuous stack sampling
+
+Two tools for finding where the time of a request goes (service calls,
+validation, serialization, the framework):
+
+* Request profiles. With WEATHER_PROFILING_ENABLED, a request sent with an
+  ``X-Profile: cprofile`` (or ``sample``) header runs under cProfile, or under
+  a stack sampler that records only that request's task, and the result is
+  kept in memory under the id returned in the ``X-Profile-Id`` response
+  header. Service calls of a profiled request run inline on the event loop
+  (executor.INLINE_CALLS), so all of its work is on the profiled thread. One
+  request is profiled at a time. cProfile sees everything the loop runs
+  while the request is in flight, other requests included, so use it under
+  light load; the sample mode has no such limit but a coarser view.
+* Continuous sampling. With WEATHER_PROFILING_SAMPLING, a daemon thread reads
+  the stacks of the event loop thread and the busy service threads every few
+  milliseconds and folds them into flame graph data per route. Each loop
+  sample belongs to the route whose task is running; tasks a request
+  creates (the cache's single-flight generations, for one) belong to the
+  request's route too, through a task factory. Service thread samples
+  are kept under their own label: their stacks name the service method.
+  A sample costs one sys._current_frames() call and a walk of the sampled
+  stacks, and it runs on its own thread.
+
+Stacks use the folded format of flamegraph.pl and speedscope: frames from
+the outermost to the innermost joined by ";", then a space and the count.
+"""
+import asyncio
+import cProfile
+import hmac
+import os
+import pstats
+import re
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from executor import INLINE_CALLS
+from metrics import route_label
+
+
+PROFILE_HEADER = b"x-profile"
+TOKEN_HEADER = b"x-profile-token"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+# Header values asking for a profile, by the mode they select
+MODES = {CPROFILE: CPROFILE, SAMPLE: SAMPLE, "1": CPROFILE, "true": CPROFILE, "yes": CPROFILE}
+
+# Flame graph labels of samples that no route's task was running
+LOOP_LABEL = "(event loop)"
+UNATTRIBUTED_LABEL = "(other tasks)"
+SERVICE_THREADS_LABEL = "(service threads)"
+# Stacks of a route beyond its limit are counted under this one
+OTHER_STACKS = "(other stacks)"
+
+# Thread name prefix of the executor's thread pool
+SERVICE_THREAD_PREFIX = "service"
+
+# Interval of the per-request sampler; a single request needs a fine one.
+# The sampler thread only runs when the loop thread hands it the GIL, so
+# the switch interval is lowered to match while a request is sampled
+REQUEST_SAMPLE_INTERVAL = 0.001
+
+MAX_DEPTH = 128
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_STDLIB_DIR = sysconfig.get_paths()["stdlib"]
+# Module of a C function ("<built-in method orjson.dumps>") or of the type of
+# a C method ("<method 'tolist' of 'numpy.ndarray' objects>")
+_BUILTIN_MODULE = re.compile(r"built-in method ([\w.]+)\.\w+>|of '([\w.]+)\.\w+' objects")
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold(frame, max_depth: int = MAX_DEPTH) -> str:
+    """Folded stack of a frame: outermost frame first, at most max_depth innermost frames"""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _idle_loop(frame) -> bool:
+    """Whether the event loop thread is waiting in its selector"""
+    return frame.f_code.co_name == "select" and frame.f_code.co_filename.endswith("selectors.py")
+
+
+def _idle_worker(frame) -> bool:
+    """Whether a pool thread is waiting for work"""
+    return frame.f_code.co_name == "_worker" and frame.f_code.co_filename.endswith("thread.py")
+
+
+def code_category(filename: str, name: str) -> str:
+    """Package or module group a profiled function belongs to"""
+    if filename == "~":
+        match = _BUILTIN_MODULE.search(name)
+        return (match.group(1) or match.group(2)).split(".")[0].lstrip("_") if match else "builtins"
+    path = os.path.abspath(filename)
+    if os.path.dirname(path) == _APP_DIR:
+        return "app"
+    parts = path.split(os.sep)
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            package = parts[parts.index(marker) + 1]
+            return package[:-3] if package.endswith(".py") else package
+    if path.startswith(_STDLIB_DIR):
+        relative = os.path.relpath(path, _STDLIB_DIR).split(os.sep)[0]
+        return relative[:-3] if relative.endswith(".py") else relative
+    return "other"
+
+
+class FlameGraph:
+    """
+    Folded stack counts per route
+
+    Args:
+        max_stacks: Distinct stacks kept per route; further ones are counted
+            under a single "(other stacks)" entry
+    """
+
+    def __init__(self, max_stacks: int = 2000):
+        self.max_stacks = max_stacks
+        self._routes: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.samples = 0
+
+    def add(self, route: str, stack: str) -> None:
+        with self._lock:
+            self.samples += 1
+            stacks = self._routes.setdefault(route, {})
+            if stack not in stacks and len(stacks) >= self.max_stacks:
+                stack = OTHER_STACKS
+            stacks[stack] = stacks.get(stack, 0) + 1
+
+    def routes(self) -> Dict[str, int]:
+        """Samples per route, most sampled first"""
+        with self._lock:
+            totals = {route: sum(stacks.values()) for route, stacks in self._routes.items()}
+        return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+    def folded(self, route: Optional[str] = None) -> str:
+        """
+        Folded stacks of one route, or of every route with the route as root frame
+
+        Returns:
+            One "frame;frame;... count" line per stack
+        """
+        with self._lock:
+            if route is not None:
+                items = [(stack, count) for stack, count in self._routes.get(route, {}).items()]
+            else:
+                items = [
+                    (f"{name};{stack}", count)
+                    for name, stacks in self._routes.items() for stack, count in stacks.items()
+                ]
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(items))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self.samples = 0
+
+
+class StackSampler:
+    """
+    Samples the event loop thread (and service threads) into a FlameGraph
+
+    Args:
+        flame: Where samples are folded
+        interval: Seconds between samples
+        tracked_only: Only record loop samples of tracked tasks, and no
+            service thread samples (used to sample a single request)
+    """
+
+    def __init__(self, flame: FlameGraph, interval: float = 0.02, tracked_only: bool = False):
+        self.flame = flame
+        self.interval = interval
+        self.tracked_only = tracked_only
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._previous_factory: Optional[Callable] = None
+        self._tasks: Dict[asyncio.Task, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.sample_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def attach(self) -> None:
+        """Sample the running event loop (call from its thread)"""
+        loop = self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        previous = self._previous_factory = loop.get_task_factory()
+
+        def task_factory(loop, coro, **kwargs):
+            if previous is not None:
+                task = previous(loop, coro, **kwargs)
+            else:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            parent = asyncio.current_task(loop)
+            scope = self._tasks.get(parent) if parent is not None else None
+            if scope is not None:
+                self.track(task, scope)
+                task.add_done_callback(self.untrack)
+            return task
+
+        loop.set_task_factory(task_factory)
+
+    def detach(self) -> None:
+        """Restore the task factory the loop had before attach"""
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+            self._loop = None
+
+    def track(self, task: asyncio.Task, scope: Dict[str, Any]) -> None:
+        """Attribute samples of task to the route of scope (resolved when sampled)"""
+        self._tasks[task] = scope
+
+    def untrack(self, task: asyncio.Task) -> None:
+        self._tasks.pop(task, None)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Take one sample of every watched thread"""
+        start = time.perf_counter()
+        frames = sys._current_frames()
+        frame = frames.get(self._loop_thread) if self._loop is not None else None
+        if frame is not None:
+            task = asyncio.current_task(self._loop)
+            scope = self._tasks.get(task) if task is not None else None
+            if scope is not None:
+                self.flame.add(route_label(scope), fold(frame))
+            elif not self.tracked_only and not _idle_loop(frame):
+                self.flame.add(LOOP_LABEL if task is None else UNATTRIBUTED_LABEL, fold(frame))
+
+        if not self.tracked_only:
+            for thread in threading.enumerate():
+                if thread.name.startswith(SERVICE_THREAD_PREFIX):
+                    frame = frames.get(thread.ident)
+                    if frame is not None and not _idle_worker(frame):
+                        self.flame.add(SERVICE_THREADS_LABEL, fold(frame))
+        self.sample_seconds += time.perf_counter() - start
+
+
+class Profiler:
+    """
+    Request profiles on demand and the continuous stack sampler
+
+    Args:
+        enabled: Honour X-Profile headers
+        token: Secret the X-Profile-Token header must carry (empty: none needed)
+        max_profiles: Request profiles kept, the oldest dropped first
+        sampling: Run the continuous sampler
+        interval: Seconds between continuous samples
+        max_stacks: Distinct stacks kept per route
+        top_functions: Functions listed in a cProfile profile
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        token: str = "",
+        max_profiles: int = 32,
+        sampling: bool = False,
+        interval: float = 0.02,
+        max_stacks: int = 2000,
+        top_functions: int = 40
+    ):
+        self.enabled = enabled
+        self.token = token
+        self.max_profiles = max_profiles
+        self.sampling = sampling
+        self.top_functions = top_functions
+        self.max_stacks = max_stacks
+        self.flame = FlameGraph(max_stacks)
+        self.sampler = StackSampler(self.flame, interval)
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._busy = False
+        self.skipped = 0
+
+    def start(self) -> None:
+        """Start the continuous sampler on the running event loop, if configured"""
+        if self.sampling:
+            self.sampler.attach()
+            self.sampler.start()
+
+    def stop(self) -> None:
+        self.sampler.stop()
+        if self.sampling:
+            self.sampler.detach()
+
+    def requested_mode(self, headers: List[Tuple[bytes, bytes]]) -> Optional[str]:
+        """Profile mode a request asks for and is allowed, or None"""
+        if not self.enabled:
+            return None
+        mode = token = None
+        for name, value in headers:
+            if name == PROFILE_HEADER:
+                mode = MODES.get(value.decode("latin-1").strip().lower())
+            elif name == TOKEN_HEADER:
+                token = value.decode("latin-1")
+        if mode is None:
+            return None
+        if self.token and not hmac.compare_digest(token or "", self.token):
+            return None
+        return mode
+
+    def profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """Stored profile by id, or the newest one for id latest"""
+        if profile_id == "latest":
+            return next(reversed(self._profiles.values()), None)
+        return self._profiles.get(profile_id)
+
+    def _store(self, profile: Dict[str, Any]) -> None:
+        self._profiles[profile["id"]] = profile
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+
+    def _cprofile_report(self, profile: cProfile.Profile) -> Dict[str, Any]:
+        stats = pstats.Stats(profile).stats
+        functions = []
+        categories: Dict[str, float] = {}
+        total_calls = 0
+        for (filename, line, name), (primitive, calls, own, cumulative, _) in stats.items():
+            total_calls += calls
+            category = code_category(filename, name)
+            categories[category] = categories.get(category, 0.0) + own
+            label = name if filename == "~" else f"{name} ({os.path.basename(filename)}:{line})"
+            functions.append((cumulative, own, calls, primitive, label, category))
+        functions.sort(reverse=True)
+        return {
+            "total_calls": total_calls,
+            "self_ms_by_category": {
+                category: round(seconds * 1000, 3)
+                for category, seconds in sorted(categories.items(), key=lambda item: -item[1])
+            },
+            "functions": [
+                {
+                    "function": label, "category": category, "calls": calls, "primitive_calls": primitive,
+                    "self_ms": round(own * 1000, 3), "cumulative_ms": round(cumulative * 1000, 3)
+                }
+                for cumulative, own, calls, primitive, label, category in functions[:self.top_functions]
+            ]
+        }
+
+    async def run(self, app: Callable, scope, receive, send, mode: str) -> None:
+        """Serve one request under a profile and store the result"""
+        profile_id = uuid.uuid4().hex[:16]
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                nonlocal status
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                   (PROFILE_ID_HEADER, profile_id.encode())]}
+            await send(message)
+
+        status = 500
+        self._busy = True
+        inline = INLINE_CALLS.set(True)
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            if mode == CPROFILE:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await app(scope, receive, send_wrapper)
+                finally:
+                    profiler.disable()
+                    elapsed = time.perf_counter() - start
+                report = self._cprofile_report(profiler)
+            else:
+                flame = FlameGraph(self.max_stacks)
+                sampler = StackSampler(flame, REQUEST_SAMPLE_INTERVAL, tracked_only=True)
+                sampler.attach()
+                sampler.track(asyncio.current_task(), scope)
+                switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(switch_interval, REQUEST_SAMPLE_INTERVAL / 2))
+                sampler.start()
+                try:
+                    await app(scope, receive, send_wrapper)
+                finally:
+                    sampler.stop()
+                    sampler.detach()
+                    sys.setswitchinterval(switch_interval)
+                    elapsed = time.perf_counter() - start
+                report = {"samples": flame.samples, "interval_ms": REQUEST_SAMPLE_INTERVAL * 1000,
+                          "stacks": flame.folded(route_label(scope)).splitlines()}
+        finally:
+            INLINE_CALLS.reset(inline)
+            self._busy = False
+
+        self._store({
+            "id": profile_id,
+            "mode": mode,
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route_label(scope),
+            "status": status,
+            "started_at": started,
+            "duration_ms": round(elapsed * 1000, 3),
+            **report
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "token_required": bool(self.token),
+            "sampling": self.sampler.running,
+            "interval_ms": self.sampler.interval * 1000,
+            "samples": self.flame.samples,
+            "sampler_overhead_ms": round(self.sampler.sample_seconds * 1000, 3),
+            "routes": self.flame.routes(),
+            "skipped": self.skipped,
+            "profiles": [
+                {key: profile[key] for key in ("id", "mode", "method", "path", "route", "status", "duration_ms")}
+                for profile in reversed(self._profiles.values())
+            ]
+        }
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that ask for it and tracking the
+    tasks of all requests for the continuous sampler
+
+    Args:
+        app: Wrapped ASGI application
+        profiler: Profile store and sampler
+    """
+
+    def __init__(self, app: Callable, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler = self.profiler
+        sampler = profiler.sampler
+        task = asyncio.current_task() if sampler.running else None
+        if task is not None:
+            sampler.track(task, scope)
+        try:
+            mode = profiler.requested_mode(scope["headers"])
+            if mode is not None and not profiler._busy:
+                await profiler.run(self.app, scope, receive, send, mode)
+                return
+            if mode is not None:
+                profiler.skipped += 1
+            await self.app(scope, receive, send)
+        finally:
+            if task is not None:
+                sampler.untrack(task)
@@ -0,0 +1,222 @@
+"""
+Weather data providers
+
+WeatherForecastService obtains city forecasts through a WeatherProvider.
+The default provider generates data locally; HttpWeatherProvider fetches it
+from an upstream HTTP API over a shared, keep-alive connection pool and
+coalesces concurrent identical requests into a single upstream call.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+from engine import city_key, generate_columns, horizon_dates
+from models import WeatherForecast
+from records import ForecastRecord
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class ProviderError(Exception):
+    """Raised when a provider cannot return data for a request"""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key
+
+    While a call for a key is in flight, further callers with the same key
+    await its result instead of starting their own call.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run call() once per key at a time and share its outcome
+
+        Args:
+            key: Identity of the call
+            call: Coroutine function performing the work
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            # shield: one waiter being cancelled must not cancel the others
+            return await asyncio.shield(flight)
+
+        self.calls += 1
+        flight = asyncio.ensure_future(call())
+        self._flights[key] = flight
+        try:
+            return await asyncio.shield(flight)
+        finally:
+            if flight.done():
+                self._flights.pop(key, None)
+            else:
+                flight.add_done_callback(lambda _: self._flights.pop(key, None))
+
+
+class WeatherProvider(ABC):
+    """Source of city forecasts for WeatherForecastService"""
+
+    name = "provider"
+
+    @abstractmethod
+    async def fetch_forecast(self, city: Optional[str], days: int) -> List[ForecastRecord]:
+        """
+        Fetch the forecast horizon for a city
+
+        Args:
+            city: City name; None means the default location
+            days: Number of days to forecast
+
+        Returns:
+            List of forecast records, one per day
+
+        Raises:
+            ProviderError: If the forecast could not be obtained
+        """
+
+    async def aclose(self) -> None:
+        """Release any connections held by the provider"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Provider counters for diagnostics"""
+        return {"provider": self.name}
+
+
+class GeneratedWeatherProvider(WeatherProvider):
+    """
+    Default provider: deterministic locally generated forecasts
+
+    Args:
+        seed: Global seed for deterministic generation
+    """
+
+    name = "generated"
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    async def fetch_forecast(self, city: Optional[str], days: int) -> List[ForecastRecord]:
+        return generate_columns(horizon_dates(days), [city], seed=self.seed).to_records()
+
+
+_forecast_list = TypeAdapter(List[WeatherForecast])
+
+
+class HttpWeatherProvider(WeatherProvider):
+    """
+    Provider backed by an upstream HTTP forecast API
+
+    The upstream must answer ``GET {base_url}/forecast?city=...&days=...``
+    with a JSON list in the WeatherForecast schema. One AsyncClient (and so
+    one connection pool) is shared by every request, and identical requests
+    made while one is in flight are coalesced.
+
+    Args:
+        base_url: Upstream API root, e.g. http://localhost:8100
+        max_connections: Upper bound on open upstream connections
+        max_keepalive: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection is kept
+        timeout: Per-request timeout in seconds
+        transport: Optional httpx transport (e.g. for an in-process upstream)
+    """
+
+    name = "http"
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 5.0,
+        transport: Optional["httpx.AsyncBaseTransport"] = None
+    ):
+        # Imported here so the default (generated) provider starts without httpx
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=timeout,
+            transport=transport
+        )
+        self.flights = SingleFlight()
+        self.upstream_errors = 0
+        self._errors = (httpx.HTTPError, ValidationError)
+
+    async def fetch_forecast(self, city: Optional[str], days: int) -> List[ForecastRecord]:
+        # The date is part of the key so a call spanning midnight is not shared
+        key = (city_key(city), days, datetime.now().date())
+        return await self.flights.do(key, lambda: self._fetch(city, days))
+
+    async def _fetch(self, city: Optional[str], days: int) -> List[ForecastRecord]:
+        params: Dict[str, Any] = {"days": days}
+        if city is not None:
+            params["city"] = city
+        try:
+            response = await self.client.get("/forecast", params=params)
+            response.raise_for_status()
+            # Upstream data is untrusted: validate once, then keep compact records
+            forecasts = _forecast_list.validate_json(response.content)
+        except self._errors as exc:
+            self.upstream_errors += 1
+            raise ProviderError(f"Upstream forecast request failed: {exc}") from exc
+        return [ForecastRecord.from_model(forecast) for forecast in forecasts]
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.name,
+            "base_url": self.base_url,
+            "upstream_calls": self.flights.calls,
+            "coalesced_calls": self.flights.coalesced,
+            "in_flight": self.flights.in_flight,
+            "upstream_errors": self.upstream_errors
+        }
+
+
+def create_provider(kind: str, seed: int = 0, upstream_url: str = "", **pool_options) -> WeatherProvider:
+    """
+    Build the provider selected in configuration
+
+    Args:
+        kind: "generated" or "http"
+        seed: Seed for the generated provider
+        upstream_url: Base URL for the HTTP provider
+        pool_options: Extra HttpWeatherProvider options (pool sizes, timeout)
+
+    Returns:
+        Configured provider
+    """
+    if kind == GeneratedWeatherProvider.name:
+        return GeneratedWeatherProvider(seed)
+    if kind == HttpWeatherProvider.name:
+        if not upstream_url:
+            raise ValueError("WEATHER_UPSTREAM_URL must be set for the http provider")
+        return HttpWeatherProvider(upstream_url, **pool_options)
+    raise ValueError(f"Unknown weather provider '{kind}'")
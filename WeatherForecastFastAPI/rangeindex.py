@@ -0,0 +1,187 @@
+"""
+Constant-time statistics over any date window of a city series
+
+SeriesIndex indexes one city's recorded days, one position per calendar day
+from its first recorded day (days never recorded are empty positions), so
+the aggregate of any window [start, end] is read without visiting the days
+in it:
+
+* Prefix sums of the day count and of the summed fields (temperature and its
+  square, humidity, precipitation, wind speed): the sums of a window are the
+  difference of two prefix rows.
+* Prefix histograms of whole-degree temperatures, over the range of
+  temperatures the city has seen: exact percentiles of a window come from
+  the difference of two histogram rows.
+* Sparse tables for the extremes (lowest and highest temperature, highest
+  precipitation and wind speed): entry i of level k holds the extreme of the
+  2^k positions ending at i, and any window is covered by two overlapping
+  entries of one level.
+
+An entry only depends on the positions up to its own, so appending days, or
+replacing every day from a revised one on, recomputes the new positions
+only: O(log n) work per day.
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Prefix sum columns
+COUNT, T_SUM, T_SQ, H_SUM, P_SUM, W_SUM = range(6)
+# Extreme columns, all kept as maxima (the lowest temperature is negated)
+NEG_T_MIN, T_MAX, P_MAX, W_MAX = range(4)
+
+
+class WindowAggregate(NamedTuple):
+    """Aggregate of the recorded days of a window"""
+    n: int
+    t_sum: float
+    t_sq: float
+    t_min: float
+    t_max: float
+    h_sum: float
+    p_sum: float
+    p_max: float
+    w_sum: float
+    w_max: float
+    # Day counts per whole-degree temperature, from t_low upwards
+    t_low: int
+    t_counts: np.ndarray
+
+
+class SeriesIndex:
+    """
+    Prefix-sum, prefix-histogram and sparse-table index of a city's days
+
+    Days are given as (day ordinal, temperature_c, humidity, precipitation,
+    wind_speed) rows.
+    """
+
+    def __init__(self):
+        self.first: Optional[int] = None
+        self.size = 0
+        self._capacity = 0
+        self._sums = np.zeros((1, 6))
+        self._hist = np.zeros((1, 0), dtype=np.int32)
+        self._t_low = 0
+        self._levels: List[np.ndarray] = []
+
+    @property
+    def last(self) -> Optional[int]:
+        """Ordinal of the last indexed position"""
+        return None if self.first is None or self.size == 0 else self.first + self.size - 1
+
+    def nbytes(self) -> int:
+        return self._sums.nbytes + self._hist.nbytes + sum(level.nbytes for level in self._levels)
+
+    def replace_from(self, ordinal: int, rows: Sequence[Tuple]) -> None:
+        """
+        Replace everything indexed from a day on
+
+        Args:
+            ordinal: First day whose data changed
+            rows: Every stored day from that day on, in day order
+        """
+        if self.first is None or ordinal <= self.first:
+            self.first = int(rows[0][0]) if rows else None
+            self.size = 0
+        else:
+            self.size = min(self.size, ordinal - self.first)
+        if not rows:
+            return
+
+        values = np.asarray(rows, dtype=np.float64)
+        start, end = self.size, int(values[-1, 0]) - self.first + 1
+        offsets = values[:, 0].astype(np.int64) - self.first - start
+        m = end - start
+        temperature = values[:, 1]
+        degrees = np.rint(temperature).astype(np.int64)
+        self._widen(int(degrees.min()), int(degrees.max()))
+        self._reserve(end)
+
+        day = np.zeros((m, 6))
+        day[offsets, COUNT] = 1.0
+        day[offsets, T_SUM] = temperature
+        day[offsets, T_SQ] = temperature * temperature
+        day[offsets, H_SUM] = values[:, 2]
+        day[offsets, P_SUM] = values[:, 3]
+        day[offsets, W_SUM] = values[:, 4]
+        self._sums[start + 1:end + 1] = self._sums[start] + np.cumsum(day, axis=0)
+
+        counts = np.zeros((m, self._hist.shape[1]), dtype=np.int32)
+        counts[offsets, degrees - self._t_low] = 1
+        self._hist[start + 1:end + 1] = self._hist[start] + np.cumsum(counts, axis=0, dtype=np.int32)
+
+        extremes = np.full((m, 4), -np.inf)
+        extremes[offsets, NEG_T_MIN] = -temperature
+        extremes[offsets, T_MAX] = temperature
+        extremes[offsets, P_MAX] = values[:, 3]
+        extremes[offsets, W_MAX] = values[:, 4]
+        self._extend_levels(start, end, extremes)
+        self.size = end
+
+    def _reserve(self, size: int) -> None:
+        if size <= self._capacity:
+            return
+        capacity = max(size, 2 * self._capacity, 64)
+        sums = np.zeros((capacity + 1, 6))
+        sums[:self.size + 1] = self._sums[:self.size + 1]
+        hist = np.zeros((capacity + 1, self._hist.shape[1]), dtype=np.int32)
+        hist[:self.size + 1] = self._hist[:self.size + 1]
+        levels = []
+        for level in self._levels:
+            grown = np.full((capacity, 4), -np.inf)
+            grown[:self.size] = level[:self.size]
+            levels.append(grown)
+        self._sums, self._hist, self._levels, self._capacity = sums, hist, levels, capacity
+
+    def _widen(self, low: int, high: int) -> None:
+        """Make the histogram columns cover [low, high]; new columns count zero days"""
+        width = self._hist.shape[1]
+        if width == 0:
+            self._t_low = low
+            self._hist = np.zeros((self._hist.shape[0], high - low + 1), dtype=np.int32)
+            return
+        left = max(0, self._t_low - low)
+        right = max(0, high - (self._t_low + width - 1))
+        if left or right:
+            self._hist = np.pad(self._hist, ((0, 0), (left, right)))
+            self._t_low -= left
+
+    def _extend_levels(self, start: int, end: int, extremes: np.ndarray) -> None:
+        if not self._levels:
+            self._levels.append(np.full((self._capacity, 4), -np.inf))
+        self._levels[0][start:end] = extremes
+        for k in range(1, end.bit_length()):
+            if k == len(self._levels):
+                # A new level covers every position
+                self._levels.append(np.full((self._capacity, 4), -np.inf))
+                first = 0
+            else:
+                first = start
+            previous, level, half = self._levels[k - 1], self._levels[k], 1 << (k - 1)
+            # Entry i covers (i - 2^k, i]: the halves ending at i and at i - 2^(k-1)
+            back = np.maximum(np.arange(first, end) - half, 0)
+            level[first:end] = np.maximum(previous[first:end], previous[back])
+
+    def window(self, start: int, end: int) -> Optional[WindowAggregate]:
+        """Aggregate of the days between two ordinals (inclusive), or None if none is recorded"""
+        if self.first is None or self.size == 0:
+            return None
+        low = max(start - self.first, 0)
+        high = min(end - self.first, self.size - 1)
+        if high < low:
+            return None
+        sums = self._sums[high + 1] - self._sums[low]
+        n = int(round(sums[COUNT]))
+        if n == 0:
+            return None
+        k = (high - low + 1).bit_length() - 1
+        level = self._levels[k]
+        extremes = np.maximum(level[high], level[low + (1 << k) - 1])
+        return WindowAggregate(
+            n, float(sums[T_SUM]), float(sums[T_SQ]), float(-extremes[NEG_T_MIN]), float(extremes[T_MAX]),
+            float(sums[H_SUM]), float(sums[P_SUM]), float(extremes[P_MAX]),
+            float(sums[W_SUM]), float(extremes[W_MAX]),
+            self._t_low, self._hist[high + 1] - self._hist[low]
+        )
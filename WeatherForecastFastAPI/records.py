@@ -0,0 +1,192 @@
+"""
+Compact internal forecast records
+
+The service passes forecasts around as these slotted, validation-free
+dataclasses instead of Pydantic models. They hold exactly the fields of the
+corresponding response models, in the same order, so orjson serializes them
+directly to the same JSON. A model is only built at the API edge when one
+is needed (to_model), and upstream data is validated into models once before
+being converted into records (from_model). Records pickle as plain
+constructor calls, which keeps them compact and quick to load from the
+cross-process cache.
+"""
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from models import (
+    AlertType,
+    DetailedWeatherForecast,
+    HourlyForecast,
+    Severity,
+    WeatherAlert,
+    WeatherForecast,
+    WindDirection
+)
+
+
+class _Record:
+    """Pickles a record as its class and positional field values"""
+
+    __slots__ = ()
+
+    _values = None  # attrgetter over the dataclass fields, set below
+
+    def __reduce__(self):
+        return type(self), type(self)._values(self)
+
+
+@dataclass
+class AlertRecord(_Record):
+    """Internal counterpart of WeatherAlert"""
+
+    __slots__ = ("alert_type", "severity", "description", "start_time", "end_time")
+
+    alert_type: AlertType
+    severity: Severity
+    description: str
+    start_time: datetime
+    end_time: datetime
+
+    def to_model(self) -> WeatherAlert:
+        return WeatherAlert.model_construct(
+            alert_type=self.alert_type,
+            severity=self.severity,
+            description=self.description,
+            start_time=self.start_time,
+            end_time=self.end_time
+        )
+
+    @classmethod
+    def from_model(cls, alert: WeatherAlert) -> "AlertRecord":
+        return cls(alert.alert_type, alert.severity, alert.description, alert.start_time, alert.end_time)
+
+
+@dataclass
+class ForecastRecord(_Record):
+    """Internal counterpart of WeatherForecast"""
+
+    __slots__ = (
+        "date", "temperature_c", "temperature_f", "summary", "humidity",
+        "wind_speed", "wind_direction", "precipitation", "pressure"
+    )
+
+    date: datetime
+    temperature_c: int
+    temperature_f: int
+    summary: str
+    humidity: int
+    wind_speed: float
+    wind_direction: WindDirection
+    precipitation: float
+    pressure: int
+
+    def to_model(self) -> WeatherForecast:
+        return WeatherForecast.model_construct(
+            date=self.date,
+            temperature_c=self.temperature_c,
+            temperature_f=self.temperature_f,
+            summary=self.summary,
+            humidity=self.humidity,
+            wind_speed=self.wind_speed,
+            wind_direction=self.wind_direction,
+            precipitation=self.precipitation,
+            pressure=self.pressure
+        )
+
+    @classmethod
+    def from_model(cls, forecast: WeatherForecast) -> "ForecastRecord":
+        return cls(
+            forecast.date, forecast.temperature_c, forecast.temperature_f, forecast.summary,
+            forecast.humidity, forecast.wind_speed, forecast.wind_direction,
+            forecast.precipitation, forecast.pressure
+        )
+
+
+@dataclass
+class DetailedForecastRecord(ForecastRecord):
+    """Internal counterpart of DetailedWeatherForecast"""
+
+    __slots__ = (
+        "cloud_cover", "uv_index", "visibility", "dew_point_c", "heat_index_c",
+        "wind_chill_c", "apparent_temperature_c", "comfort_flags", "alerts"
+    )
+
+    cloud_cover: int
+    uv_index: float
+    visibility: int
+    dew_point_c: float
+    heat_index_c: float
+    wind_chill_c: float
+    apparent_temperature_c: float
+    comfort_flags: Sequence[str]
+    alerts: Optional[List[AlertRecord]]
+
+    def to_model(self) -> DetailedWeatherForecast:
+        return DetailedWeatherForecast.model_construct(
+            date=self.date,
+            temperature_c=self.temperature_c,
+            temperature_f=self.temperature_f,
+            summary=self.summary,
+            humidity=self.humidity,
+            wind_speed=self.wind_speed,
+            wind_direction=self.wind_direction,
+            precipitation=self.precipitation,
+            pressure=self.pressure,
+            cloud_cover=self.cloud_cover,
+            uv_index=self.uv_index,
+            visibility=self.visibility,
+            dew_point_c=self.dew_point_c,
+            heat_index_c=self.heat_index_c,
+            wind_chill_c=self.wind_chill_c,
+            apparent_temperature_c=self.apparent_temperature_c,
+            comfort_flags=list(self.comfort_flags),
+            alerts=[alert.to_model() for alert in self.alerts] if self.alerts is not None else None
+        )
+
+
+@dataclass
+class HourlyRecord(_Record):
+    """Internal counterpart of HourlyForecast"""
+
+    __slots__ = (
+        "time", "hours", "temperature_c", "temperature_min_c", "temperature_max_c",
+        "humidity", "wind_speed", "precipitation", "pressure"
+    )
+
+    time: datetime
+    hours: int
+    temperature_c: float
+    temperature_min_c: float
+    temperature_max_c: float
+    humidity: float
+    wind_speed: float
+    precipitation: float
+    pressure: float
+
+    def to_model(self) -> HourlyForecast:
+        return HourlyForecast.model_construct(
+            time=self.time,
+            hours=self.hours,
+            temperature_c=self.temperature_c,
+            temperature_min_c=self.temperature_min_c,
+            temperature_max_c=self.temperature_max_c,
+            humidity=self.humidity,
+            wind_speed=self.wind_speed,
+            precipitation=self.precipitation,
+            pressure=self.pressure
+        )
+
+
+# A record reduced to some of its fields (a sparse fieldset), in field order
+SparseRecord = Dict[str, Any]
+
+
+def select_fields(records: Sequence[_Record], fields: Sequence[str]) -> List[SparseRecord]:
+    """Reduce records that already exist (e.g. from a provider) to some of their fields"""
+    return [{name: getattr(record, name) for name in fields} for record in records]
+
+
+for _record in (AlertRecord, ForecastRecord, DetailedForecastRecord, HourlyRecord):
+    _record._values = attrgetter(*(field.name for field in fields(_record)))
@@ -0,0 +1,121 @@
+"""
+Pre-serialized JSON responses with ETag support
+
+Serialized response bodies are cached as bytes together with a strong ETag.
+Repeated requests skip validation and serialization entirely, and clients
+that send a matching If-None-Match header get 304 Not Modified.
+"""
+import hashlib
+import time
+from typing import Any, Hashable, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from cache import TTLCache
+from metrics import Histogram, route_label
+
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Clients may reuse a stored response but must revalidate it with its ETag
+CACHE_CONTROL = "no-cache"
+
+
+def _default(obj: Any) -> Any:
+    """orjson fallback for Pydantic models"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize records or models (or lists/dicts of them) to JSON bytes with orjson"""
+    return orjson.dumps(data, default=_default)
+
+
+def json_response(data: Any, status_code: int = 200) -> Response:
+    """
+    Serialize data straight to a JSON response
+
+    Used where a route returns internal records: they are serialized by
+    orjson as they are, skipping conversion to and validation of the
+    response model.
+    """
+    return Response(content=dumps(data), status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the response body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against an ETag
+
+    Uses the weak comparison required for If-None-Match, so W/ prefixes on
+    the client's validators are ignored.
+    """
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Cache of serialized response bodies keyed by request URL
+
+    Each entry remembers the data object it was serialized from. Routes
+    always ask the (cached) service for their data, which is a memory lookup,
+    and the stored bytes are reused only while the service keeps returning
+    that same object, so a cached body never outlives its data.
+
+    Args:
+        cache: Storage for (data, body, etag) triples
+        serialization: Optional histogram timing each serialization by route
+    """
+
+    def __init__(self, cache: TTLCache, serialization: Optional[Histogram] = None):
+        self.cache = cache
+        self.serialization = serialization
+
+    @staticmethod
+    def request_key(request: Request) -> Hashable:
+        """Cache key for a request: path and sorted query"""
+        return (request.url.path, tuple(sorted(request.query_params.multi_items())))
+
+    def respond(self, request: Request, data: Any) -> Response:
+        """
+        Serve data as JSON, reusing previously serialized bytes when possible
+
+        Args:
+            request: Incoming request (used for the cache key and If-None-Match)
+            data: Response data (models, lists or dicts)
+
+        Returns:
+            200 response with the JSON body, or 304 if the client's ETag matches
+        """
+        key = self.request_key(request)
+        entry: Optional[Tuple[Any, bytes, str]] = self.cache.get(key)
+        if entry is None or entry[0] is not data:
+            start = time.perf_counter()
+            body = dumps(data)
+            if self.serialization is not None:
+                self.serialization.labels(route_label(request.scope)).observe(time.perf_counter() - start)
+            entry = (data, body, make_etag(body))
+            self.cache.set(key, entry)
+
+        _, body, etag = entry
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -1,63 +1,94 @@
 import random
 from datetime import datetime, timedelta
-from typing import List, Optional
-from models import (
-    WeatherForecast,
-    DetailedWeatherForecast,
-    WeatherAlert,
-    WeatherStatistics,
-    WindDirection,
-    AlertType,
-    Severity
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
+from aggregation import StreamingStatistics
+from hourly import HourlyBlock, downsample, iter_buckets, iter_hourly_blocks, next_hour
+from providers import GeneratedWeatherProvider, WeatherProvider
+from engine import (
+    SUMMARIES,
+    ALERT_TYPES,
+    SEVERITIES,
+    ForecastColumns,
+    city_key,
+    generate_columns,
+    horizon_dates,
+    iter_horizon_chunks
 )
+from models import WeatherStatistics
+from records import AlertRecord, DetailedForecastRecord, ForecastRecord, HourlyRecord, SparseRecord
 
 
 class WeatherForecastService:
     """Service layer for weather forecast operations"""
 
-    SUMMARIES = [
-        "Freezing", "Bracing", "Chilly", "Cool", "Mild",
-        "Warm", "Balmy", "Hot", "Sweltering", "Scorching"
-    ]
+    SUMMARIES = SUMMARIES
 
     CITIES = [
         "New York", "London", "Tokyo", "Paris", "Sydney",
         "Mumbai", "Toronto", "Berlin", "Singapore", "Dubai"
     ]
 
-    @staticmethod
-    def _celsius_to_fahrenheit(celsius: int) -> int:
-        """Convert Celsius to Fahrenheit"""
-        return int(32 + (celsius * 9 / 5))
+    # Days generated per block when streaming statistics
+    STATISTICS_CHUNK_DAYS = 64
+
+    # Days generated per block for streamed forecasts; small blocks keep
+    # time-to-first-byte low
+    STREAM_CHUNK_DAYS = 16
+
+    # Hours generated per block of an hourly series (rounded to whole buckets)
+    HOURLY_BLOCK_HOURS = 384
 
-    def get_forecast(self, days: int = 5) -> List[WeatherForecast]:
+    def __init__(self, seed: int = 0, provider: Optional[WeatherProvider] = None):
+        """
+        Args:
+            seed: Global seed; every (city, date) forecast is a pure function of it
+            provider: Source of city forecasts (defaults to local generation)
+        """
+        self.seed = seed
+        self.provider = provider or GeneratedWeatherProvider(seed)
+
+    def get_forecast(
+        self,
+        days: int = 5,
+        fields: Optional[Sequence[str]] = None
+    ) -> Union[List[ForecastRecord], List[SparseRecord]]:
         """
         Get weather forecast for the specified number of days
 
         Args:
             days: Number of days to forecast (1-30)
+            fields: Optional sparse fieldset (engine.response_fields); only
+                these fields are generated and returned
 
         Returns:
             List of weather forecasts
         """
-        forecasts = []
-        for i in range(1, days + 1):
-            temp_c = random.randint(-20, 55)
-            forecast = WeatherForecast(
-                date=datetime.now() + timedelta(days=i),
-                temperature_c=temp_c,
-                temperature_f=self._celsius_to_fahrenheit(temp_c),
-                summary=random.choice(self.SUMMARIES),
-                humidity=random.randint(30, 100),
-                wind_speed=round(random.uniform(0, 50), 2),
-                wind_direction=random.choice(list(WindDirection)),
-                precipitation=round(random.uniform(0, 100), 2),
-                pressure=random.randint(980, 1040)
-            )
-            forecasts.append(forecast)
-        return forecasts
+        if fields is not None:
+            return self.generate_columns(days, fields=fields).to_rows(fields)
+        return self.generate_columns(days).to_records()
+
+    def generate_columns(
+        self,
+        days: int = 5,
+        cities: Sequence[Optional[str]] = (None,),
+        detailed: bool = False,
+        fields: Optional[Sequence[str]] = None
+    ) -> ForecastColumns:
+        """
+        Generate a forecast horizon for one or more cities as columns
+
+        Args:
+            days: Number of days to forecast
+            cities: City names; None means the default location
+            detailed: Also generate the detailed forecast fields
+            fields: Optional response fields to restrict generation to
+
+        Returns:
+            Column block shaped (cities, days)
+        """
+        return generate_columns(horizon_dates(days), cities, detailed=detailed, seed=self.seed, fields=fields)
 
-    def get_forecast_by_city(self, city: str, days: int = 5) -> List[WeatherForecast]:
+    def get_forecast_by_city(self, city: str, days: int = 5) -> List[ForecastRecord]:
         """
         Get weather forecast for a specific city
 
@@ -68,97 +99,136 @@ class WeatherForecastService:
         Returns:
             List of weather forecasts for the city
         """
-        # In production, this would fetch city-specific data
-        return self.get_forecast(days)
+        return self.generate_columns(days, [city]).to_records()
+
+    async def fetch_forecast_by_city(self, city: str, days: int = 5) -> List[ForecastRecord]:
+        """
+        Fetch the forecast for a specific city from the configured provider
+
+        Args:
+            city: City name
+            days: Number of days to forecast (1-30)
+
+        Returns:
+            List of weather forecasts for the city
+
+        Raises:
+            ProviderError: If the provider could not return the forecast
+        """
+        return await self.provider.fetch_forecast(city, days)
 
-    def get_current_weather(self, city: Optional[str] = None) -> WeatherForecast:
+    def get_current_weather(
+        self,
+        city: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Union[ForecastRecord, SparseRecord]:
         """
         Get current weather conditions
 
         Args:
             city: Optional city name
+            fields: Optional sparse fieldset
 
         Returns:
             Current weather forecast
         """
-        temp_c = random.randint(-20, 55)
-        return WeatherForecast(
-            date=datetime.now(),
-            temperature_c=temp_c,
-            temperature_f=self._celsius_to_fahrenheit(temp_c),
-            summary=random.choice(self.SUMMARIES),
-            humidity=random.randint(30, 100),
-            wind_speed=round(random.uniform(0, 50), 2),
-            wind_direction=random.choice(list(WindDirection)),
-            precipitation=round(random.uniform(0, 100), 2),
-            pressure=random.randint(980, 1040)
-        )
+        block = generate_columns([datetime.now()], [city], seed=self.seed, fields=fields)
+        return (block.to_records() if fields is None else block.to_rows(fields))[0]
 
     def get_detailed_forecast(
         self,
         date: datetime,
-        city: Optional[str] = None
-    ) -> DetailedWeatherForecast:
+        city: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Union[DetailedForecastRecord, SparseRecord]:
         """
         Get detailed weather forecast for a specific date
 
         Args:
             date: Date for the forecast
             city: Optional city name
+            fields: Optional sparse fieldset; cloud cover, UV index,
+                visibility and alerts are only generated when asked for
 
         Returns:
             Detailed weather forecast
         """
-        temp_c = random.randint(-20, 55)
-        has_alert = random.random() > 0.7
-
-        alerts = None
-        if has_alert:
-            alerts = [
-                WeatherAlert(
-                    alert_type=random.choice(list(AlertType)),
-                    severity=random.choice(list(Severity)),
-                    description="Weather alert in effect",
-                    start_time=date,
-                    end_time=date + timedelta(hours=random.randint(3, 24))
-                )
-            ]
-
-        return DetailedWeatherForecast(
-            date=date,
-            temperature_c=temp_c,
-            temperature_f=self._celsius_to_fahrenheit(temp_c),
-            summary=random.choice(self.SUMMARIES),
-            humidity=random.randint(30, 100),
-            wind_speed=round(random.uniform(0, 50), 2),
-            wind_direction=random.choice(list(WindDirection)),
-            precipitation=round(random.uniform(0, 100), 2),
-            pressure=random.randint(980, 1040),
-            cloud_cover=random.randint(0, 100),
-            uv_index=round(random.uniform(0, 11), 1),
-            visibility=random.randint(1, 20),
-            alerts=alerts
-        )
-
-    def get_detailed_forecasts(self, days: int = 5) -> List[DetailedWeatherForecast]:
+        block = generate_columns([date], [city], detailed=True, seed=self.seed, fields=fields)
+        return (block.to_detailed_records() if fields is None else block.to_rows(fields))[0]
+
+    def get_detailed_forecasts(
+        self,
+        days: int = 5,
+        fields: Optional[Sequence[str]] = None
+    ) -> Union[List[DetailedForecastRecord], List[SparseRecord]]:
         """
         Get detailed weather forecasts for multiple days
 
         Args:
             days: Number of days to forecast (1-30)
+            fields: Optional sparse fieldset
 
         Returns:
             List of detailed weather forecasts
         """
-        forecasts = []
-        for i in range(1, days + 1):
-            forecast = self.get_detailed_forecast(
-                datetime.now() + timedelta(days=i)
-            )
-            forecasts.append(forecast)
-        return forecasts
+        if fields is not None:
+            return self.generate_columns(days, detailed=True, fields=fields).to_rows(fields)
+        return self.generate_columns(days, detailed=True).to_detailed_records()
+
+    def get_forecast_views(
+        self,
+        city: Optional[str],
+        views: Sequence[Tuple[str, int, Optional[Sequence[str]]]]
+    ) -> List[Any]:
+        """
+        Several views of one city's forecast from a single generation pass
+
+        One block covers today and the longest horizon asked for, with only
+        the fields the views need; current conditions read its first day and
+        the other views the horizon prefix of their length. Every view equals
+        what its own method returns.
+
+        Args:
+            city: Optional city name
+            views: (kind, days, fields) triples; kind is "current" (days is
+                ignored), "forecast", "detailed" or "statistics" (fields are
+                ignored), and fields an optional sparse fieldset
 
-    def get_weather_alerts(self, city: Optional[str] = None) -> List[WeatherAlert]:
+        Returns:
+            The result of every view, in order
+        """
+        days = max((days for kind, days, _ in views if kind != "current"), default=0)
+        detailed = any(kind == "detailed" for kind, _, _ in views)
+        needed: Optional[set] = set()
+        for kind, _, fields in views:
+            names = StreamingStatistics.FIELDS if kind == "statistics" else fields
+            if names is None:
+                needed = None
+                break
+            needed.update(names)
+
+        now = datetime.now()
+        dates = [now + timedelta(days=i) for i in range(days + 1)]
+        block = generate_columns(dates, [city], detailed=detailed, seed=self.seed, fields=needed)
+
+        results = []
+        for kind, days, fields in views:
+            part = block.slice_days(0, 1) if kind == "current" else block.slice_days(1, days + 1)
+            if kind == "statistics":
+                stats = StreamingStatistics()
+                stats.update(part)
+                results.append(stats.result())
+            elif fields is not None:
+                rows = part.to_rows(fields)
+                results.append(rows[0] if kind == "current" else rows)
+            elif kind == "detailed":
+                results.append(part.to_detailed_records())
+            else:
+                records = part.to_records()
+                results.append(records[0] if kind == "current" else records)
+        return results
+
+    def get_weather_alerts(self, city: Optional[str] = None) -> List[AlertRecord]:
         """
         Get active weather alerts
 
@@ -168,44 +238,169 @@ class WeatherForecastService:
         Returns:
             List of active weather alerts
         """
-        alert_count = random.randint(0, 4)
+        now = datetime.now().replace(minute=0, second=0, microsecond=0)
+        # str seeds are hashed with SHA-512, so this is stable across processes
+        rng = random.Random(f"{self.seed}:{city_key(city)}:{now.date().isoformat()}")
+        alert_count = rng.randint(0, 4)
         alerts = []
 
         for i in range(alert_count):
-            alert = WeatherAlert(
-                alert_type=random.choice(list(AlertType)),
-                severity=random.choice(list(Severity)),
+            alert = AlertRecord(
+                alert_type=rng.choice(ALERT_TYPES),
+                severity=rng.choice(SEVERITIES),
                 description=f"Weather alert {i + 1} for {city or 'your area'}",
-                start_time=datetime.now() + timedelta(hours=random.randint(-2, 4)),
-                end_time=datetime.now() + timedelta(hours=random.randint(4, 24))
+                start_time=now + timedelta(hours=rng.randint(-2, 4)),
+                end_time=now + timedelta(hours=rng.randint(4, 24))
             )
             alerts.append(alert)
 
         return alerts
 
+    def iter_forecasts(
+        self,
+        days: int,
+        city: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Iterator[Union[ForecastRecord, SparseRecord]]:
+        """
+        Lazily generate a forecast horizon, one block of days at a time
+
+        Args:
+            days: Number of days to forecast
+            city: Optional city name
+            fields: Optional sparse fieldset
+
+        Yields:
+            Weather forecasts in date order
+        """
+        for dates in iter_horizon_chunks(days, self.STREAM_CHUNK_DAYS):
+            block = generate_columns(dates, [city], seed=self.seed, fields=fields)
+            yield from block.to_records() if fields is None else block.to_rows(fields)
+
+    def iter_detailed_forecasts(
+        self,
+        days: int,
+        city: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Iterator[Union[DetailedForecastRecord, SparseRecord]]:
+        """
+        Lazily generate a detailed forecast horizon, one block of days at a time
+
+        Args:
+            days: Number of days to forecast
+            city: Optional city name
+            fields: Optional sparse fieldset
+
+        Yields:
+            Detailed weather forecasts in date order
+        """
+        for dates in iter_horizon_chunks(days, self.STREAM_CHUNK_DAYS):
+            block = generate_columns(dates, [city], detailed=True, seed=self.seed, fields=fields)
+            yield from block.to_detailed_records() if fields is None else block.to_rows(fields)
+
+    def iter_hourly_forecasts(
+        self,
+        days: int,
+        city: Optional[str] = None,
+        bucket_hours: int = 1
+    ) -> Iterator[HourlyBlock]:
+        """
+        Lazily generate an hourly series from the next full hour on
+
+        Args:
+            days: Number of days (24 hours each) to forecast
+            city: Optional city name
+            bucket_hours: Consecutive hours aggregated into each point
+
+        Yields:
+            Column blocks of points in time order
+        """
+        block_hours = bucket_hours * max(1, self.HOURLY_BLOCK_HOURS // bucket_hours)
+        blocks = iter_hourly_blocks(city, next_hour(), days * 24, block_hours, seed=self.seed)
+        return iter_buckets(blocks, bucket_hours)
+
+    def get_hourly_forecast(
+        self,
+        days: int = 1,
+        city: Optional[str] = None,
+        bucket_hours: int = 1,
+        points: Optional[int] = None,
+        metric: str = "temperature_c"
+    ) -> List[HourlyRecord]:
+        """
+        Get an hourly forecast series, optionally aggregated and downsampled
+
+        Args:
+            days: Number of days (24 hours each) to forecast
+            city: Optional city name
+            bucket_hours: Consecutive hours aggregated into each point
+            points: Point budget; longer series are downsampled with LTTB
+            metric: Field whose shape downsampling preserves
+
+        Returns:
+            Hourly (or bucketed) forecasts in time order
+        """
+        blocks = self.iter_hourly_forecasts(days, city, bucket_hours)
+        if points is not None:
+            blocks = downsample(blocks, points, metric)
+        return [record for block in blocks for record in block.to_records()]
+
+    def iter_column_blocks(
+        self,
+        days: int,
+        cities: Sequence[Optional[str]],
+        detailed: bool = False,
+        max_rows: int = 65536
+    ) -> Iterator[ForecastColumns]:
+        """
+        Lazily generate a horizon for many cities, a group of cities at a time
+
+        Every block covers the whole horizon (all blocks share one dates
+        list) for as many cities as fit in max_rows, so rows come out ordered
+        by city, then date, and at most max_rows are held at once.
+
+        Args:
+            days: Number of days to forecast
+            cities: City names; None means the default location
+            detailed: Also generate the detailed forecast fields
+            max_rows: Upper bound on rows per block (at least one city)
+
+        Yields:
+            Column blocks shaped (cities in the group, days)
+        """
+        dates = horizon_dates(days)
+        cities_per_block = max(1, max_rows // days)
+        for first in range(0, len(cities), cities_per_block):
+            group = cities[first:first + cities_per_block]
+            yield generate_columns(dates, group, detailed=detailed, seed=self.seed)
+
+    def iter_weather_statistics(self, days: int = 7) -> Iterator[WeatherStatistics]:
+        """
+        Stream progressively refined statistics for a specified period
+
+        Args:
+            days: Number of days to analyze
+
+        Yields:
+            A statistics snapshot after each generated block; the last one
+            covers the whole period
+        """
+        stats = StreamingStatistics()
+        for dates in iter_horizon_chunks(days, self.STATISTICS_CHUNK_DAYS):
+            stats.update(generate_columns(dates, seed=self.seed))
+            yield stats.result()
+
     def get_weather_statistics(self, days: int = 7) -> WeatherStatistics:
         """
         Get weather statistics for a specified period
 
         Args:
-            days: Number of days to analyze (1-365)
+            days: Number of days to analyze
 
         Returns:
             Weather statistics including averages and extremes
         """
-        forecasts = self.get_forecast(days)
-
-        temps = [f.temperature_c for f in forecasts]
-        humidities = [f.humidity for f in forecasts]
-        precipitations = [f.precipitation for f in forecasts]
-        wind_speeds = [f.wind_speed for f in forecasts]
-
-        return WeatherStatistics(
-            average_temperature_c=round(sum(temps) / len(temps), 2),
-            max_temperature_c=max(temps),
-            min_temperature_c=min(temps),
-            average_humidity=round(sum(humidities) / len(humidities), 2),
-            total_precipitation=round(sum(precipitations), 2),
-            average_wind_speed=round(sum(wind_speeds) / len(wind_speeds), 2),
-            days_analyzed=days
-        )
+        stats = StreamingStatistics()
+        for dates in iter_horizon_chunks(days, self.STATISTICS_CHUNK_DAYS):
+            stats.update(generate_columns(dates, seed=self.seed))
+        return stats.result()
@@ -0,0 +1,462 @@
+"""
+Cross-process forecast cache
+
+A TTL/LRU cache with the same interface as cache.TTLCache whose entries live
+in a memory-mapped file, so every worker process of a multi-worker server
+reads and fills the same cache.
+
+Layout: a header, one block of counters per lock stripe, then fixed-size
+slots grouped into sets of WAYS slots. A key hashes to exactly one set; a
+lookup compares the (at most WAYS) slot headers of that set, and a store
+replaces a free or expired slot, or else the least recently used one of the
+set. Each set belongs to one lock stripe, guarded by a thread lock inside
+the process and a byte-range lock on a companion ".lock" file across
+processes (fcntl on POSIX, msvcrt on Windows), so readers and writers of
+different sets never wait for each other.
+
+Values are pickled into their slot. Every store stamps its slot with a new
+write stamp; a process keeps the objects it decoded together with their
+stamp and reuses them while the slot still carries it, so repeated hits
+skip unpickling and an overwrite, invalidation or clear() in any process is
+seen by all of them. A value too large for a slot is kept only by the
+process that stored it, among its decoded objects; its slot then holds just
+the key, stamped like any store, so other processes miss on it, and an
+overwrite, invalidation or clear() anywhere retires the local copy too.
+
+The file is a private scratch area for processes of the same deployment
+(pickle must only ever load data this application wrote): it is created
+with owner-only permissions and reset by the launcher on startup.
+"""
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_byte(fd: int, offset: int) -> None:
+        # LK_LOCK gives up after ten one-second retries; poll instead
+        os.lseek(fd, offset, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(0.0002)
+
+    def _unlock_byte(fd: int, offset: int) -> None:
+        os.lseek(fd, offset, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_byte(fd: int, offset: int) -> None:
+        fcntl.lockf(fd, fcntl.LOCK_EX, 1, offset, os.SEEK_SET)
+
+    def _unlock_byte(fd: int, offset: int) -> None:
+        fcntl.lockf(fd, fcntl.LOCK_UN, 1, offset, os.SEEK_SET)
+
+
+MAGIC = b"WFCACHE1"
+WAYS = 8
+DEFAULT_SLOT_BYTES = 16384
+DEFAULT_STRIPES = 16
+
+# magic, sets, ways, slot bytes, stripes, generation
+_HEADER = struct.Struct("<8sIIIIQ")
+_HEADER_BYTES = 64
+_GENERATION_OFFSET = 24
+
+# hits, stale hits, misses, evictions, expirations, write stamp, LRU tick
+_COUNTERS = struct.Struct("<7Q")
+_STRIPE_BYTES = 64
+HITS, STALE_HITS, MISSES, EVICTIONS, EXPIRATIONS, STAMP, TICK = range(7)
+
+# key hash, generation, write stamp, expires at, last used tick, key length, value length
+_SLOT = struct.Struct("<QQQdQII")
+
+# Lock file byte used while (re)initialising the cache file; stripes follow
+_INIT_LOCK = 0
+
+_PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def _key_bytes(key: Hashable) -> Tuple[bytes, int]:
+    """Stable encoding of a key and its non-zero 64-bit hash"""
+    encoded = pickle.dumps(key, _PICKLE_PROTOCOL)
+    digest = int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), "little")
+    return encoded, digest | 1
+
+
+class _StripeLock:
+    """Exclusive lock for one stripe, across threads and processes"""
+
+    __slots__ = ("_thread_lock", "_fd", "_offset")
+
+    def __init__(self, lock_path: str, offset: int):
+        self._thread_lock = threading.Lock()
+        # One descriptor per stripe: on Windows locking depends on the file position
+        self._fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._offset = offset
+
+    def __enter__(self) -> "_StripeLock":
+        self._thread_lock.acquire()
+        try:
+            _lock_byte(self._fd, self._offset)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            _unlock_byte(self._fd, self._offset)
+        finally:
+            self._thread_lock.release()
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class SharedTTLCache:
+    """
+    TTL/LRU cache shared by every process that opens the same file
+
+    Drop-in replacement for TTLCache. Capacity is max_entries rounded up to
+    a whole number of sets; eviction is least-recently-used within a set.
+
+    Args:
+        path: Cache file; created (with a companion .lock file) if missing
+        max_entries: Number of slots
+        ttl: Seconds an entry stays fresh
+        stale_ttl: Seconds an expired entry is retained for stale reads via lookup()
+        slot_bytes: Bytes per slot, bounding the pickled size of key plus value
+        stripes: Number of independently locked groups of sets
+        timer: Wall clock shared by all processes, injectable for testing
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        stale_ttl: float = 0.0,
+        slot_bytes: int = DEFAULT_SLOT_BYTES,
+        stripes: int = DEFAULT_STRIPES,
+        timer: Callable[[], float] = time.time
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if slot_bytes <= _SLOT.size:
+            raise ValueError(f"slot_bytes must be larger than {_SLOT.size}")
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._timer = timer
+        self.sets = -(-max_entries // WAYS)
+        self.max_entries = self.sets * WAYS
+        self.slot_bytes = slot_bytes
+        self.stripes = max(1, min(stripes, self.sets))
+        self._slots_offset = _HEADER_BYTES + self.stripes * _STRIPE_BYTES
+        self.size = self._slots_offset + self.max_entries * slot_bytes
+
+        lock_path = path + ".lock"
+        self._locks = [_StripeLock(lock_path, 1 + stripe) for stripe in range(self.stripes)]
+        self._map = self._open(lock_path)
+
+        # Objects decoded (or stored oversized) in this process: key -> (write stamp, value)
+        self._decoded: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._decoded_lock = threading.Lock()
+
+    @classmethod
+    def reset(cls, path: str) -> None:
+        """Delete a cache file so the next process to open it starts empty"""
+        for name in (path, path + ".lock"):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+    def _open(self, lock_path: str) -> mmap.mmap:
+        """Map the cache file, (re)initialising it if it is new or laid out differently"""
+        init = _StripeLock(lock_path, _INIT_LOCK)
+        try:
+            with init:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o600)
+                try:
+                    expected = _HEADER.pack(MAGIC, self.sets, WAYS, self.slot_bytes, self.stripes, 0)
+                    current = os.read(fd, _HEADER.size)
+                    if os.fstat(fd).st_size != self.size or current[:24] != expected[:24]:
+                        os.ftruncate(fd, 0)
+                        os.ftruncate(fd, self.size)
+                        os.lseek(fd, 0, os.SEEK_SET)
+                        os.write(fd, expected)
+                    return mmap.mmap(fd, self.size)
+                finally:
+                    os.close(fd)
+        finally:
+            init.close()
+
+    def close(self) -> None:
+        """Unmap the file and release the lock descriptors"""
+        self._map.close()
+        for lock in self._locks:
+            lock.close()
+
+    # Slot access (callers hold the stripe lock)
+
+    def _slot_offset(self, index: int) -> int:
+        return self._slots_offset + index * self.slot_bytes
+
+    def _generation(self) -> int:
+        return struct.unpack_from("<Q", self._map, _GENERATION_OFFSET)[0]
+
+    def _bump(self, stripe: int, counter: int, amount: int = 1) -> int:
+        offset = _HEADER_BYTES + stripe * _STRIPE_BYTES + counter * 8
+        value = struct.unpack_from("<Q", self._map, offset)[0] + amount
+        struct.pack_into("<Q", self._map, offset, value)
+        return value
+
+    def _locate(self, key_hash: int) -> Tuple[int, int]:
+        """(first slot index of the key's set, stripe)"""
+        # The low bit is always set (zero marks a free slot), so skip it
+        set_index = (key_hash >> 1) % self.sets
+        return set_index * WAYS, set_index % self.stripes
+
+    def _find(self, first: int, key_hash: int, key: bytes, generation: int) -> Optional[Tuple]:
+        """(slot index, slot header) holding key, or None"""
+        for index in range(first, first + WAYS):
+            offset = self._slot_offset(index)
+            header = _SLOT.unpack_from(self._map, offset)
+            if header[0] != key_hash or header[1] != generation:
+                continue
+            start = offset + _SLOT.size
+            if self._map[start:start + header[5]] == key:
+                return index, header
+        return None
+
+    def _drop(self, index: int) -> None:
+        struct.pack_into("<Q", self._map, self._slot_offset(index), 0)
+
+    def _touch(self, index: int, header: Tuple, stripe: int) -> None:
+        tick = self._bump(stripe, TICK)
+        _SLOT.pack_into(self._map, self._slot_offset(index), *header[:4], tick, *header[5:])
+
+    def _read(self, key: Hashable, stale: bool) -> Optional[Tuple[Any, bool]]:
+        """(value, fresh) for key, or None; stale entries only when asked for"""
+        encoded, key_hash = _key_bytes(key)
+        first, stripe = self._locate(key_hash)
+        with self._locks[stripe]:
+            found = self._find(first, key_hash, encoded, self._generation())
+            if found is None:
+                self._bump(stripe, MISSES)
+                return None
+            index, header = found
+            stamp, expires_at = header[2], header[3]
+            now = self._timer()
+            fresh = expires_at > now
+            if not fresh and not (stale and now < expires_at + self.stale_ttl):
+                if now >= expires_at + self.stale_ttl:
+                    self._drop(index)
+                    self._bump(stripe, EXPIRATIONS)
+                self._bump(stripe, MISSES)
+                return None
+            cached = self._decoded.get(key)
+            if header[6] == 0 and (cached is None or cached[0] != stamp):
+                # Oversized, and stored by another process (or no longer held here)
+                self._bump(stripe, MISSES)
+                return None
+            self._bump(stripe, HITS if fresh else STALE_HITS)
+            self._touch(index, header, stripe)
+            payload = None
+            if cached is None or cached[0] != stamp:
+                start = self._slot_offset(index) + _SLOT.size + header[5]
+                payload = self._map[start:start + header[6]]
+
+        # Unpickle outside the lock; other processes only need the slot
+        if payload is None:
+            with self._decoded_lock:
+                if key in self._decoded:
+                    self._decoded.move_to_end(key)
+            return cached[1], fresh
+        value = pickle.loads(payload)
+        self._remember(key, stamp, value)
+        return value, fresh
+
+    def _remember(self, key: Hashable, stamp: int, value: Any) -> None:
+        with self._decoded_lock:
+            self._decoded[key] = (stamp, value)
+            self._decoded.move_to_end(key)
+            while len(self._decoded) > self.max_entries:
+                self._decoded.popitem(last=False)
+
+    # TTLCache interface
+
+    def __len__(self) -> int:
+        return self._count()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the fresh value for key, or default on a miss"""
+        found = self._read(key, stale=False)
+        return default if found is None else found[0]
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[Any, bool]]:
+        """
+        Return (value, fresh) for key, including expired entries still inside
+        the stale window, or None on a miss
+        """
+        return self._read(key, stale=True)
+
+    def remaining_ttl(self, key: Hashable) -> Optional[float]:
+        """Seconds until key expires (negative once stale), or None if absent"""
+        encoded, key_hash = _key_bytes(key)
+        first, stripe = self._locate(key_hash)
+        with self._locks[stripe]:
+            found = self._find(first, key_hash, encoded, self._generation())
+        if found is None:
+            return None
+        header = found[1]
+        if header[6] == 0:
+            with self._decoded_lock:
+                cached = self._decoded.get(key)
+            if cached is None or cached[0] != header[2]:
+                return None
+        return header[3] - self._timer()
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store value under key, replacing the least recently used entry of its set if full
+
+        A value too large for the slot is kept in this process only, and its
+        slot takes just the key with a new stamp, so every other process drops
+        whatever it held for the key.
+        """
+        encoded, key_hash = _key_bytes(key)
+        payload = pickle.dumps(value, _PICKLE_PROTOCOL)
+        if _SLOT.size + len(encoded) + len(payload) > self.slot_bytes:
+            if _SLOT.size + len(encoded) > self.slot_bytes:
+                raise ValueError("Cache key too large for a slot")
+            payload = b""
+        first, stripe = self._locate(key_hash)
+        with self._locks[stripe]:
+            generation = self._generation()
+            now = self._timer()
+            found = self._find(first, key_hash, encoded, generation)
+            if found is not None:
+                index = found[0]
+            else:
+                index = self._victim(first, generation, now, stripe)
+            stamp = self._bump(stripe, STAMP)
+            tick = self._bump(stripe, TICK)
+            offset = self._slot_offset(index)
+            start = offset + _SLOT.size
+            self._map[start:start + len(encoded)] = encoded
+            self._map[start + len(encoded):start + len(encoded) + len(payload)] = payload
+            _SLOT.pack_into(
+                self._map, offset,
+                key_hash, generation, stamp, now + self.ttl, tick, len(encoded), len(payload)
+            )
+        self._remember(key, stamp, value)
+
+    def _victim(self, first: int, generation: int, now: float, stripe: int) -> int:
+        """Slot to overwrite in a set: a free one, else an expired one, else the LRU"""
+        expired = oldest = None
+        oldest_tick = None
+        for index in range(first, first + WAYS):
+            header = _SLOT.unpack_from(self._map, self._slot_offset(index))
+            if header[0] == 0 or header[1] != generation:
+                return index
+            if expired is None and now >= header[3] + self.stale_ttl:
+                expired = index
+            if oldest_tick is None or header[4] < oldest_tick:
+                oldest, oldest_tick = index, header[4]
+        if expired is not None:
+            self._bump(stripe, EXPIRATIONS)
+            return expired
+        self._bump(stripe, EVICTIONS)
+        return oldest
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss
+
+        The factory runs outside any lock, so concurrent misses for the same
+        key (in this or another process) may each compute the value; the last
+        one stored wins.
+        """
+        found = self._read(key, stale=False)
+        if found is not None:
+            return found[0]
+        value = factory()
+        self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop a single entry in every process; returns whether it was present"""
+        encoded, key_hash = _key_bytes(key)
+        first, stripe = self._locate(key_hash)
+        with self._locks[stripe]:
+            found = self._find(first, key_hash, encoded, self._generation())
+            if found is not None:
+                self._drop(found[0])
+        with self._decoded_lock:
+            self._decoded.pop(key, None)
+        return found is not None
+
+    def clear(self) -> None:
+        """Drop every entry in every process (counters are kept)"""
+        for lock in self._locks:
+            lock.__enter__()
+        try:
+            struct.pack_into("<Q", self._map, _GENERATION_OFFSET, self._generation() + 1)
+        finally:
+            for lock in reversed(self._locks):
+                lock.__exit__(None, None, None)
+        with self._decoded_lock:
+            self._decoded.clear()
+
+    def _count(self) -> int:
+        """Live entries; a lock-free snapshot that may be off by in-flight writes"""
+        generation = self._generation()
+        cutoff = self._timer() - self.stale_ttl
+        live = 0
+        for index in range(self.max_entries):
+            header = _SLOT.unpack_from(self._map, self._slot_offset(index))
+            if header[0] != 0 and header[1] == generation and header[3] > cutoff:
+                live += 1
+        return live
+
+    def _counters(self) -> List[int]:
+        totals = [0] * (TICK + 1)
+        for stripe, lock in enumerate(self._locks):
+            with lock:
+                values = _COUNTERS.unpack_from(self._map, _HEADER_BYTES + stripe * _STRIPE_BYTES)
+            totals = [total + value for total, value in zip(totals, values)]
+        return totals
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the counters, summed over every process"""
+        counters = self._counters()
+        hits, misses = counters[HITS], counters[MISSES]
+        lookups = hits + misses
+        return {
+            "entries": self._count(),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": hits,
+            "stale_hits": counters[STALE_HITS],
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": counters[EVICTIONS],
+            "expirations": counters[EXPIRATIONS],
+            "shared": True
+        }
@@ -0,0 +1,137 @@
+"""
+Streaming responses for long forecast horizons
+
+Turns a generator of models into an NDJSON or Server-Sent-Events response,
+so the first rows leave the server as soon as they are produced and memory
+stays bounded by the generation block size rather than the horizon.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from responses import dumps
+
+
+NDJSON = "ndjson"
+SSE = "sse"
+
+MEDIA_TYPES = {
+    NDJSON: "application/x-ndjson",
+    SSE: "text/event-stream",
+}
+
+
+def negotiate_format(request: Request, requested: Optional[str]) -> str:
+    """
+    Pick the stream format from an explicit parameter or the Accept header
+
+    Args:
+        request: Incoming request
+        requested: Explicit format ("ndjson" or "sse"), if given
+
+    Returns:
+        The stream format; NDJSON unless the client asks for SSE
+    """
+    if requested:
+        if requested not in MEDIA_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported stream format '{requested}', use one of: {', '.join(MEDIA_TYPES)}"
+            )
+        return requested
+    if MEDIA_TYPES[SSE] in request.headers.get("accept", ""):
+        return SSE
+    return NDJSON
+
+
+def _ndjson(items: Iterable[Any]) -> Iterator[bytes]:
+    for item in items:
+        yield dumps(item) + b"\n"
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: ".encode() + dumps(data) + b"\n\n"
+
+
+# SSE comment line; keeps idle connections from being closed by proxies
+SSE_HEARTBEAT = b": keep-alive\n\n"
+
+
+def _sse(items: Iterable[Any], event: str) -> Iterator[bytes]:
+    prefix = f"event: {event}\ndata: ".encode()
+    for item in items:
+        yield prefix + dumps(item) + b"\n\n"
+    yield b"event: end\ndata: {}\n\n"
+
+
+def stream_response(items: Iterable[Any], fmt: str, event: str = "forecast") -> StreamingResponse:
+    """
+    Stream items as NDJSON lines or SSE events
+
+    Synchronous generators are iterated on the thread pool by Starlette, so
+    generation never blocks the event loop.
+
+    Args:
+        items: Models (or JSON-serializable values) to send, usually a generator
+        fmt: Stream format ("ndjson" or "sse")
+        event: SSE event name for each item; a final "end" event closes the stream
+
+    Returns:
+        Streaming response
+    """
+    body = _sse(items, event) if fmt == SSE else _ndjson(items)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+async def _push(
+    request: Request,
+    next_event: Callable[[], Awaitable[Tuple[str, Any]]],
+    initial: Iterable[Tuple[str, Any]],
+    heartbeat: float,
+    on_close: Callable[[], None]
+) -> AsyncIterator[bytes]:
+    try:
+        for event, data in initial:
+            yield sse_event(event, data)
+        while not await request.is_disconnected():
+            try:
+                event, data = await asyncio.wait_for(next_event(), heartbeat)
+            except asyncio.TimeoutError:
+                yield SSE_HEARTBEAT
+                continue
+            yield sse_event(event, data)
+    finally:
+        on_close()
+
+
+def push_response(
+    request: Request,
+    next_event: Callable[[], Awaitable[Tuple[str, Any]]],
+    initial: Iterable[Tuple[str, Any]] = (),
+    heartbeat: float = 15.0,
+    on_close: Callable[[], None] = lambda: None
+) -> StreamingResponse:
+    """
+    Open-ended SSE stream of pushed events
+
+    Sends the initial events, then every event returned by next_event until
+    the client disconnects, with a heartbeat comment whenever no event
+    arrives for heartbeat seconds.
+
+    Args:
+        request: Incoming request, polled for disconnects
+        next_event: Coroutine function returning the next (event, data) pair
+        initial: Events sent before waiting for pushed ones
+        heartbeat: Seconds of silence before a heartbeat is sent
+        on_close: Called once the stream ends (e.g. to unsubscribe)
+
+    Returns:
+        Streaming response
+    """
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    body = _push(request, next_event, initial, heartbeat, on_close)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[SSE], headers=headers)
@@ -0,0 +1,54 @@
+"""
+Stub upstream forecast API
+
+A minimal stand-in for a real weather data provider, used as the upstream of
+HttpWeatherProvider during development and load testing. It serves
+deterministic forecasts with optional artificial latency and counts the
+requests it receives, which makes request coalescing easy to observe.
+
+Run it with:
+
+    uvicorn stub_upstream:app --port 8100
+
+and start the API with WEATHER_PROVIDER=http WEATHER_UPSTREAM_URL=http://localhost:8100
+"""
+import asyncio
+import os
+from typing import List, Optional
+
+from fastapi import FastAPI, Query
+
+from engine import generate_columns, horizon_dates
+from models import WeatherForecast
+from responses import json_response
+
+
+# Artificial latency added to every forecast response, in seconds
+LATENCY_SECONDS = float(os.environ.get("STUB_UPSTREAM_LATENCY_SECONDS", "0.05"))
+
+app = FastAPI(title="Stub Upstream Weather API", version="1.0.0")
+
+request_counts = {"forecast": 0}
+
+
+@app.get("/forecast", response_model=List[WeatherForecast])
+async def get_forecast(
+    city: Optional[str] = Query(None, description="City name (optional)"),
+    days: int = Query(5, ge=1, le=365, description="Number of days to forecast")
+):
+    """Deterministic forecast for a city, served after the configured latency"""
+    request_counts["forecast"] += 1
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    return json_response(generate_columns(horizon_dates(days), [city], seed=1).to_records())
+
+
+@app.get("/stats")
+async def get_stats():
+    """Number of requests served per endpoint"""
+    return request_counts
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8100)
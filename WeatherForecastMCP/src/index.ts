@@ -82,6 +82,26 @@ class WeatherAPIClient {
     return response.data;
   }
 
+  async getWeatherOverview(city?: string, days: number = 7): Promise<any> {
+    // One composite query instead of three requests
+    const response = await axios.post(`${this.baseURL}/api/forecast/query`, {
+      operations: [
+        { op: "current", city },
+        { op: "alerts", city },
+        { op: "statistics", city, days },
+      ],
+    });
+    const [current, alerts, statistics] = response.data.results;
+    return {
+      current: current.data,
+      alerts: alerts.data,
+      statistics: statistics.data,
+      errors: response.data.results
+        .filter((result: any) => result.error)
+        .map((result: any) => `${result.op}: ${result.error}`),
+    };
+  }
+
   async getHealth(): Promise<any> {
     const response = await axios.get(`${this.baseURL}/api/forecast/health`);
     return response.data;
@@ -146,7 +166,7 @@ const TOOLS: Tool[] = [
   {
     name: "get_detailed_forecast",
     description:
-      "Get detailed weather forecast for a specific date. Includes all basic weather data plus cloud cover, UV index, visibility, and active alerts.",
+      "Get detailed weather forecast for a specific date. Includes all basic weather data plus cloud cover, UV index, visibility, dew point, heat index, wind chill, feels-like temperature, comfort alert flags, and active alerts.",
     inputSchema: {
       type: "object",
       properties: {
@@ -166,7 +186,7 @@ const TOOLS: Tool[] = [
   {
     name: "get_detailed_forecasts",
     description:
-      "Get detailed weather forecasts for multiple days. Returns extended information including cloud cover, UV index, visibility, and potential weather alerts.",
+      "Get detailed weather forecasts for multiple days. Returns extended information including cloud cover, UV index, visibility, dew point, heat index, wind chill, feels-like temperature, comfort alert flags, and potential weather alerts.",
     inputSchema: {
       type: "object",
       properties: {
@@ -197,10 +217,31 @@ const TOOLS: Tool[] = [
   {
     name: "get_weather_statistics",
     description:
-      "Get weather statistics for a specified period. Includes average, maximum, and minimum temperatures, average humidity, total precipitation, and average wind speed.",
+      "Get weather statistics for a specified period. Includes average, maximum, and minimum temperatures, average humidity, total precipitation, average wind speed, and comfort indices (dew point, heat index, wind chill, feels-like temperature, days over alert thresholds).",
+    inputSchema: {
+      type: "object",
+      properties: {
+        days: {
+          type: "number",
+          description: "Number of days to analyze (1-365)",
+          default: 7,
+          minimum: 1,
+          maximum: 365,
+        },
+      },
+    },
+  },
+  {
+    name: "get_weather_overview",
+    description:
+      "Get current conditions, active alerts and statistics for a city or the default location in a single request. The statistics cover the given city's forecasts.",
     inputSchema: {
       type: "object",
       properties: {
+        city: {
+          type: "string",
+          description: "City name (optional)",
+        },
         days: {
           type: "number",
           description: "Number of days to analyze (1-365)",
@@ -323,6 +364,13 @@ server.setRequestHandler(CallToolRequestSchema, async (request) => {
         break;
       }
 
+      case "get_weather_overview": {
+        const city = args?.city as string | undefined;
+        const days = (args?.days as number) || 7;
+        result = await weatherClient.getWeatherOverview(city, days);
+        break;
+      }
+
       case "create_custom_forecast_request": {
         const city = args?.city as string | undefined;
         const days = (args?.days as number) || 5;